@@ -0,0 +1,58 @@
+"""
+Command-line tools for the paper database.
+
+Export the corpus (streamed, so memory stays flat for any table size):
+
+    python -m backend.app.cli export --format csv --keyword "graph neural" \
+        --since 2024-01-01 --until 2024-07-01 --gzip -o papers.csv.gz
+"""
+import argparse
+import sys
+from typing import List, Optional
+from .database.config import SessionLocal, engine, init_db
+from .database.crud import iter_papers, parse_published
+from .services.export import EXPORT_FORMATS, encode_export
+
+def _timestamp(value: str):
+    parsed = parse_published(value)
+    if parsed is None:
+        raise argparse.ArgumentTypeError(f"invalid ISO date/time: {value!r}")
+    return parsed
+
+def export(args) -> int:
+    """Write the export to a file or stdout; returns the number of bytes written."""
+    engine.echo = False  # SQL logging would end up in the exported stream
+    init_db()
+    db = SessionLocal()
+    output = open(args.output, "wb") if args.output and args.output != "-" else sys.stdout.buffer
+    written = 0
+    try:
+        papers = iter_papers(db, args.keyword, args.since, args.until, batch_size=args.batch_size)
+        for chunk in encode_export(papers, args.format, args.gzip):
+            output.write(chunk)
+            written += len(chunk)
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+        db.close()
+    return written
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="Stream stored papers as NDJSON or CSV")
+    export_parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson")
+    export_parser.add_argument("--keyword", help="Full-text filter, same syntax as /papers")
+    export_parser.add_argument("--since", type=_timestamp, help="Published at or after (ISO date/time, UTC)")
+    export_parser.add_argument("--until", type=_timestamp, help="Published before (ISO date/time, UTC)")
+    export_parser.add_argument("--gzip", action="store_true", help="Gzip-compress the output")
+    export_parser.add_argument("--batch-size", type=int, default=1000, help="Rows fetched per round trip")
+    export_parser.add_argument("-o", "--output", help="Output file (default: stdout)")
+    export_parser.set_defaults(func=export)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
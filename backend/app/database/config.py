@@ -1,8 +1,10 @@
 # backend/app/database/config.py
 import os
 from .models import Base
-from sqlalchemy import create_engine
+from .fts import create_fts
+from sqlalchemy import create_engine, event, inspect, text
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 # Use test database for tests, production database otherwise
 DATABASE_URL = os.getenv(
@@ -12,11 +14,75 @@ DATABASE_URL = os.getenv(
 if "pytest" in os.environ.get("PYTEST_VERSION", ""):
     DATABASE_URL = "sqlite:///test.db"  # In-memory for tests
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    echo=True
-)
+# Named engine settings, selected with DB_PROFILE.
+# production: WAL lets readers run while the scheduler writes, synchronous=NORMAL
+# is durable across application crashes in WAL mode, and SQL logging is off.
+ENGINE_PROFILES = {
+    "dev": {
+        "echo": True,
+        "pool_size": 5,
+        "max_overflow": 10,
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "FULL",
+            "busy_timeout": 5000,
+            "foreign_keys": "ON"
+        }
+    },
+    "production": {
+        "echo": False,
+        "pool_size": 10,
+        "max_overflow": 20,
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "mmap_size": 256 * 1024 * 1024,
+            "cache_size": -64 * 1024,  # Negative values are KiB: 64 MiB page cache
+            "temp_store": "MEMORY",
+            "busy_timeout": 5000,
+            "foreign_keys": "ON"
+        }
+    }
+}
+DB_PROFILE = os.getenv("DB_PROFILE", "production")
+
+def engine_options(url: str, profile: str = DB_PROFILE) -> dict:
+    """
+    Keyword arguments for create_engine/create_async_engine under a profile.
+    Raises ValueError for unknown profiles.
+    """
+    if profile not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE {profile!r}; expected one of {sorted(ENGINE_PROFILES)}")
+    settings = ENGINE_PROFILES[profile]
+    options = {"echo": settings["echo"]}
+    if url.startswith("sqlite"):
+        options["connect_args"] = {"check_same_thread": False}
+        if ":memory:" in url or url.rstrip("/").endswith("sqlite:"):
+            return options  # Single-connection pool; sizing does not apply
+    options["pool_size"] = settings["pool_size"]
+    options["max_overflow"] = settings["max_overflow"]
+    if url.startswith("sqlite+aiosqlite"):
+        # aiosqlite defaults to NullPool for files, which rejects sizing and reconnects per session
+        options["poolclass"] = AsyncAdaptedQueuePool
+    return options
+
+def apply_pragmas(engine, profile: str = DB_PROFILE):
+    """Run the profile's SQLite PRAGMAs on every new connection of a (sync) engine."""
+    if engine.dialect.name != "sqlite":
+        return
+    pragmas = ENGINE_PROFILES[profile]["pragmas"]
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+apply_pragmas(engine)
 
 # Create a configured "Session" class
 SessionLocal = sessionmaker(
@@ -25,6 +91,50 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+def async_database_url(url: str) -> str:
+    """Map a sync database URL to its asyncio driver (aiosqlite / asyncpg)."""
+    for prefix, async_prefix in (("sqlite://", "sqlite+aiosqlite://"), ("postgresql://", "postgresql+asyncpg://")):
+        if url.startswith(prefix):
+            return async_prefix + url[len(prefix):]
+    return url
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", async_database_url(DATABASE_URL))
+
+# Created on first use so the async driver is only needed by code that uses it
+_async_engine = None
+_async_sessionmaker = None
+
+def get_async_engine():
+    """Return the shared AsyncEngine, creating it (with the DB_PROFILE settings) on first use."""
+    global _async_engine, _async_sessionmaker
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+        _async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL))
+        apply_pragmas(_async_engine.sync_engine)
+        _async_sessionmaker = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+    return _async_engine
+
+def AsyncSessionLocal():
+    """Create a new AsyncSession bound to the shared async engine."""
+    get_async_engine()
+    return _async_sessionmaker()
+
+async def get_async_db():
+    """
+    Async counterpart of get_db for async handlers.
+    Yields an AsyncSession and ensures it is closed after use.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def dispose_async_engine():
+    """Close the async engine's pooled connections (called at app shutdown)."""
+    global _async_engine, _async_sessionmaker
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _async_sessionmaker = None
+
 def get_db(): 
     """
     Dependency function to provide a database session.
@@ -36,6 +146,79 @@ def get_db():
     finally:
         db.close()
 
+def add_missing_columns(engine):
+    """
+    Add nullable columns introduced since a table was created
+    (create_all never alters existing tables).
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            present = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in present and column.nullable:
+                    column_type = column.type.compile(engine.dialect)
+                    connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+
+def collapse_duplicate_links(engine) -> int:
+    """
+    Keep one row per link (the most recently stored) in a papers table created
+    before links were unique, so the unique index on link can be built.
+    Rows referencing a removed paper are removed with it.
+    Returns:
+        Number of papers removed.
+    """
+    inspector = inspect(engine)
+    if "papers" not in inspector.get_table_names():
+        return 0
+    if "uq_papers_link" in {index["name"] for index in inspector.get_indexes("papers")}:
+        return 0  # Already unique
+    existing_tables = set(inspector.get_table_names())
+    dependents = [
+        (table, column) for table in Base.metadata.sorted_tables if table.name in existing_tables
+        for column in table.columns
+        if any(fk.column.table.name == "papers" for fk in column.foreign_keys)
+    ]
+    with engine.begin() as connection:
+        duplicates = [paper_id for (paper_id,) in connection.execute(text(
+            "SELECT id FROM papers WHERE id NOT IN (SELECT MAX(id) FROM papers GROUP BY link)"
+        ))]
+        for start in range(0, len(duplicates), 500):
+            chunk = duplicates[start:start + 500]
+            for table, column in dependents:
+                connection.execute(table.delete().where(column.in_(chunk)))
+            connection.execute(Base.metadata.tables["papers"].delete().where(
+                Base.metadata.tables["papers"].c.id.in_(chunk)
+            ))
+    return len(duplicates)
+
 def init_db():
     """Initialize database tables (called at app startup)."""
-    Base.metadata.create_all(engine)
\ No newline at end of file
+    Base.metadata.create_all(engine)
+    try:
+        add_missing_columns(engine)
+    except Exception as e:
+        print(f"Warning: could not add new columns: {e}")
+    # The unique index on link cannot be built while older rows repeat a link
+    try:
+        removed = collapse_duplicate_links(engine)
+        if removed:
+            print(f"Removed {removed} papers with duplicate links")
+    except Exception as e:
+        print(f"Warning: could not remove duplicate links: {e}")
+    # create_all skips existing tables, so add indexes introduced since they were created
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                index.create(engine, checkfirst=True)
+            except Exception as e:
+                print(f"Warning: could not create index {index.name}: {e}")
+    # after_create only fires for new tables, so backfill the FTS index on existing databases
+    try:
+        with engine.begin() as connection:
+            create_fts(connection)
+    except Exception as e:
+        print(f"Warning: could not create full-text index: {e}")
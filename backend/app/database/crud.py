@@ -1,35 +1,845 @@
+import base64
+import json
+from sqlalchemy import case, delete, func, insert, select, text, tuple_
 from sqlalchemy.orm import Session
-from .models import Paper
+from typing import Callable, Iterable, List, Optional, Tuple
+from .fts import FTS_TABLE, FTS_WEIGHTS, build_fts_query, fts_exists
+from .models import (
+    Paper, CrawlWatermark, Keyword, PaperEmbedding, NLPJob, Subscription, SchedulerLock,
+    paper_keywords as paper_keywords_table, paper_minhash_bands
+)
+from ..identifiers import canonical_paper_id
 from .config import get_db, SessionLocal  # Import from config
-from datetime import datetime
+import uuid
+from datetime import datetime, timedelta, timezone
 
-def save_paper(db: Session, paper: dict, keyword: str):
+def parse_published(value) -> Optional[datetime]:
     """
-    Save a paper to the database, including keywords and summary.
+    Parse an arXiv timestamp ("2024-01-05T00:00:00Z") into a naive UTC datetime.
+    Returns None if the value cannot be parsed.
     """
-    published = paper.get("published")
-    if isinstance(published, str):
+    if isinstance(value, str):
         try:
-            published = datetime.fromisoformat(published.replace("Z", "+00:00"))
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
         except ValueError:
-            published = None
-
-    db_paper = Paper(
-        title=paper.get("title"),
-        abstract=paper.get("abstract"),
-        link=paper.get("link"),
-        published=published,
-        keyword=keyword,
-        keywords=",".join(paper.get("keywords", [])),
-        summary=paper.get("summary", "")
+            return None
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+# Callbacks run with the search keywords of papers after each committed paper write
+_write_listeners: List[Callable[[Iterable[str]], None]] = []
+
+def add_write_listener(callback: Callable[[Iterable[str]], None]):
+    """Register a callback (e.g. cache invalidation) for committed paper writes."""
+    if callback not in _write_listeners:
+        _write_listeners.append(callback)
+
+def remove_write_listener(callback: Callable[[Iterable[str]], None]):
+    """Unregister a callback added with add_write_listener."""
+    if callback in _write_listeners:
+        _write_listeners.remove(callback)
+
+def _notify_write(keywords: Iterable[str]):
+    keywords = list(keywords)
+    for callback in list(_write_listeners):
+        try:
+            callback(keywords)
+        except Exception as e:
+            print(f"Error in paper write listener: {e}")
+
+_delete_listeners: List[Callable[[List[int]], None]] = []
+
+def add_delete_listener(callback: Callable[[List[int]], None]):
+    """Register a callback (e.g. the similarity index) for committed paper deletions."""
+    if callback not in _delete_listeners:
+        _delete_listeners.append(callback)
+
+def remove_delete_listener(callback: Callable[[List[int]], None]):
+    """Unregister a callback added with add_delete_listener."""
+    if callback in _delete_listeners:
+        _delete_listeners.remove(callback)
+
+def _notify_delete(paper_ids: Iterable[int]):
+    paper_ids = list(paper_ids)
+    for callback in list(_delete_listeners):
+        try:
+            callback(paper_ids)
+        except Exception as e:
+            print(f"Error in paper delete listener: {e}")
+
+# Rows per INSERT statement; keeps bound parameters under SQLite's limit
+BULK_CHUNK_SIZE = 500
+
+def _paper_row(paper: dict, keyword: str) -> dict:
+    keywords = paper.get("keywords") or []
+    canonical, version = canonical_paper_id(paper.get("link"))
+    return {
+        "title": paper.get("title"),
+        "abstract": paper.get("abstract"),
+        "link": paper.get("link"),
+        "published": parse_published(paper.get("published")),
+        "keyword": keyword,
+        "keywords": keywords if isinstance(keywords, str) else ",".join(keywords),
+        "summary": paper.get("summary") or "",
+        "canonical_id": paper.get("canonical_id") or canonical,
+        "version": paper.get("version") if paper.get("version") is not None else version,
+        "minhash": paper.get("minhash")
+    }
+
+def _dialect_insert(db: Session, target):
+    """INSERT construct supporting ON CONFLICT clauses for the session's dialect."""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(target)
+
+def normalize_keyword(name: str) -> str:
+    """Canonical form of an extracted keyword used in the keyword index."""
+    return " ".join((name or "").lower().split())
+
+def _split_keywords(keywords: Optional[str]) -> List[str]:
+    names = (normalize_keyword(name) for name in (keywords or "").split(","))
+    return list(dict.fromkeys(name for name in names if name))
+
+def _sync_keywords(db: Session, paper_keywords: dict):
+    """
+    Rewrite the keyword index rows for the given papers.
+    Args:
+        paper_keywords: Mapping of paper id to its comma-joined keywords.
+    """
+    if not paper_keywords:
+        return
+    per_paper = {paper_id: _split_keywords(keywords) for paper_id, keywords in paper_keywords.items()}
+    names = list(dict.fromkeys(name for names in per_paper.values() for name in names))
+    ids = {}
+    for start in range(0, len(names), BULK_CHUNK_SIZE):
+        chunk = names[start:start + BULK_CHUNK_SIZE]
+        db.execute(
+            _dialect_insert(db, Keyword).values([{"name": name} for name in chunk])
+            .on_conflict_do_nothing(index_elements=[Keyword.name])
+        )
+        ids.update(db.execute(select(Keyword.name, Keyword.id).where(Keyword.name.in_(chunk))).all())
+
+    paper_ids = list(per_paper)
+    for start in range(0, len(paper_ids), BULK_CHUNK_SIZE):
+        chunk = paper_ids[start:start + BULK_CHUNK_SIZE]
+        db.execute(delete(paper_keywords_table).where(paper_keywords_table.c.paper_id.in_(chunk)))
+    links = [
+        {"paper_id": paper_id, "keyword_id": ids[name], "position": position}
+        for paper_id, names in per_paper.items()
+        for position, name in enumerate(names)
+    ]
+    for start in range(0, len(links), BULK_CHUNK_SIZE):
+        db.execute(insert(paper_keywords_table), links[start:start + BULK_CHUNK_SIZE])
+
+def _upsert_statement(db: Session, rows: List[dict]):
+    """
+    Build an INSERT ... ON CONFLICT (canonical_id) DO UPDATE for the session's dialect.
+    An older arXiv version never replaces a newer stored one. The original
+    search keyword is kept, and existing keywords/summaries are not
+    overwritten by empty values (e.g. papers saved before NLP ran).
+    """
+    stmt = _dialect_insert(db, Paper).values(rows)
+    excluded = stmt.excluded
+    return stmt.on_conflict_do_update(
+        index_elements=[Paper.canonical_id],
+        set_={
+            "title": excluded.title,
+            "abstract": excluded.abstract,
+            "link": excluded.link,
+            "published": excluded.published,
+            "version": excluded.version,
+            "minhash": func.coalesce(excluded.minhash, Paper.minhash),
+            "keywords": func.coalesce(func.nullif(excluded.keywords, ""), Paper.keywords),
+            "summary": func.coalesce(func.nullif(excluded.summary, ""), Paper.summary)
+        },
+        where=func.coalesce(excluded.version, 0) >= func.coalesce(Paper.version, 0)
     )
-    db.add(db_paper)
-    db.commit()
-    db.refresh(db_paper)
-    return db_paper
+
+def save_papers_bulk(db: Session, papers: List[dict], keyword: str) -> dict:
+    """
+    Insert or update a batch of papers in a single transaction, deduplicated on
+    the canonical id (arXiv id without version, or link). Only the latest
+    version of a paper is kept.
+    Returns:
+        {"inserted": int, "updated": int, "papers": [Paper, ...]} with the stored
+        rows in input order (one per canonical id).
+    """
+    rows = {}
+    band_keys = {}
+    for paper in papers:
+        row = _paper_row(paper, keyword)
+        canonical = row["canonical_id"]
+        if not canonical:
+            continue
+        kept = rows.get(canonical)
+        # Last occurrence wins within the batch unless it is an older version
+        if kept is None or (row["version"] or 0) >= (kept["version"] or 0):
+            rows[canonical] = row
+            if paper.get("band_keys"):
+                band_keys[canonical] = paper["band_keys"]
+    if not rows:
+        return {"inserted": 0, "updated": 0, "papers": []}
+
+    canonical_ids = list(rows)
+    existing = set()
+    try:
+        for start in range(0, len(canonical_ids), BULK_CHUNK_SIZE):
+            chunk = canonical_ids[start:start + BULK_CHUNK_SIZE]
+            existing.update(c for (c,) in db.query(Paper.canonical_id).filter(Paper.canonical_id.in_(chunk)))
+            db.execute(_upsert_statement(db, [rows[c] for c in chunk]))
+            # Re-index keywords only for rows that brought some (empty keywords keep the old ones)
+            indexed = [c for c in chunk if rows[c]["keywords"] or c in band_keys]
+            if indexed:
+                ids = dict(db.query(Paper.canonical_id, Paper.id).filter(Paper.canonical_id.in_(indexed)))
+                _sync_keywords(db, {ids[c]: rows[c]["keywords"] for c in indexed if c in ids and rows[c]["keywords"]})
+                _sync_minhash_bands(db, {ids[c]: band_keys[c] for c in indexed if c in ids and c in band_keys})
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    _notify_write([keyword])
+
+    stored = {}
+    for start in range(0, len(canonical_ids), BULK_CHUNK_SIZE):
+        chunk = canonical_ids[start:start + BULK_CHUNK_SIZE]
+        stored.update(
+            (p.canonical_id, p)
+            for p in db.query(Paper).filter(Paper.canonical_id.in_(chunk)).populate_existing()
+        )
+    return {
+        "inserted": len(canonical_ids) - len(existing),
+        "updated": len(existing),
+        "papers": [stored[c] for c in canonical_ids if c in stored]
+    }
+
+def _sync_minhash_bands(db: Session, paper_bands: dict):
+    """
+    Rewrite the LSH band rows for the given papers.
+    Args:
+        paper_bands: Mapping of paper id to its band keys.
+    """
+    if not paper_bands:
+        return
+    paper_ids = list(paper_bands)
+    for start in range(0, len(paper_ids), BULK_CHUNK_SIZE):
+        chunk = paper_ids[start:start + BULK_CHUNK_SIZE]
+        db.execute(delete(paper_minhash_bands).where(paper_minhash_bands.c.paper_id.in_(chunk)))
+    rows = [
+        {"band_key": key, "paper_id": paper_id}
+        for paper_id, keys in paper_bands.items()
+        for key in set(keys)
+    ]
+    for start in range(0, len(rows), BULK_CHUNK_SIZE):
+        db.execute(insert(paper_minhash_bands), rows[start:start + BULK_CHUNK_SIZE])
+
+def find_by_canonical_ids(db: Session, canonical_ids: List[str]) -> dict:
+    """
+    Look up stored papers by canonical id.
+    Returns:
+        Mapping of canonical id to (paper id, stored version).
+    """
+    found = {}
+    canonical_ids = list(dict.fromkeys(c for c in canonical_ids if c))
+    for start in range(0, len(canonical_ids), BULK_CHUNK_SIZE):
+        chunk = canonical_ids[start:start + BULK_CHUNK_SIZE]
+        for canonical, paper_id, version in db.query(Paper.canonical_id, Paper.id, Paper.version).filter(
+            Paper.canonical_id.in_(chunk)
+        ):
+            found[canonical] = (paper_id, version)
+    return found
+
+def find_minhash_candidates(db: Session, band_keys: List[int]) -> dict:
+    """
+    Stored papers sharing at least one LSH band key.
+    Returns:
+        Mapping of paper id to its MinHash signature bytes.
+    """
+    keys = list(dict.fromkeys(band_keys))
+    paper_ids = set()
+    for start in range(0, len(keys), BULK_CHUNK_SIZE):
+        chunk = keys[start:start + BULK_CHUNK_SIZE]
+        paper_ids.update(
+            paper_id for (paper_id,) in db.execute(
+                select(paper_minhash_bands.c.paper_id).where(paper_minhash_bands.c.band_key.in_(chunk))
+            )
+        )
+    candidates = {}
+    paper_ids = list(paper_ids)
+    for start in range(0, len(paper_ids), BULK_CHUNK_SIZE):
+        chunk = paper_ids[start:start + BULK_CHUNK_SIZE]
+        candidates.update(db.query(Paper.id, Paper.minhash).filter(Paper.id.in_(chunk), Paper.minhash.isnot(None)))
+    return candidates
+
+def backfill_canonical_ids(db: Session) -> int:
+    """
+    Set canonical_id/version on papers stored before they existed, collapsing
+    rows that are versions of the same paper onto the latest version.
+    Returns:
+        Number of duplicate rows removed.
+    """
+    pending = db.query(Paper.id, Paper.link).filter(Paper.canonical_id.is_(None)).all()
+    if not pending:
+        return 0
+    groups = {}
+    for paper_id, link in pending:
+        canonical, version = canonical_paper_id(link)
+        groups.setdefault(canonical or link, []).append((version or 0, paper_id))
+    stored = find_by_canonical_ids(db, list(groups))
+
+    removed = []
+    updates = []
+    for canonical, members in groups.items():
+        if canonical in stored:
+            members.append((stored[canonical][1] or 0, stored[canonical][0]))
+        members.sort()
+        keep_version, keep_id = members[-1]
+        removed.extend(paper_id for _, paper_id in members[:-1])
+        if canonical not in stored or stored[canonical][0] != keep_id:
+            updates.append((keep_id, canonical, keep_version or None))
+    try:
+        for start in range(0, len(removed), BULK_CHUNK_SIZE):
+            chunk = removed[start:start + BULK_CHUNK_SIZE]
+            db.execute(delete(paper_keywords_table).where(paper_keywords_table.c.paper_id.in_(chunk)))
+            db.execute(delete(paper_minhash_bands).where(paper_minhash_bands.c.paper_id.in_(chunk)))
+            db.execute(delete(PaperEmbedding).where(PaperEmbedding.paper_id.in_(chunk)))
+            db.execute(delete(Paper).where(Paper.id.in_(chunk)))
+        for paper_id, canonical, version in updates:
+            db.query(Paper).filter(Paper.id == paper_id).update(
+                {"canonical_id": canonical, "version": version}, synchronize_session=False
+            )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    if removed:
+        _notify_delete(removed)
+    return len(removed)
+
+def save_paper(db: Session, paper: dict, keyword: str):
+    """
+    Save a paper to the database, including keywords and summary.
+    An existing paper with the same link is updated instead of duplicated.
+    """
+    return save_papers_bulk(db, [paper], keyword)["papers"][0]
 
 def get_papers_by_keyword(db: Session, keyword: str, limit: int = 10):
     """
-    Retrieve papers by keyword.
+    Retrieve papers matching a query, best matches first.
+    Uses the FTS5 index over title, abstract, extracted keywords, summary and
+    search keyword (ranked by bm25, supporting "phrases" and prefix*), and
+    falls back to a substring match on the search keyword without it.
+    """
+    if fts_exists(db.connection()):
+        return search_papers(db, keyword, limit=limit)
+    return db.query(Paper).filter(Paper.keyword.ilike(f"%{keyword}%")).limit(limit).all()
+
+def search_papers(db: Session, query: str, limit: int = 10) -> List[Paper]:
+    """
+    Full-text search over papers, ranked by bm25 (ties in insertion order).
+    Returns an empty list when the query has no searchable terms.
     """
-    return db.query(Paper).filter(Paper.keyword.ilike(f"%{keyword}%")).limit(limit).all() 
\ No newline at end of file
+    match = build_fts_query(query)
+    if match is None:
+        return []
+    weights = ", ".join(str(w) for w in FTS_WEIGHTS)
+    statement = text(
+        f"SELECT papers.* FROM {FTS_TABLE} JOIN papers ON papers.id = {FTS_TABLE}.rowid "
+        f"WHERE {FTS_TABLE} MATCH :match "
+        f"ORDER BY bm25({FTS_TABLE}, {weights}), papers.id LIMIT :limit"
+    )
+    return db.query(Paper).from_statement(statement).params(match=match, limit=limit).all()
+
+def encode_cursor(paper: Paper) -> str:
+    """Opaque pagination cursor pointing just after `paper` in (published, id) desc order."""
+    payload = json.dumps([paper.published.isoformat(), paper.id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decode a cursor produced by encode_cursor.
+    Raises ValueError if it is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        published, paper_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(published), int(paper_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+def _filter_by_query(db: Session, stmt, query: Optional[str]):
+    """
+    Restrict a Paper query to full-text matches of `query` (substring match on
+    the search keyword without the FTS index).
+    Returns None if the query has no searchable terms.
+    """
+    if query is None:
+        return stmt
+    if fts_exists(db.connection()):
+        match = build_fts_query(query)
+        if match is None:
+            return None
+        matching = text(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match").bindparams(match=match)
+        return stmt.filter(Paper.id.in_(matching))
+    return stmt.filter(Paper.keyword.ilike(f"%{query}%"))
+
+def list_papers(
+    db: Session,
+    query: Optional[str] = None,
+    page_size: int = 10,
+    cursor: Optional[str] = None
+) -> Tuple[List[Paper], Optional[str]]:
+    """
+    One page of papers, newest first, using keyset pagination.
+    Each page is a range scan of the (published, id) index that starts after
+    the cursor, so deep pages cost the same as the first one (unlike OFFSET).
+    Args:
+        query: Optional full-text filter (same syntax as get_papers_by_keyword).
+        page_size: Papers per page.
+        cursor: next_cursor of the previous page; None for the first page.
+    Returns:
+        (papers, next_cursor); next_cursor is None on the last page.
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    stmt = _filter_by_query(db, db.query(Paper), query)
+    if stmt is None:
+        return [], None
+    if cursor:
+        published, paper_id = decode_cursor(cursor)
+        stmt = stmt.filter(tuple_(Paper.published, Paper.id) < tuple_(published, paper_id))
+
+    # One extra row tells whether another page exists
+    papers = stmt.order_by(Paper.published.desc(), Paper.id.desc()).limit(page_size + 1).all()
+    if len(papers) <= page_size:
+        return papers, None
+    papers = papers[:page_size]
+    return papers, encode_cursor(papers[-1])
+
+def get_papers_by_extracted_keyword(db: Session, keyword: str, limit: int = 10) -> List[Paper]:
+    """
+    Retrieve papers whose extracted keywords include `keyword` (case-insensitive),
+    newest first, via the keyword index.
+    """
+    return (
+        db.query(Paper)
+        .join(paper_keywords_table, paper_keywords_table.c.paper_id == Paper.id)
+        .join(Keyword, Keyword.id == paper_keywords_table.c.keyword_id)
+        .filter(Keyword.name == normalize_keyword(keyword))
+        .order_by(Paper.published.desc(), Paper.id.desc())
+        .limit(limit)
+        .all()
+    )
+
+def get_keyword_facets(db: Session, query: Optional[str] = None, limit: int = 20) -> List[dict]:
+    """
+    Count extracted keywords over the papers matching `query` (all papers if None).
+    The counting runs in SQL over the keyword index.
+    Returns:
+        [{"keyword": str, "count": int}, ...], most frequent first.
+    """
+    count = func.count(paper_keywords_table.c.paper_id).label("count")
+    stmt = (
+        select(Keyword.name, count)
+        .join(paper_keywords_table, paper_keywords_table.c.keyword_id == Keyword.id)
+        .group_by(Keyword.name)
+        .order_by(count.desc(), Keyword.name)
+        .limit(limit)
+    )
+    if query is not None:
+        if fts_exists(db.connection()):
+            match = build_fts_query(query)
+            if match is None:
+                return []
+            matching = text(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match").bindparams(match=match)
+        else:
+            matching = select(Paper.id).where(Paper.keyword.ilike(f"%{query}%"))
+        stmt = stmt.where(paper_keywords_table.c.paper_id.in_(matching))
+    return [{"keyword": name, "count": n} for name, n in db.execute(stmt)]
+
+def backfill_keyword_index(db: Session, batch_size: int = 1000) -> int:
+    """
+    Populate the keyword index from Paper.keywords for papers that have
+    keywords but no index rows (e.g. stored before the index existed).
+    Papers indexed meanwhile by other writers are skipped, so it is safe to
+    run next to the NLP workers.
+    Returns:
+        Number of papers indexed.
+    """
+    unindexed = ~select(paper_keywords_table.c.paper_id).where(
+        paper_keywords_table.c.paper_id == Paper.id
+    ).exists()
+    indexed = 0
+    last_id = 0
+    while True:
+        # Keyset batches by id: indexing a batch never shifts the next one
+        batch = dict(
+            db.query(Paper.id, Paper.keywords)
+            .filter(Paper.id > last_id, Paper.keywords.isnot(None), Paper.keywords != "", unindexed)
+            .order_by(Paper.id)
+            .limit(batch_size)
+        )
+        if not batch:
+            break
+        _sync_keywords(db, batch)
+        db.commit()
+        indexed += len(batch)
+        last_id = max(batch)
+    return indexed
+
+def get_papers_by_ids(db: Session, ids: List[int]) -> List[Paper]:
+    """Load papers by primary key, in the order of `ids` (missing ids are skipped)."""
+    if not ids:
+        return []
+    found = {paper.id: paper for paper in db.query(Paper).filter(Paper.id.in_(ids))}
+    return [found[paper_id] for paper_id in ids if paper_id in found]
+
+def save_embeddings(db: Session, vectors: dict, model: str, dim: int):
+    """
+    Insert or replace embeddings.
+    Args:
+        vectors: Mapping of paper id to the float32 vector as bytes.
+        model: Encoder that produced the vectors.
+        dim: Vector length.
+    """
+    if not vectors:
+        return
+    rows = [
+        {"paper_id": paper_id, "model": model, "dim": dim, "vector": vector, "created_at": datetime.utcnow()}
+        for paper_id, vector in vectors.items()
+    ]
+    for start in range(0, len(rows), BULK_CHUNK_SIZE):
+        stmt = _dialect_insert(db, PaperEmbedding).values(rows[start:start + BULK_CHUNK_SIZE])
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[PaperEmbedding.paper_id],
+            set_={
+                "model": stmt.excluded.model,
+                "dim": stmt.excluded.dim,
+                "vector": stmt.excluded.vector,
+                "created_at": stmt.excluded.created_at
+            }
+        ))
+    db.commit()
+
+def iter_embeddings(db: Session, model: str, batch_size: int = 1000):
+    """Stream (paper_id, vector bytes) of stored embeddings produced by `model`."""
+    rows = db.query(PaperEmbedding.paper_id, PaperEmbedding.vector).filter(PaperEmbedding.model == model)
+    yield from rows.yield_per(batch_size)
+
+def get_papers_without_embeddings(db: Session, model: str, limit: int = 64) -> List[Tuple[int, str]]:
+    """Return up to `limit` (paper_id, abstract) pairs that have no embedding from `model`."""
+    embedded = select(PaperEmbedding.paper_id).where(PaperEmbedding.model == model)
+    return [
+        (paper_id, abstract)
+        for paper_id, abstract in db.query(Paper.id, Paper.abstract)
+        .filter(Paper.id.not_in(embedded))
+        .order_by(Paper.id)
+        .limit(limit)
+    ]
+
+def iter_papers(
+    db: Session,
+    query: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    batch_size: int = 1000
+):
+    """
+    Stream stored papers in id order with server-side iteration (yield_per),
+    so memory stays bounded by `batch_size` rows whatever the table size.
+    Args:
+        query: Optional full-text filter (same syntax as /papers).
+        since: Only papers published at or after this time (datetime or ISO string).
+        until: Only papers published before this time.
+    """
+    stmt = _filter_by_query(db, db.query(Paper), query)
+    if stmt is None:
+        return
+    if since is not None:
+        stmt = stmt.filter(Paper.published >= parse_published(since))
+    if until is not None:
+        stmt = stmt.filter(Paper.published < parse_published(until))
+    yield from stmt.order_by(Paper.id).execution_options(stream_results=True).yield_per(batch_size)
+
+def iter_abstracts(db: Session, batch_size: int = 1000):
+    """
+    Stream the abstracts of all stored papers without loading every row at once.
+    """
+    for (abstract,) in db.query(Paper.abstract).yield_per(batch_size):
+        yield abstract
+
+def get_watermark(db: Session, keyword: str) -> Optional[CrawlWatermark]:
+    """
+    Return the high-water mark (newest paper seen) for a keyword, if any.
+    """
+    return db.get(CrawlWatermark, keyword)
+
+def update_watermark(db: Session, keyword: str, papers: List[dict]) -> Optional[CrawlWatermark]:
+    """
+    Advance a keyword's high-water mark to the newest of `papers`.
+    The mark never moves backwards.
+    """
+    newest = None
+    for paper in papers:
+        published = parse_published(paper.get("published"))
+        if published is not None and (newest is None or published > newest[0]):
+            newest = (published, paper.get("arxiv_id"))
+
+    watermark = db.get(CrawlWatermark, keyword)
+    if newest is None:
+        return watermark
+    if watermark is None:
+        watermark = CrawlWatermark(keyword=keyword, last_published=newest[0], last_arxiv_id=newest[1])
+        db.add(watermark)
+    elif newest[0] >= watermark.last_published:
+        watermark.last_published, watermark.last_arxiv_id = newest
+    watermark.updated_at = datetime.utcnow()
+    db.commit()
+    return watermark
+
+def enqueue_nlp_jobs(db: Session, paper_ids: List[int]) -> List[NLPJob]:
+    """
+    Queue NLP processing for papers. Papers that already have a pending or
+    running job reuse it instead of getting a second one.
+    Returns:
+        One job per distinct paper id, in input order.
+    """
+    paper_ids = list(dict.fromkeys(paper_ids))
+    if not paper_ids:
+        return []
+    active = {}
+    for start in range(0, len(paper_ids), BULK_CHUNK_SIZE):
+        chunk = paper_ids[start:start + BULK_CHUNK_SIZE]
+        active.update(
+            (job.paper_id, job) for job in db.query(NLPJob).filter(
+                NLPJob.paper_id.in_(chunk), NLPJob.status.in_(("pending", "running"))
+            )
+        )
+    now = datetime.utcnow()
+    new_jobs = [
+        NLPJob(paper_id=paper_id, status="pending", attempts=0, available_at=now, created_at=now, updated_at=now)
+        for paper_id in paper_ids if paper_id not in active
+    ]
+    db.add_all(new_jobs)
+    db.commit()
+    active.update((job.paper_id, job) for job in new_jobs)
+    return [active[paper_id] for paper_id in paper_ids]
+
+def claim_nlp_jobs(
+    db: Session,
+    limit: int = 16,
+    lease_seconds: float = 600,
+    max_attempts: Optional[int] = None
+) -> List[NLPJob]:
+    """
+    Atomically claim up to `limit` jobs for one worker.
+    Pending jobs whose backoff has passed and running jobs whose lease expired
+    (their worker died) are eligible, oldest first. Claimed jobs are marked
+    running under a fresh lease token, so concurrent workers never share a job.
+    With `max_attempts`, expired jobs that already used their attempts are
+    failed instead, so a job that keeps killing its worker is not retried forever.
+    """
+    now = datetime.utcnow()
+    eligible = (
+        select(NLPJob.id)
+        .where(NLPJob.status.in_(("pending", "running")), NLPJob.available_at <= now)
+        .order_by(NLPJob.id)
+        .limit(limit)
+    )
+    token = uuid.uuid4().hex
+    try:
+        if max_attempts is not None:
+            db.query(NLPJob).filter(
+                NLPJob.status == "running",
+                NLPJob.available_at <= now,
+                NLPJob.attempts >= max_attempts
+            ).update({
+                "status": "failed",
+                "lease_token": None,
+                "last_error": "lease expired on the last attempt",
+                "updated_at": now
+            }, synchronize_session=False)
+        db.query(NLPJob).filter(
+            NLPJob.id.in_(eligible),
+            NLPJob.status.in_(("pending", "running")),
+            NLPJob.available_at <= now
+        ).update({
+            "status": "running",
+            "lease_token": token,
+            "attempts": NLPJob.attempts + 1,
+            "available_at": now + timedelta(seconds=lease_seconds),
+            "updated_at": now
+        }, synchronize_session=False)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return db.query(NLPJob).filter(NLPJob.lease_token == token).order_by(NLPJob.id).all()
+
+def complete_nlp_jobs(db: Session, job_ids: List[int]):
+    """Mark claimed jobs as done."""
+    if not job_ids:
+        return
+    db.query(NLPJob).filter(NLPJob.id.in_(job_ids)).update(
+        {"status": "done", "lease_token": None, "last_error": None, "updated_at": datetime.utcnow()},
+        synchronize_session=False
+    )
+    db.commit()
+
+def fail_nlp_jobs(db: Session, job_ids: List[int], error: str, max_attempts: int = 3, retry_delay: float = 30):
+    """
+    Record a failed attempt. Jobs with attempts left go back to pending after
+    an exponential backoff (retry_delay * 2^(attempts - 1)); the rest are failed.
+    """
+    now = datetime.utcnow()
+    for job in db.query(NLPJob).filter(NLPJob.id.in_(job_ids)):
+        job.last_error = error
+        job.lease_token = None
+        job.updated_at = now
+        if job.attempts >= max_attempts:
+            job.status = "failed"
+        else:
+            job.status = "pending"
+            job.available_at = now + timedelta(seconds=retry_delay * 2 ** (job.attempts - 1))
+    db.commit()
+
+def get_nlp_job(db: Session, job_id: int) -> Optional[NLPJob]:
+    """Return a job by id, if any."""
+    return db.get(NLPJob, job_id)
+
+def count_nlp_jobs(db: Session) -> dict:
+    """Return the number of jobs per status."""
+    return dict(db.query(NLPJob.status, func.count(NLPJob.id)).group_by(NLPJob.status).all())
+
+SUBSCRIPTION_FIELDS = ("keyword", "interval_minutes", "max_results", "enabled")
+
+def _validate_subscription(fields: dict) -> dict:
+    """Normalize and check subscription fields; raises ValueError on bad values."""
+    fields = {name: value for name, value in fields.items() if name in SUBSCRIPTION_FIELDS and value is not None}
+    if "keyword" in fields:
+        fields["keyword"] = " ".join(fields["keyword"].split())
+        if not fields["keyword"]:
+            raise ValueError("keyword must not be empty")
+    if fields.get("interval_minutes", 1) < 1:
+        raise ValueError("interval_minutes must be at least 1")
+    if fields.get("max_results", 1) < 1:
+        raise ValueError("max_results must be at least 1")
+    return fields
+
+def list_subscriptions(db: Session, enabled_only: bool = False) -> List[Subscription]:
+    """Return keyword subscriptions ordered by id."""
+    query = db.query(Subscription)
+    if enabled_only:
+        query = query.filter(Subscription.enabled.is_(True))
+    return query.order_by(Subscription.id).all()
+
+def get_subscription(db: Session, subscription_id: int) -> Optional[Subscription]:
+    """Return a subscription by id, if any."""
+    return db.get(Subscription, subscription_id)
+
+def create_subscription(db: Session, keyword: str, **fields) -> Subscription:
+    """
+    Subscribe to a keyword.
+    Raises ValueError for invalid fields or a keyword that is already subscribed.
+    """
+    fields = _validate_subscription(dict(fields, keyword=keyword))
+    if db.query(Subscription).filter(Subscription.keyword == fields["keyword"]).first() is not None:
+        raise ValueError(f"Keyword {fields['keyword']!r} is already subscribed")
+    subscription = Subscription(**fields)
+    db.add(subscription)
+    db.commit()
+    db.refresh(subscription)
+    return subscription
+
+def update_subscription(db: Session, subscription_id: int, **fields) -> Optional[Subscription]:
+    """
+    Change a subscription's keyword, cadence, budget or enabled flag (None values are ignored).
+    Returns None if it does not exist; raises ValueError like create_subscription.
+    """
+    subscription = db.get(Subscription, subscription_id)
+    if subscription is None:
+        return None
+    fields = _validate_subscription(fields)
+    keyword = fields.get("keyword")
+    if keyword and keyword != subscription.keyword and db.query(Subscription).filter(
+        Subscription.keyword == keyword
+    ).first() is not None:
+        raise ValueError(f"Keyword {keyword!r} is already subscribed")
+    for name, value in fields.items():
+        setattr(subscription, name, value)
+    subscription.updated_at = datetime.utcnow()
+    db.commit()
+    db.refresh(subscription)
+    return subscription
+
+def delete_subscription(db: Session, subscription_id: int) -> bool:
+    """Delete a subscription; returns False if it does not exist."""
+    subscription = db.get(Subscription, subscription_id)
+    if subscription is None:
+        return False
+    db.delete(subscription)
+    db.commit()
+    return True
+
+def record_subscription_run(
+    db: Session,
+    subscription_id: int,
+    duration: float,
+    paper_count: int,
+    error: Optional[str] = None
+) -> Optional[Subscription]:
+    """Store the duration and new-paper count of a subscription's latest crawl."""
+    subscription = db.get(Subscription, subscription_id)
+    if subscription is None:
+        return None
+    subscription.last_run_at = datetime.utcnow()
+    subscription.last_duration = duration
+    subscription.last_paper_count = paper_count
+    subscription.total_papers = (subscription.total_papers or 0) + paper_count
+    subscription.last_error = error
+    db.commit()
+    return subscription
+
+def acquire_lock(db: Session, name: str, owner: str, lease_seconds: float) -> bool:
+    """
+    Take or renew a named lease in one statement.
+    The lock is granted when it is free, expired, or already held by `owner`;
+    the expiry is then pushed `lease_seconds` into the future.
+    Returns:
+        True if `owner` holds the lock afterwards.
+    """
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=lease_seconds)
+    stmt = _dialect_insert(db, SchedulerLock).values(name=name, owner=owner, expires_at=expires_at, acquired_at=now)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[SchedulerLock.name],
+        set_={
+            "owner": stmt.excluded.owner,
+            "expires_at": stmt.excluded.expires_at,
+            # Keep the original acquisition time on renewals
+            "acquired_at": case((SchedulerLock.owner == owner, SchedulerLock.acquired_at), else_=stmt.excluded.acquired_at)
+        },
+        where=(SchedulerLock.owner == owner) | (SchedulerLock.expires_at <= now)
+    )
+    try:
+        db.execute(stmt)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    holder = db.execute(select(SchedulerLock.owner).where(SchedulerLock.name == name)).scalar()
+    return holder == owner
+
+def release_lock(db: Session, name: str, owner: str) -> bool:
+    """Give up a lease held by `owner`; returns False if it was not held."""
+    released = db.query(SchedulerLock).filter(
+        SchedulerLock.name == name, SchedulerLock.owner == owner
+    ).delete(synchronize_session=False)
+    db.commit()
+    return bool(released)
+
+def get_lock(db: Session, name: str) -> Optional[SchedulerLock]:
+    """Return the current holder of a lock, if any (it may have expired)."""
+    return db.get(SchedulerLock, name)
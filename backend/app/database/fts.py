@@ -0,0 +1,96 @@
+# fts.py
+import re
+from typing import Optional
+from sqlalchemy import text
+
+FTS_TABLE = "papers_fts"
+FTS_COLUMNS = ("title", "abstract", "keywords", "summary", "keyword")
+# bm25 column weights, in FTS_COLUMNS order: title and keyword matches rank highest
+FTS_WEIGHTS = (10.0, 1.0, 5.0, 2.0, 5.0)
+
+# Quoted phrases, or bare terms with an optional trailing * for prefix search
+QUERY_TOKEN = re.compile(r'"([^"]*)"|(\S+)')
+WORD = re.compile(r"\w+")
+
+_columns = ", ".join(FTS_COLUMNS)
+_new = ", ".join(f"new.{c}" for c in FTS_COLUMNS)
+_old = ", ".join(f"old.{c}" for c in FTS_COLUMNS)
+
+# External-content FTS5 table over papers, kept in sync by triggers
+FTS_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        {_columns}, content='papers', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS papers_fts_insert AFTER INSERT ON papers BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, {_columns}) VALUES (new.id, {_new});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS papers_fts_delete AFTER DELETE ON papers BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_columns}) VALUES ('delete', old.id, {_old});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS papers_fts_update AFTER UPDATE ON papers BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_columns}) VALUES ('delete', old.id, {_old});
+        INSERT INTO {FTS_TABLE}(rowid, {_columns}) VALUES (new.id, {_new});
+    END""",
+]
+
+FTS_DROP = [
+    "DROP TRIGGER IF EXISTS papers_fts_insert",
+    "DROP TRIGGER IF EXISTS papers_fts_delete",
+    "DROP TRIGGER IF EXISTS papers_fts_update",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+def fts_exists(connection) -> bool:
+    """Check whether the FTS index exists (SQLite only)."""
+    if connection.dialect.name != "sqlite":
+        return False
+    row = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": FTS_TABLE}
+    ).first()
+    return row is not None
+
+def create_fts(connection):
+    """
+    Create the FTS index and its sync triggers if missing.
+    An index added to an existing database is backfilled from the papers table.
+    Other dialects are left untouched.
+    """
+    if connection.dialect.name != "sqlite":
+        return
+    existed = fts_exists(connection)
+    for statement in FTS_DDL:
+        connection.execute(text(statement))
+    if not existed:
+        connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+def drop_fts(connection):
+    """Drop the FTS index and its triggers."""
+    if connection.dialect.name != "sqlite":
+        return
+    for statement in FTS_DROP:
+        connection.execute(text(statement))
+
+def build_fts_query(query: str) -> Optional[str]:
+    """
+    Turn user input into a safe FTS5 MATCH expression.
+    Quoted text becomes a phrase, a trailing * makes a prefix query, and all
+    other punctuation is dropped so input can never form FTS5 syntax.
+    Terms are ANDed, e.g. 'neural "graph network" optim*' ->
+    '"neural" "graph network" "optim"*'.
+    Returns:
+        The MATCH expression, or None if the input has no searchable terms.
+    """
+    terms = []
+    for phrase, bare in QUERY_TOKEN.findall(query or ""):
+        if phrase:
+            words = WORD.findall(phrase)
+            if words:
+                terms.append('"' + " ".join(words) + '"')
+            continue
+        prefix = bare.endswith("*")
+        words = WORD.findall(bare)
+        for i, word in enumerate(words):
+            star = "*" if prefix and i == len(words) - 1 else ""
+            terms.append(f'"{word}"{star}')
+    return " ".join(terms) or None
@@ -1,6 +1,7 @@
 # models.py
-from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy import BigInteger, Boolean, Column, Float, ForeignKey, Integer, LargeBinary, String, Table, Text, DateTime, Index, event
 from sqlalchemy.orm import declarative_base
+from .fts import create_fts, drop_fts
 import datetime
 
 Base = declarative_base()
@@ -17,5 +18,118 @@ class Paper(Base):
     keyword = Column(String, nullable=False)
     keywords = Column(Text)  # Store keywords as comma-separated string
     summary = Column(Text)   # Store generated summary
+    canonical_id = Column(String)       # arXiv id without version, or the link for other sources
+    version = Column(Integer)           # arXiv version of the stored (latest) copy
+    minhash = Column(LargeBinary)       # MinHash signature of title + abstract (uint32 array)
 
+    __table_args__ = (
+        Index("uq_papers_link", "link", unique=True),
+        # One row per paper across versions; save_papers_bulk upserts on this
+        Index("uq_papers_canonical_id", "canonical_id", unique=True),
+        # Keyset pagination of listings ordered by (published, id) desc
+        Index("ix_papers_published_id", "published", "id"),
+    )
 
+# Full-text index over papers (SQLite FTS5), created and dropped with the table
+event.listen(Paper.__table__, "after_create", lambda target, connection, **kw: create_fts(connection))
+event.listen(Paper.__table__, "before_drop", lambda target, connection, **kw: drop_fts(connection))
+
+class Keyword(Base):
+    """Distinct extracted keyword (normalized to lowercase)"""
+    __tablename__ = "keywords"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False, unique=True, index=True)
+
+# Which extracted keywords each paper has; mirrors Paper.keywords for indexed lookups
+paper_keywords = Table(
+    "paper_keywords",
+    Base.metadata,
+    Column("paper_id", Integer, ForeignKey("papers.id", ondelete="CASCADE"), primary_key=True),
+    Column("keyword_id", Integer, ForeignKey("keywords.id", ondelete="CASCADE"), primary_key=True),
+    Column("position", Integer, nullable=False, default=0),  # Rank within the paper's keywords
+    Index("ix_paper_keywords_keyword_id", "keyword_id", "paper_id"),
+)
+
+class PaperEmbedding(Base):
+    """Dense abstract embedding of a paper (float32 vector stored as raw bytes)"""
+    __tablename__ = "paper_embeddings"
+
+    paper_id = Column(Integer, ForeignKey("papers.id", ondelete="CASCADE"), primary_key=True)
+    model = Column(String, nullable=False)         # Encoder that produced the vector
+    dim = Column(Integer, nullable=False)
+    vector = Column(LargeBinary, nullable=False)   # float32, little-endian
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+
+# LSH band keys of each paper's MinHash signature, for near-duplicate lookups
+paper_minhash_bands = Table(
+    "paper_minhash_bands",
+    Base.metadata,
+    Column("band_key", BigInteger, primary_key=True),
+    Column("paper_id", Integer, ForeignKey("papers.id", ondelete="CASCADE"), primary_key=True),
+    Index("ix_paper_minhash_bands_paper_id", "paper_id"),
+)
+
+class NLPJob(Base):
+    """Queued keyword/summary/embedding work for a stored paper"""
+    __tablename__ = "nlp_jobs"
+
+    id = Column(Integer, primary_key=True)
+    paper_id = Column(Integer, ForeignKey("papers.id", ondelete="CASCADE"), nullable=False, index=True)
+    status = Column(String, nullable=False, default="pending")  # pending, running, done or failed
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text)
+    lease_token = Column(String)                 # Set by the worker that claimed the job
+    available_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)  # Retry backoff / lease expiry
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # Workers claim the oldest available jobs of a status
+        Index("ix_nlp_jobs_status_available", "status", "available_at", "id"),
+    )
+
+class NLPCacheEntry(Base):
+    """Cached NLP output (summary or keywords) keyed by a content hash"""
+    __tablename__ = "nlp_cache"
+
+    key = Column(String(64), primary_key=True)
+    kind = Column(String, nullable=False)          # "summary" or "keywords"
+    value = Column(Text)                           # JSON-encoded output
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+    accessed_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False, index=True)
+
+class CrawlWatermark(Base):
+    """Newest paper seen per crawled keyword (high-water mark for incremental fetches)"""
+    __tablename__ = "crawl_watermarks"
+
+    keyword = Column(String, primary_key=True)
+    last_published = Column(DateTime, nullable=False)
+    last_arxiv_id = Column(String)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+
+class Subscription(Base):
+    """Keyword crawled on a schedule, with its cadence, result budget and last-run stats"""
+    __tablename__ = "subscriptions"
+
+    id = Column(Integer, primary_key=True)
+    keyword = Column(String, nullable=False, unique=True, index=True)
+    interval_minutes = Column(Integer, nullable=False, default=1440)  # Cadence between crawls
+    max_results = Column(Integer, nullable=False, default=5)          # Result budget per crawl
+    enabled = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+    last_run_at = Column(DateTime)
+    last_duration = Column(Float)          # Seconds
+    last_paper_count = Column(Integer)     # New papers saved by the last run
+    total_papers = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text)
+
+class SchedulerLock(Base):
+    """Named lease held by one process at a time (scheduler leadership, per-keyword crawl runs)"""
+    __tablename__ = "scheduler_locks"
+
+    name = Column(String, primary_key=True)
+    owner = Column(String, nullable=False)           # Holder's process id (host:pid:uuid)
+    expires_at = Column(DateTime, nullable=False)    # Others may take the lock after this
+    acquired_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
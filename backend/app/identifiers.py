@@ -0,0 +1,27 @@
+import re
+from typing import Optional, Tuple
+
+ARXIV_ID_PATTERN = re.compile(r"/abs/(?P<id>.+?)(?:v(?P<version>\d+))?$")
+
+def parse_arxiv_id(link: str):
+    """
+    Split an arXiv abs link into its id and version,
+    e.g. "http://arxiv.org/abs/2401.01234v2" -> ("2401.01234", 2).
+    Returns (None, None) for links that are not arXiv abs links.
+    """
+    match = ARXIV_ID_PATTERN.search(link or "")
+    if not match:
+        return None, None
+    version = match.group("version")
+    return match.group("id"), int(version) if version else None
+
+def canonical_paper_id(link: Optional[str]) -> Tuple[Optional[str], Optional[int]]:
+    """
+    Identity of a paper across versions.
+    Returns:
+        (arXiv id without version, version) for arXiv abs links, else (link, None).
+    """
+    arxiv_id, version = parse_arxiv_id(link)
+    if arxiv_id is None:
+        return link or None, None
+    return arxiv_id, version
@@ -1,78 +1,663 @@
-from fastapi import FastAPI, Depends
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional
+import numpy as np
+from fastapi import FastAPI, Depends, Header, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
 from contextlib import asynccontextmanager
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from .services.arxiv import ArxivCrawler
 from .services.nlp import NLPProcessor
-from .database.crud import save_paper, get_papers_by_keyword
-from .database.config import get_db, init_db
+from .services.cache import NLPCache
+from .database.crud import (
+    save_papers_bulk, get_papers_by_keyword, get_papers_by_extracted_keyword,
+    get_keyword_facets, backfill_keyword_index, iter_abstracts, list_papers, add_write_listener,
+    add_delete_listener,
+    get_papers_by_ids, save_embeddings, iter_embeddings, get_papers_without_embeddings,
+    backfill_canonical_ids, iter_papers, enqueue_nlp_jobs, get_nlp_job, count_nlp_jobs,
+    list_subscriptions, get_subscription, create_subscription, update_subscription, delete_subscription
+)
+from .database.config import get_db, get_async_db, dispose_async_engine, init_db, engine, SessionLocal
 from .services.scheduler import Scheduler
+from .services.executor import executors
+from .services.response_cache import ResponseCache
+from .services.similarity import EmbeddingIndex
+from .services.dedup import Deduplicator
+from .services.export import encode_export
+from .services.jobs import NLPJobWorker
+from .services.metrics import (
+    registry as metrics_registry, track_commits, HTTP_ERRORS, HTTP_REQUESTS, HTTP_REQUEST_SECONDS
+)
 
-app = FastAPI()
 crawler = ArxivCrawler(max_results=5)
-nlp = NLPProcessor()
-scheduler = Scheduler()
+# Model weights load lazily, see warm_up_nlp
+nlp = NLPProcessor(
+    cache=NLPCache(),
+    profile=os.getenv("NLP_PROFILE", "auto"),
+    num_threads=int(os.getenv("NLP_NUM_THREADS", "0")) or None,
+    keyword_engine=os.getenv("KEYWORD_ENGINE", "yake"),
+    keyword_workers=int(os.getenv("KEYWORD_WORKERS", "0")) or None
+)
+# /papers responses; dropped whenever papers are saved
+papers_cache = ResponseCache(
+    max_entries=int(os.getenv("PAPERS_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("PAPERS_CACHE_TTL", "30"))
+)
+
+def invalidate_papers_cache(keywords):
+    """/papers filters by full-text query, which papers saved under any keyword can match."""
+    papers_cache.clear()
+
+add_write_listener(invalidate_papers_cache)
+# Abstract embeddings for /similar, memory-mapped from disk and appended to on ingest
+deduplicator = Deduplicator(threshold=float(os.getenv("DEDUP_THRESHOLD", "0.8")))
+embedding_index = EmbeddingIndex(os.getenv("EMBEDDINGS_DIR", "embeddings"), model_name=nlp.model_name)
+add_delete_listener(embedding_index.remove)
 
 init_db()
 
+def collapse_versions():
+    """Give papers stored before canonical ids existed one row per paper."""
+    db = SessionLocal()
+    try:
+        removed = backfill_canonical_ids(db)
+        if removed:
+            print(f"Removed {removed} duplicate paper versions")
+    except Exception as e:
+        print(f"Error collapsing paper versions: {e}")
+    finally:
+        db.close()
+
+def warm_up_nlp():
+    """Load the summarization model so the first /search does not pay for it."""
+    if nlp.keyword_engine == "tfidf":
+        # Document frequencies come from the stored corpus
+        db = SessionLocal()
+        try:
+            nlp.tfidf.fit(iter_abstracts(db))
+        except Exception as e:
+            print(f"Error fitting TF-IDF keywords: {e}")
+        finally:
+            db.close()
+    try:
+        nlp.load()
+    except Exception as e:
+        print(f"Error loading NLP model: {e}")
+        return
+    index_embeddings()
+
+def index_embeddings(batch_size: int = 64):
+    """
+    Load stored embeddings into the similarity index, then embed papers that
+    have none yet (e.g. stored by the scheduler or before embeddings existed).
+    """
+    db = SessionLocal()
+    try:
+        embedding_index.sync(iter_embeddings(db, nlp.model_name))
+        while True:
+            pending = get_papers_without_embeddings(db, nlp.model_name, batch_size)
+            if not pending:
+                break
+            paper_ids, abstracts = zip(*pending)
+            store_embeddings(db, list(paper_ids), nlp.embed_texts(list(abstracts)))
+    except Exception as e:
+        print(f"Error indexing embeddings: {e}")
+    finally:
+        db.close()
+
+def store_embeddings(db: Session, paper_ids: List[int], vectors):
+    """Persist embeddings as float32 blobs and add them to the similarity index."""
+    save_embeddings(
+        db,
+        {paper_id: vector.tobytes() for paper_id, vector in zip(paper_ids, vectors)},
+        nlp.model_name,
+        vectors.shape[1]
+    )
+    embedding_index.add(paper_ids, vectors)
+
+def backfill_keywords():
+    """Index extracted keywords of papers stored before the keyword tables existed."""
+    db = SessionLocal()
+    try:
+        indexed = backfill_keyword_index(db)
+        if indexed:
+            print(f"Indexed keywords of {indexed} papers")
+    except Exception as e:
+        print(f"Error indexing keywords: {e}")
+    finally:
+        db.close()
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Before anything writes: upserts rely on canonical ids being set
+    collapse_versions()
+    # Warm up in the background so the app can serve requests immediately
+    threading.Thread(target=warm_up_nlp, name="nlp-warmup", daemon=True).start()
+    threading.Thread(target=backfill_keywords, name="keyword-backfill", daemon=True).start()
     scheduler.start()
+    nlp_worker.start()
     try:
         yield
     finally:
-        await scheduler.shutdown()
+        await nlp_worker.stop()
+        scheduler.shutdown()
+        await scheduler.stop_pipeline()
+        await scheduler.crawler.aclose()
+        await dispose_async_engine()
+        executors.shutdown(wait=False)
+        nlp.close()
+
+app = FastAPI(lifespan=lifespan)
 
-app.lifespan = lifespan
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Count requests and time them (until the response starts) per route template."""
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        path = getattr(route, "path", "unmatched")
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, method=request.method, route=path)
+        HTTP_REQUESTS.inc(method=request.method, route=path, status=status)
+        if status >= 500:
+            HTTP_ERRORS.inc(method=request.method, route=path)
+
+def paper_response(paper) -> dict:
+    """Serialize a stored Paper into the shape returned by the API."""
+    return {
+        "id": paper.id,
+        "title": paper.title,
+        "abstract": paper.abstract,
+        "link": paper.link,
+        "published": paper.published,
+        "keywords": paper.keywords.split(",") if paper.keywords else [],
+        "summary": paper.summary
+    }
+
+def process_papers(papers: List[dict], strict: bool = False) -> List[dict]:
+    """
+    Extract keywords and generate summaries for crawled papers (CPU-bound).
+    Args:
+        strict: Raise RuntimeError when a non-empty abstract got no summary (e.g.
+            the model failed to load) instead of returning the paper without one.
+    """
+    abstracts = [paper["abstract"] for paper in papers]
+    if nlp.keyword_engine == "tfidf":
+        # New abstracts become part of the corpus statistics
+        nlp.tfidf.partial_fit(abstracts)
+    keywords = nlp.extract_keywords_batch(abstracts)
+    # Summarize all abstracts in length-bucketed batches
+    summaries = nlp.generate_summaries(abstracts)
+    if strict:
+        missing = sum(
+            1 for abstract, summary in zip(abstracts, summaries)
+            if summary is None and abstract and abstract.strip()
+        )
+        if missing:
+            reason = f": {nlp.load_error}" if nlp.load_error else ""
+            raise RuntimeError(f"No summary generated for {missing} of {len(papers)} papers{reason}")
+    try:
+        embeddings = nlp.embed_texts(abstracts)
+    except Exception as e:
+        print(f"Error computing embeddings: {e}")
+        embeddings = [None] * len(papers)
+    for paper, paper_keywords, summary, embedding in zip(papers, keywords, summaries, embeddings):
+        paper["keywords"] = paper_keywords
+        paper["summary"] = summary
+        paper["embedding"] = embedding
+    return papers
+
+def process_queued_papers(papers: List[dict]) -> List[dict]:
+    """NLP step of the job worker and crawl pipeline; failures raise so the papers are retried."""
+    return process_papers(papers, strict=True)
+
+def save_papers(db: Session, papers: List[dict], keyword: str) -> List[dict]:
+    """Upsert processed papers in one transaction and return their API representation (blocking I/O)."""
+    stored = save_papers_bulk(db, papers, keyword)["papers"]
+    embeddings = {paper["link"]: paper.get("embedding") for paper in papers}
+    embedded = [paper for paper in stored if embeddings.get(paper.link) is not None]
+    if embedded:
+        try:
+            store_embeddings(db, [p.id for p in embedded], np.stack([embeddings[p.link] for p in embedded]))
+        except Exception as e:
+            print(f"Error saving embeddings: {e}")
+    return [paper_response(paper) for paper in stored]
+
+def job_response(job) -> dict:
+    """Serialize an NLP job into the shape returned by the API."""
+    return {
+        "id": job.id,
+        "paper_id": job.paper_id,
+        "status": job.status,
+        "attempts": job.attempts,
+        "last_error": job.last_error
+    }
+
+def save_and_enqueue(db: Session, papers: List[dict], keyword: str):
+    """
+    Save crawled papers without NLP output and queue their NLP jobs (blocking I/O).
+    Returns:
+        (API representations of the papers, API representations of their jobs)
+    """
+    stored = save_papers_bulk(db, papers, keyword)["papers"]
+    jobs = enqueue_nlp_jobs(db, [paper.id for paper in stored])
+    return [paper_response(paper) for paper in stored], [job_response(job) for job in jobs]
+
+# Background NLP for papers saved by /search, see services/jobs.py
+nlp_worker = NLPJobWorker(
+    process=process_queued_papers,
+    store=save_papers,
+    batch_size=int(os.getenv("NLP_JOB_BATCH_SIZE", "16")),
+    concurrency=int(os.getenv("NLP_JOB_WORKERS", "1")),
+    max_attempts=int(os.getenv("NLP_JOB_MAX_ATTEMPTS", "3"))
+)
+
+# Keyword subscriptions crawl with bounded concurrency and jittered start times,
+# through the staged fetch -> dedup -> NLP -> store pipeline (services/pipeline.py)
+scheduler = Scheduler(
+    max_concurrency=int(os.getenv("SCHEDULER_CONCURRENCY", "4")),
+    jitter=int(os.getenv("SCHEDULER_JITTER", "300")),
+    # Jobs persist in the database and one uvicorn worker at a time (the lease holder) runs them
+    jobstore_engine=engine if os.getenv("SCHEDULER_JOBSTORE", "database") == "database" else None,
+    lease_seconds=float(os.getenv("SCHEDULER_LEASE", "30")) or None,
+    misfire_grace_time=int(os.getenv("SCHEDULER_MISFIRE_GRACE", str(6 * 3600))) or None,
+    process=process_queued_papers,
+    store=save_papers,
+    batch_size=int(os.getenv("INGEST_BATCH_SIZE", "16")),
+    dedup_workers=int(os.getenv("INGEST_DEDUP_WORKERS", "1")),
+    nlp_workers=int(os.getenv("INGEST_NLP_WORKERS", "1")),
+    store_workers=int(os.getenv("INGEST_STORE_WORKERS", "1")),
+    queue_size=int(os.getenv("INGEST_QUEUE_SIZE", "4"))
+)
+
+def count_jobs_by_status() -> dict:
+    db = SessionLocal()
+    try:
+        return {(status,): count for status, count in count_nlp_jobs(db).items()}
+    finally:
+        db.close()
+
+# Queue depths are read at scrape time; see services/metrics.py for the other metrics
+track_commits(Session)
+metrics_registry.gauge(
+    "ingest_queue_depth", "Items waiting in each ingest pipeline stage.", ["stage"],
+    collect=lambda: {(stage,): depth for stage, depth in scheduler.pipeline.stats()["queued"].items()}
+)
+metrics_registry.gauge(
+    "scheduler_active_crawls", "Scheduled crawls in flight.",
+    collect=lambda: {(): scheduler.active_runs}
+)
+metrics_registry.gauge("nlp_jobs", "NLP jobs by status.", ["status"], collect=count_jobs_by_status)
+metrics_registry.gauge(
+    "executor_queue_depth", "Tasks waiting for a thread in each executor pool.", ["pool"],
+    collect=lambda: {(pool,): depth for pool, depth in executors.queue_depths().items()}
+)
+
+def dedup_papers(db: Session, papers: List[dict]):
+    """
+    Split crawled papers into fresh ones and duplicates of stored papers (blocking I/O).
+    Returns:
+        (fresh paper dicts, API representations of the stored duplicates)
+    """
+    result = deduplicator.partition(db, papers)
+    duplicate_ids = list(dict.fromkeys(paper_id for _, paper_id in result.duplicates))
+    return result.fresh, [paper_response(p) for p in get_papers_by_ids(db, duplicate_ids)]
+
+def merge_results(saved: List[dict], duplicates: List[dict]) -> List[dict]:
+    """Combine newly saved papers and stored duplicates, one entry per paper."""
+    merged = {item["id"]: item for item in duplicates}
+    merged.update((item["id"], item) for item in saved)
+    return list(merged.values())
 
 @app.get("/search")
 async def search(keyword: str, db: Session = Depends(get_db)):
     """
-    Search arXiv papers, extract keywords, generate summaries, and save to database.
+    Search arXiv papers and save them to the database right away.
+    Keyword extraction, summarization and embedding are queued as NLP jobs and
+    filled in by the background workers; poll /jobs/{id} for completion.
+    Papers already stored (same arXiv id or near-identical text) are returned as stored.
     """
-    results = crawler.search_papers(keyword)
-    processed_results = []
-    for paper in results:
-        # Extract keywords and generate summary
-        keywords = nlp.extract_keywords(paper["abstract"])
-        summary = nlp.generate_summary(paper["abstract"])
-        # Add to paper dict
-        paper["keywords"] = keywords
-        paper["summary"] = summary
-        # Save to database
-        saved_paper = save_paper(db, paper, keyword)
-        processed_results.append({
-            "title": saved_paper.title,
-            "abstract": saved_paper.abstract,
-            "link": saved_paper.link,
-            "published": saved_paper.published,
-            "keywords": saved_paper.keywords.split(",") if saved_paper.keywords else [],
-            "summary": saved_paper.summary
-        })
-    return {"results": processed_results}
+    results = await executors.run_io(crawler.search_papers, keyword)
+    fresh, duplicates = await executors.run_io(dedup_papers, db, results)
+    saved, jobs = await executors.run_io(save_and_enqueue, db, fresh, keyword)
+    nlp_worker.wake()
+    return {"results": merge_results(saved, duplicates), "jobs": jobs}
+
+async def stream_search_results(keyword: str, db: Session, batch_size: int, fmt: str):
+    """
+    Yield each processed paper as soon as its keywords and summary are ready,
+    encoded as NDJSON lines or Server-Sent Events.
+    """
+    def encode(item: dict, event: str = "paper") -> str:
+        data = json.dumps(jsonable_encoder(item), ensure_ascii=False)
+        return f"event: {event}\ndata: {data}\n\n" if fmt == "sse" else f"{data}\n"
+
+    try:
+        results = await executors.run_io(crawler.search_papers, keyword)
+        fresh, duplicates = await executors.run_io(dedup_papers, db, results)
+        emitted = set()
+        # Stored duplicates are ready immediately
+        for item in duplicates:
+            emitted.add(item["id"])
+            yield encode(item)
+        for start in range(0, len(fresh), batch_size):
+            chunk = await executors.run_inference(process_papers, fresh[start:start + batch_size])
+            for item in await executors.run_io(save_papers, db, chunk, keyword):
+                if item["id"] not in emitted:
+                    emitted.add(item["id"])
+                    yield encode(item)
+        if fmt == "sse":
+            yield encode({"count": len(emitted)}, event="end")
+    finally:
+        db.close()
+
+@app.get("/search/stream")
+async def search_stream(
+    keyword: str,
+    format: str = Query("ndjson", pattern="^(ndjson|sse)$"),
+    batch_size: int = Query(1, ge=1, le=32),
+    db: Session = Depends(get_db)
+):
+    """
+    Streaming variant of /search: emits each paper (same shape as /search
+    results) once it is processed, so clients can render incrementally.
+    Use format=ndjson for one JSON object per line or format=sse for Server-Sent Events.
+    """
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(
+        stream_search_results(keyword, db, batch_size, format),
+        media_type=media_type,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.get("/papers")
-async def get_papers(keyword: str, db: Session = Depends(get_db)):
+async def get_papers(
+    keyword: str = None,
+    page_size: int = Query(10, ge=1, le=100),
+    cursor: str = None,
+    sort: str = Query("published", pattern="^(published|relevance)$"),
+    if_none_match: str = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
     """
     Retrieve papers by keyword from database.
+    Full-text search over title, abstract, keywords and summary; supports
+    "quoted phrases" and prefix* terms. Without a keyword all papers are listed.
+    sort=published (default) pages newest first: pass the returned next_cursor
+    to get the following page. sort=relevance returns the best matches only.
+    Responses are cached in process and carry an ETag; a matching
+    If-None-Match gets 304 Not Modified.
+    """
+    key = (keyword, page_size, cursor, sort)
+    entry = papers_cache.get(key)
+    if entry is None:
+        # The sync crud queries run on the async driver, without blocking the loop or an I/O thread
+        if sort == "relevance" and keyword is not None:
+            papers = await db.run_sync(get_papers_by_keyword, keyword, page_size)
+            next_cursor = None
+        else:
+            try:
+                papers, next_cursor = await db.run_sync(list_papers, keyword, page_size, cursor)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        body = json.dumps(
+            jsonable_encoder({"papers": [paper_response(p) for p in papers], "next_cursor": next_cursor}),
+            ensure_ascii=False,
+            separators=(",", ":")
+        ).encode("utf-8")
+        entry = papers_cache.set(key, body, keyword)
+
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if if_none_match and entry.etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+@app.get("/papers/cache/stats")
+async def papers_cache_stats():
+    """
+    Return hit/miss counters of the /papers response cache.
+    """
+    return papers_cache.stats()
+
+@app.get("/keywords/facets")
+async def keyword_facets(
+    query: str = None,
+    limit: int = Query(20, ge=1, le=200),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Most frequent extracted keywords among papers matching `query`
+    (full-text, as in /papers), or among all papers without a query.
+    """
+    facets = await db.run_sync(get_keyword_facets, query, limit)
+    return {"query": query, "facets": facets}
+
+@app.get("/keywords/{keyword}/papers")
+async def papers_by_extracted_keyword(
+    keyword: str,
+    limit: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Retrieve papers whose extracted keywords include `keyword`, newest first.
+    """
+    papers = await db.run_sync(get_papers_by_extracted_keyword, keyword, limit)
+    return {"keyword": keyword, "papers": [paper_response(p) for p in papers]}
+
+def export_papers(fmt: str, compress: bool, keyword: str = None, since: datetime = None, until: datetime = None):
+    """Yield the encoded export from its own session, closed when the stream ends."""
+    db = SessionLocal()
+    try:
+        yield from encode_export(iter_papers(db, keyword, since, until), fmt, compress)
+    finally:
+        db.close()
+
+@app.get("/export")
+async def export(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    keyword: str = None,
+    since: datetime = None,
+    until: datetime = None,
+    gzip: bool = False
+):
+    """
+    Stream the stored corpus as NDJSON or CSV, optionally gzip-compressed.
+    Filters: full-text keyword (as in /papers) and a published range [since, until).
+    """
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/csv"
+    filename = f"papers.{format}" + (".gz" if gzip else "")
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if gzip:
+        media_type = "application/gzip"
+    # A sync iterator: Starlette pulls it on a worker thread, so the database cursor never blocks the loop
+    return StreamingResponse(
+        export_papers(format, gzip, keyword, since, until),
+        media_type=media_type,
+        headers=headers
+    )
+
+@app.get("/jobs/stats")
+async def nlp_job_stats(db: Session = Depends(get_db)):
+    """
+    Return the number of NLP jobs per status and the worker counters.
+    """
+    counts = await executors.run_io(count_nlp_jobs, db)
+    return {"jobs": counts, "worker": nlp_worker.stats()}
+
+@app.get("/jobs/{job_id}")
+async def nlp_job_status(job_id: int, db: Session = Depends(get_db)):
+    """
+    Return the status of an NLP job; once done, the processed paper is included.
+    """
+    job = await executors.run_io(get_nlp_job, db, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    response = job_response(job)
+    if job.status == "done":
+        papers = await executors.run_io(get_papers_by_ids, db, [job.paper_id])
+        response["paper"] = paper_response(papers[0]) if papers else None
+    return response
+
+@app.get("/similar")
+async def similar_papers(
+    paper_id: int = None,
+    text: str = None,
+    k: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Find stored papers semantically similar to a stored paper (paper_id) or
+    to free text, by cosine similarity of abstract embeddings.
     """
-    papers = get_papers_by_keyword(db, keyword)
+    if paper_id is not None:
+        vector = embedding_index.get(paper_id)
+        if vector is None:
+            raise HTTPException(status_code=404, detail=f"No embedding for paper {paper_id}")
+        exclude = [paper_id]
+    elif text and text.strip():
+        vector = (await executors.run_inference(nlp.embed_texts, [text]))[0]
+        exclude = []
+    else:
+        raise HTTPException(status_code=400, detail="Provide paper_id or text")
+
+    matches = await executors.run_inference(embedding_index.search, vector, k, exclude)
+    papers = await db.run_sync(get_papers_by_ids, [match_id for match_id, _ in matches])
+    scores = dict(matches)
+    return {"results": [dict(paper_response(p), score=round(scores[p.id], 4)) for p in papers]}
+
+class SubscriptionCreate(BaseModel):
+    keyword: str = Field(..., pattern=r"\S")
+    interval_minutes: int = Field(1440, ge=1)
+    max_results: int = Field(5, ge=1, le=1000)
+    enabled: bool = True
+
+class SubscriptionUpdate(BaseModel):
+    keyword: Optional[str] = Field(None, pattern=r"\S")
+    interval_minutes: Optional[int] = Field(None, ge=1)
+    max_results: Optional[int] = Field(None, ge=1, le=1000)
+    enabled: Optional[bool] = None
+
+def subscription_response(subscription) -> dict:
+    """Serialize a keyword subscription into the shape returned by the API."""
     return {
-        "papers": [{
-            "title": p.title,
-            "abstract": p.abstract,
-            "link": p.link,
-            "published": p.published,
-            "keywords": p.keywords.split(",") if p.keywords else [],
-            "summary": p.summary
-        } for p in papers]
+        "id": subscription.id,
+        "keyword": subscription.keyword,
+        "interval_minutes": subscription.interval_minutes,
+        "max_results": subscription.max_results,
+        "enabled": subscription.enabled,
+        "last_run_at": subscription.last_run_at,
+        "last_duration": subscription.last_duration,
+        "last_paper_count": subscription.last_paper_count,
+        "total_papers": subscription.total_papers,
+        "last_error": subscription.last_error
     }
 
+async def reschedule(db: Session):
+    """Re-sync scheduler jobs with the stored subscriptions."""
+    subscriptions = await executors.run_io(list_subscriptions, db, True)
+    await executors.run_io(scheduler.schedule_tasks, subscriptions)
+
+@app.get("/subscriptions")
+async def subscriptions(db: Session = Depends(get_db)):
+    """
+    List keyword subscriptions with their last-run stats.
+    """
+    stored = await executors.run_io(list_subscriptions, db)
+    return {"subscriptions": [subscription_response(s) for s in stored]}
+
+@app.post("/subscriptions", status_code=201)
+async def subscribe(body: SubscriptionCreate, db: Session = Depends(get_db)):
+    """
+    Subscribe to a keyword; it is crawled every `interval_minutes` with up to
+    `max_results` papers per run. 409 if the keyword is already subscribed.
+    """
+    try:
+        subscription = await executors.run_io(create_subscription, db, **body.model_dump())
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    await reschedule(db)
+    return subscription_response(subscription)
+
+@app.get("/subscriptions/{subscription_id}")
+async def subscription_detail(subscription_id: int, db: Session = Depends(get_db)):
+    subscription = await executors.run_io(get_subscription, db, subscription_id)
+    if subscription is None:
+        raise HTTPException(status_code=404, detail=f"Subscription {subscription_id} not found")
+    return subscription_response(subscription)
+
+@app.patch("/subscriptions/{subscription_id}")
+async def edit_subscription(subscription_id: int, body: SubscriptionUpdate, db: Session = Depends(get_db)):
+    """
+    Change a subscription's keyword, cadence, budget or enabled flag.
+    """
+    try:
+        subscription = await executors.run_io(
+            update_subscription, db, subscription_id, **body.model_dump(exclude_unset=True)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if subscription is None:
+        raise HTTPException(status_code=404, detail=f"Subscription {subscription_id} not found")
+    await reschedule(db)
+    return subscription_response(subscription)
+
+@app.delete("/subscriptions/{subscription_id}", status_code=204)
+async def unsubscribe(subscription_id: int, db: Session = Depends(get_db)):
+    if not await executors.run_io(delete_subscription, db, subscription_id):
+        raise HTTPException(status_code=404, detail=f"Subscription {subscription_id} not found")
+    await reschedule(db)
+    return Response(status_code=204)
 
 @app.get("/scheduler/status")
 async def scheduler_status():
     return scheduler.get_status()
 
+@app.get("/metrics")
+async def metrics():
+    """
+    Prometheus text exposition of latency histograms, counters and queue depths.
+    """
+    body = await executors.run_io(metrics_registry.render)
+    return Response(content=body, media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/health")
+async def health():
+    """
+    Liveness probe; answers as soon as the app is up.
+    """
+    return {"status": "ok"}
+
+@app.get("/health/ready")
+async def readiness():
+    """
+    Readiness probe; 503 until the summarization model is loaded.
+    """
+    if nlp.is_loaded:
+        return {"status": "ready", "model": nlp.model_name, "profile": nlp.active_profile}
+    status = "error" if nlp.load_error else "loading"
+    return JSONResponse(
+        status_code=503,
+        content={"status": status, "model": nlp.model_name, "error": nlp.load_error}
+    )
+
+@app.get("/nlp/cache/stats")
+async def nlp_cache_stats():
+    """
+    Return hit/miss counters of the NLP output cache.
+    """
+    return nlp.cache.stats()
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -1,49 +1,467 @@
+import asyncio
+import time
+import httpx
 import requests
-from typing import List, Dict
+from contextlib import aclosing, contextmanager
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional
 from xml.etree import ElementTree as ET
 from urllib.parse import quote
+from ..identifiers import parse_arxiv_id
+from .metrics import ARXIV_ERRORS, ARXIV_FETCH_SECONDS, ARXIV_PAPERS, ARXIV_PARSE_SECONDS
+
+ATOM_NS = "{http://www.w3.org/2005/Atom}"
+ARXIV_NS = "{http://arxiv.org/schemas/atom}"
+CHUNK_SIZE = 64 * 1024
+
+def build_query_url(
+    base_url: str,
+    keyword: str,
+    start: int,
+    max_results: int,
+    sort_by: Optional[str] = None,
+    sort_order: str = "descending"
+) -> str:
+    """
+    Build an arXiv API query URL for one page of results.
+    sort_by may be "relevance", "lastUpdatedDate" or "submittedDate".
+    """
+    # Encode keyword for URL
+    query = quote(keyword)
+    url = f"{base_url}?search_query=all:{query}&start={start}&max_results={max_results}"
+    if sort_by:
+        url += f"&sortBy={sort_by}&sortOrder={sort_order}"
+    return url
+
+def _text(entry, tag: str) -> Optional[str]:
+    element = entry.find(tag)
+    if element is None or element.text is None:
+        return None
+    return element.text.strip()
+
+def _entry_to_paper(entry) -> Dict:
+    link = _text(entry, f"{ATOM_NS}id")
+    arxiv_id, version = parse_arxiv_id(link)
+    primary = entry.find(f"{ARXIV_NS}primary_category")
+    return {
+        "title": _text(entry, f"{ATOM_NS}title"),
+        "abstract": _text(entry, f"{ATOM_NS}summary"),
+        "link": link,
+        "published": _text(entry, f"{ATOM_NS}published"),
+        "updated": _text(entry, f"{ATOM_NS}updated"),
+        "authors": [
+            name for name in (_text(author, f"{ATOM_NS}name") for author in entry.findall(f"{ATOM_NS}author"))
+            if name
+        ],
+        "categories": [c.get("term") for c in entry.findall(f"{ATOM_NS}category") if c.get("term")],
+        "primary_category": primary.get("term") if primary is not None else None,
+        "arxiv_id": arxiv_id,
+        "version": version
+    }
+
+class FeedParser:
+    """
+    Incremental arXiv Atom parser.
+    Feed it chunks of the response body as they arrive; each completed
+    <entry> is turned into a paper dict and then cleared, so memory stays
+    bounded by one entry regardless of how many results the page holds.
+    Raises ET.ParseError on malformed XML.
+    """
+
+    def __init__(self):
+        self._parser = ET.XMLPullParser(events=("start", "end"))
+        self._root = None
+        self.parse_seconds = 0.0  # Time spent parsing, excluding waits for the network
+
+    def feed(self, chunk: bytes) -> List[Dict]:
+        """Consume a chunk and return the papers completed by it."""
+        started = time.perf_counter()
+        self._parser.feed(chunk)
+        papers = self._drain()
+        self.parse_seconds += time.perf_counter() - started
+        return papers
+
+    def close(self) -> List[Dict]:
+        """Signal the end of the body and return any remaining papers."""
+        started = time.perf_counter()
+        self._parser.close()
+        papers = self._drain()
+        self.parse_seconds += time.perf_counter() - started
+        return papers
+
+    def _drain(self) -> List[Dict]:
+        papers = []
+        for event, element in self._parser.read_events():
+            if event == "start":
+                if self._root is None:
+                    self._root = element
+            elif element.tag == f"{ATOM_NS}entry":
+                papers.append(_entry_to_paper(element))
+                element.clear()
+                if self._root is not None:
+                    self._root.remove(element)
+        return papers
+
+class TransferClock:
+    """
+    Accumulates the time spent waiting on the network for one response: the
+    request itself and each read of the body. Parsing and whatever the
+    consumer does between reads are left out.
+    """
+
+    def __init__(self):
+        self.seconds = 0.0
+
+    @contextmanager
+    def measure(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds += time.perf_counter() - started
+
+    def wrap(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """Yield `chunks`, timing each read."""
+        iterator = iter(chunks)
+        while True:
+            with self.measure():
+                chunk = next(iterator, None)
+            if chunk is None:
+                return
+            yield chunk
+
+    async def awrap(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        """Yield `chunks`, timing each read."""
+        iterator = chunks.__aiter__()
+        while True:
+            try:
+                with self.measure():
+                    chunk = await iterator.__anext__()
+            except StopAsyncIteration:
+                return
+            yield chunk
+
+def _observe_parse(parser: FeedParser, papers: int, client: str):
+    ARXIV_PARSE_SECONDS.observe(parser.parse_seconds, client=client)
+    ARXIV_PAPERS.inc(papers, client=client)
+
+def iter_feed(chunks: Iterable[bytes], client: str = "sync") -> Iterator[Dict]:
+    """Yield papers from an Atom feed delivered as an iterable of byte chunks."""
+    parser = FeedParser()
+    papers = 0
+    try:
+        for chunk in chunks:
+            for paper in parser.feed(chunk):
+                papers += 1
+                yield paper
+        for paper in parser.close():
+            papers += 1
+            yield paper
+    finally:
+        # Also when the consumer stops early or the body fails mid-stream
+        _observe_parse(parser, papers, client)
+
+async def aiter_feed(chunks: AsyncIterator[bytes], client: str = "async") -> AsyncIterator[Dict]:
+    """Yield papers from an Atom feed delivered as an async iterator of byte chunks."""
+    parser = FeedParser()
+    papers = 0
+    try:
+        async for chunk in chunks:
+            for paper in parser.feed(chunk):
+                papers += 1
+                yield paper
+        for paper in parser.close():
+            papers += 1
+            yield paper
+    finally:
+        _observe_parse(parser, papers, client)
+
+def parse_feed(content: bytes) -> List[Dict]:
+    """
+    Parse a complete arXiv Atom feed into paper dictionaries.
+    Raises ET.ParseError on malformed XML.
+    """
+    return list(iter_feed([content]))
 
 class ArxivCrawler:
     BASE_URL = "https://export.arxiv.org/api/query"
-    
+
     def __init__(self, max_results: int = 5):
         self.max_results = max_results
-    
+
+    def iter_papers(self, keyword: str) -> Iterator[Dict]:
+        """
+        Search arXiv papers by keyword and yield each paper as soon as its
+        entry has been parsed from the streamed response body.
+        Raises requests.RequestException or ET.ParseError on failure.
+        """
+        if not keyword.strip():
+            return
+
+        url = build_query_url(self.BASE_URL, keyword, 0, self.max_results)
+        clock = TransferClock()
+        try:
+            with clock.measure():
+                response = requests.get(url, timeout=10, stream=True)
+            try:
+                response.raise_for_status()  # Raise exception for bad status codes
+                yield from iter_feed(clock.wrap(response.iter_content(chunk_size=CHUNK_SIZE)), client="sync")
+            finally:
+                response.close()
+        finally:
+            ARXIV_FETCH_SECONDS.observe(clock.seconds, client="sync")
+
     def search_papers(self, keyword: str) -> List[Dict]:
         """
         Search arXiv papers by keyword using the arXiv API.
         Returns a list of dictionaries containing paper details.
         """
-        if not keyword.strip():
-            return []
-            
-        # Encode keyword for URL
-        query = quote(keyword)
-        url = f"{self.BASE_URL}?search_query=all:{query}&start=0&max_results={self.max_results}"
-        
         try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()  # Raise exception for bad status codes
-            
-            # Parse XML response
-            root = ET.fromstring(response.content)
-            papers = []
-            
-            for entry in root.findall("{http://www.w3.org/2005/Atom}entry"):
-                paper = {
-                    "title": entry.find("{http://www.w3.org/2005/Atom}title").text.strip(),
-                    "abstract": entry.find("{http://www.w3.org/2005/Atom}summary").text.strip(),
-                    "link": entry.find("{http://www.w3.org/2005/Atom}id").text.strip(),
-                    "published": entry.find("{http://www.w3.org/2005/Atom}published").text.strip()
-                }
-                papers.append(paper)
-            
-            return papers 
-        
+            return list(self.iter_papers(keyword))
         except requests.exceptions.RequestException as e:
+            ARXIV_ERRORS.inc(client="sync", kind="http")
             print(f"Error fetching arXiv data: {e}")
             return []
         except ET.ParseError as e:
+            ARXIV_ERRORS.inc(client="sync", kind="parse")
             print(f"Error parsing XML: {e}")
             return []
 
+class IncompleteCrawl(Exception):
+    """
+    Paging stopped before reaching the end of what a crawl asked for (a
+    request or parse error, or the result cap before the high-water mark).
+    `papers` holds what was fetched; they can be stored, but the high-water
+    mark must not advance past the gap.
+    """
+
+    def __init__(self, message: str, papers: List[Dict]):
+        super().__init__(message)
+        self.papers = papers
+
+class AsyncArxivCrawler:
+    """
+    Asynchronous arXiv crawler built on a shared httpx.AsyncClient.
+    Connections are kept alive across requests, results are fetched page by
+    page with `start`/`max_results`, and several keywords can be crawled
+    concurrently. A semaphore bounds in-flight requests and request starts are
+    spaced by `min_interval` seconds to respect arXiv's rate limit (one request
+    every three seconds).
+    """
+    BASE_URL = ArxivCrawler.BASE_URL
+
+    def __init__(
+        self,
+        max_results: int = 5,
+        page_size: int = 100,
+        max_concurrency: int = 1,
+        min_interval: float = 3.0,
+        max_new_results: int = 1000,
+        base_url: Optional[str] = None,
+        timeout: float = 10.0,
+        client: Optional[httpx.AsyncClient] = None
+    ):
+        self.max_results = max_results
+        self.page_size = page_size
+        self.min_interval = min_interval
+        self.max_new_results = max_new_results
+        self.base_url = base_url or self.BASE_URL
+        self.timeout = timeout
+        self._client = client
+        self._owns_client = client is None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._rate_lock = asyncio.Lock()
+        self._next_request_at = 0.0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The pooled HTTP client, created on first use."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_keepalive_connections=4, keepalive_expiry=60)
+            )
+        return self._client
+
+    async def aclose(self):
+        """Close the HTTP client if this crawler created it."""
+        if self._client is not None and self._owns_client:
+            await self._client.aclose()
+            self._client = None
+
+    async def search_papers(
+        self,
+        keyword: str,
+        start: int = 0,
+        max_results: Optional[int] = None,
+        sort_by: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Search arXiv papers by keyword, following pages until `max_results`
+        papers are collected or the results run out.
+        Returns the papers fetched before any error.
+        """
+        return [paper async for paper in self.iter_papers(keyword, start, max_results, sort_by)]
+
+    async def fetch_new_papers(
+        self,
+        keyword: str,
+        since: Optional[datetime] = None,
+        since_id: Optional[str] = None,
+        max_results: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Fetch papers newer than a keyword's high-water mark.
+        Results are requested newest first (sorted by submittedDate) and paging
+        stops at the first paper published before `since` or matching
+        `since_id`, so only new papers are transferred.
+        Args:
+            keyword: Search keyword.
+            since: Published time (naive UTC) of the newest paper already stored.
+            since_id: arXiv id of that paper.
+            max_results: Budget of papers to return, newest first. Stopping there
+                is deliberate: older new papers are skipped, not reported as a gap.
+                Defaults to `max_results` without a high-water mark and to
+                `max_new_results` with one.
+        Returns:
+            New papers, newest first.
+        Raises:
+            IncompleteCrawl: If a request failed, or `max_new_results` was hit
+                before reaching the high-water mark; carries the papers fetched so far.
+        """
+        has_mark = since is not None or since_id is not None
+        limit = max_results or (self.max_new_results if has_mark else self.max_results)
+        # arXiv timestamps are ISO 8601 UTC, so they compare correctly as strings
+        since_text = since.strftime("%Y-%m-%dT%H:%M:%SZ") if since else None
+        papers = []
+        reached_mark = False
+        pages = self.iter_papers(keyword, max_results=limit, sort_by="submittedDate", raise_errors=True)
+        try:
+            async with aclosing(pages):
+                async for paper in pages:
+                    if (since_id and paper.get("arxiv_id") == since_id) or (
+                        since_text and (paper.get("published") or "") < since_text
+                    ):
+                        reached_mark = True
+                        break
+                    papers.append(paper)
+        except (httpx.HTTPError, ET.ParseError) as e:
+            raise IncompleteCrawl(f"arXiv request failed after {len(papers)} papers: {e}", papers) from e
+        if has_mark and not reached_mark and max_results is None and len(papers) >= limit:
+            raise IncompleteCrawl(f"stopped at {limit} papers before reaching the high-water mark", papers)
+        return papers
+
+    async def iter_papers(
+        self,
+        keyword: str,
+        start: int = 0,
+        max_results: Optional[int] = None,
+        sort_by: Optional[str] = None,
+        raise_errors: bool = False
+    ) -> AsyncIterator[Dict]:
+        """
+        Yield papers for a keyword page by page, each as soon as it is parsed
+        from the streamed response. Stops quietly on errors, unless
+        `raise_errors` is set (httpx.HTTPError or ET.ParseError are re-raised).
+        """
+        if not keyword.strip():
+            return
+        max_results = self.max_results if max_results is None else max_results
+
+        fetched = 0
+        offset = start
+        while fetched < max_results:
+            count = min(self.page_size, max_results - fetched)
+            received = 0
+            try:
+                async for paper in self.stream_page(keyword, offset, count, sort_by):
+                    received += 1
+                    yield paper
+            except httpx.HTTPError as e:
+                ARXIV_ERRORS.inc(client="async", kind="http")
+                print(f"Error fetching arXiv data: {e}")
+                if raise_errors:
+                    raise
+                return
+            except ET.ParseError as e:
+                ARXIV_ERRORS.inc(client="async", kind="parse")
+                print(f"Error parsing XML: {e}")
+                if raise_errors:
+                    raise
+                return
+            fetched += received
+            if received < count:
+                return  # Last page
+            offset += received
+
+    async def search_many(self, keywords: Iterable[str], max_results: Optional[int] = None) -> Dict[str, List[Dict]]:
+        """
+        Crawl several keywords concurrently (bounded by the semaphore and rate limit).
+        Returns a mapping of keyword to papers.
+        """
+        keywords = list(dict.fromkeys(keywords))
+        results = await asyncio.gather(
+            *(self.search_papers(keyword, max_results=max_results) for keyword in keywords)
+        )
+        return dict(zip(keywords, results))
+
+    async def fetch_page(self, keyword: str, start: int, max_results: int) -> Optional[List[Dict]]:
+        """
+        Fetch and parse a single page of results.
+        Returns None if the request or parsing fails.
+        """
+        try:
+            return [paper async for paper in self.stream_page(keyword, start, max_results)]
+        except httpx.HTTPError as e:
+            ARXIV_ERRORS.inc(client="async", kind="http")
+            print(f"Error fetching arXiv data: {e}")
+            return None
+        except ET.ParseError as e:
+            ARXIV_ERRORS.inc(client="async", kind="parse")
+            print(f"Error parsing XML: {e}")
+            return None
+
+    async def stream_page(
+        self,
+        keyword: str,
+        start: int,
+        max_results: int,
+        sort_by: Optional[str] = None
+    ) -> AsyncIterator[Dict]:
+        """
+        Stream one page of results, yielding papers as their entries are parsed.
+        Raises httpx.HTTPError or ET.ParseError on failure.
+        """
+        url = build_query_url(self.base_url, keyword, start, max_results, sort_by)
+        async with self._semaphore:
+            await self._throttle()
+            # Timed after the rate-limit wait, so this is the request itself
+            clock = TransferClock()
+            try:
+                with clock.measure():
+                    response = await self.client.send(self.client.build_request("GET", url), stream=True)
+                try:
+                    response.raise_for_status()
+                    # Closed explicitly so parse stats are recorded when the caller stops early
+                    async with aclosing(aiter_feed(clock.awrap(response.aiter_bytes(CHUNK_SIZE)), client="async")) as papers:
+                        async for paper in papers:
+                            yield paper
+                finally:
+                    await response.aclose()
+            finally:
+                ARXIV_FETCH_SECONDS.observe(clock.seconds, client="async")
+
+    async def _throttle(self):
+        """Wait until at least `min_interval` seconds have passed since the previous request."""
+        async with self._rate_lock:
+            loop = asyncio.get_running_loop()
+            delay = self._next_request_at - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next_request_at = loop.time() + self.min_interval
@@ -0,0 +1,165 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+from sqlalchemy import func
+from ..database.config import SessionLocal
+from ..database.models import NLPCacheEntry
+
+class NLPCache:
+    """
+    Content-addressed cache for NLP outputs (summaries and keywords).
+    An in-process LRU sits in front of the `nlp_cache` table, so a previously
+    seen abstract costs a dict lookup or a primary-key query instead of
+    running YAKE or beam search again.
+    """
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        max_memory_entries: int = 2048,
+        max_db_entries: int = 100_000
+    ):
+        self.session_factory = session_factory
+        self.max_memory_entries = max_memory_entries
+        self.max_db_entries = max_db_entries
+        self._lru: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(kind: str, text: str, model_name: str, params: Dict[str, Any]) -> str:
+        """
+        Build a cache key from the input text and everything that affects the output.
+        Args:
+            kind: Output type ("summary" or "keywords").
+            text: Input text (e.g., paper abstract).
+            model_name: Model or extractor that produced the output.
+            params: Generation or extractor parameters.
+        Returns:
+            Hex SHA-256 digest.
+        """
+        payload = json.dumps([kind, model_name, params, text], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for `key`, or None on a miss."""
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """
+        Look up several keys at once.
+        Returns:
+            Mapping of found keys to their cached values; missing keys are omitted.
+        """
+        found: Dict[str, Any] = {}
+        pending = []
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                if key in self._lru:
+                    self._lru.move_to_end(key)
+                    found[key] = self._lru[key]
+                    self.memory_hits += 1
+                else:
+                    pending.append(key)
+        if not pending:
+            return found
+
+        from_db = self._load(pending)
+        with self._lock:
+            self.db_hits += len(from_db)
+            self.misses += len(pending) - len(from_db)
+            for key, value in from_db.items():
+                self._remember(key, value)
+        found.update(from_db)
+        return found
+
+    def set(self, key: str, kind: str, value: Any):
+        """Store a single value."""
+        self.set_many({key: value}, kind)
+
+    def set_many(self, values: Dict[str, Any], kind: str):
+        """Store several values of the same kind in one transaction."""
+        if not values:
+            return
+        with self._lock:
+            for key, value in values.items():
+                self._remember(key, value)
+
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            for key, value in values.items():
+                db.merge(NLPCacheEntry(
+                    key=key,
+                    kind=kind,
+                    value=json.dumps(value, ensure_ascii=False),
+                    created_at=now,
+                    accessed_at=now
+                ))
+            db.commit()
+            self._evict(db)
+        except Exception as e:
+            db.rollback()
+            print(f"Error writing NLP cache: {e}")
+        finally:
+            db.close()
+
+    def clear_memory(self):
+        """Drop the in-process LRU (the database tier is kept)."""
+        with self._lock:
+            self._lru.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the in-process size."""
+        with self._lock:
+            return {
+                "memory_hits": self.memory_hits,
+                "db_hits": self.db_hits,
+                "hits": self.memory_hits + self.db_hits,
+                "misses": self.misses,
+                "memory_entries": len(self._lru)
+            }
+
+    def _remember(self, key: str, value: Any):
+        """Insert into the LRU and evict the least recently used entries (lock held)."""
+        self._lru[key] = value
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_memory_entries:
+            self._lru.popitem(last=False)
+
+    def _load(self, keys: list) -> Dict[str, Any]:
+        """Fetch keys from the database and refresh their access time."""
+        db = self.session_factory()
+        try:
+            rows = db.query(NLPCacheEntry).filter(NLPCacheEntry.key.in_(keys)).all()
+            values = {row.key: json.loads(row.value) for row in rows}
+            if rows:
+                now = datetime.utcnow()
+                for row in rows:
+                    row.accessed_at = now
+                db.commit()
+            return values
+        except Exception as e:
+            db.rollback()
+            print(f"Error reading NLP cache: {e}")
+            return {}
+        finally:
+            db.close()
+
+    def _evict(self, db):
+        """Delete the least recently accessed rows once the table exceeds its bound."""
+        overflow = db.query(func.count(NLPCacheEntry.key)).scalar() - self.max_db_entries
+        if overflow <= 0:
+            return
+        stale = [
+            key for (key,) in db.query(NLPCacheEntry.key)
+            .order_by(NLPCacheEntry.accessed_at.asc())
+            .limit(overflow)
+        ]
+        db.query(NLPCacheEntry).filter(NLPCacheEntry.key.in_(stale)).delete(synchronize_session=False)
+        db.commit()
@@ -0,0 +1,161 @@
+import hashlib
+import re
+import zlib
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+import numpy as np
+from sqlalchemy.orm import Session
+from ..database.crud import find_by_canonical_ids, find_minhash_candidates
+from ..identifiers import canonical_paper_id
+
+WORD_PATTERN = re.compile(r"\w+")
+# Mersenne prime 2^31 - 1: (a * x + b) mod p stays inside uint64 for 31-bit a and x
+MERSENNE_PRIME = (1 << 31) - 1
+
+class MinHasher:
+    """
+    MinHash signatures over word shingles, with LSH banding.
+    Two texts whose shingle sets have Jaccard similarity s share at least one
+    band with probability 1 - (1 - s^r)^b (r rows per band, b bands), so
+    near-duplicates are found by band lookups instead of pairwise comparison.
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, shingle_size: int = 3, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+    def shingles(self, text: str) -> set:
+        """Lowercased word n-grams of `text` (the whole text if shorter than n words)."""
+        words = WORD_PATTERN.findall((text or "").lower())
+        if len(words) < self.shingle_size:
+            return {" ".join(words)} if words else set()
+        return {" ".join(words[i:i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1)}
+
+    def signature(self, text: str) -> np.ndarray:
+        """
+        MinHash signature of `text` as uint32 values.
+        Empty texts get an all-max signature, which never matches real text.
+        """
+        shingles = self.shingles(text)
+        if not shingles:
+            return np.full(self.num_perm, MERSENNE_PRIME, dtype=np.uint32)
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles)
+        ) % np.uint64(MERSENNE_PRIME)
+        # (num_perm, num_shingles) permuted hashes, minimum per permutation
+        permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % np.uint64(MERSENNE_PRIME)
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def band_keys(self, signature: np.ndarray) -> List[int]:
+        """One signed 64-bit key per LSH band (band index is mixed into the hash)."""
+        keys = []
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows]
+            digest = hashlib.blake2b(rows.tobytes(), digest_size=8, person=band.to_bytes(2, "little")).digest()
+            keys.append(int.from_bytes(digest, "little", signed=True))
+        return keys
+
+    @staticmethod
+    def similarity(first: np.ndarray, second: np.ndarray) -> float:
+        """Estimated Jaccard similarity of the texts behind two signatures."""
+        return float(np.mean(first == second))
+
+class DedupResult(NamedTuple):
+    fresh: List[dict]                   # Papers to process and store
+    duplicates: List[Tuple[dict, int]]  # (paper, id of the stored paper it duplicates)
+
+class Deduplicator:
+    """
+    Ingest-time duplicate detection.
+    A paper is a duplicate when its canonical arXiv id is already stored with
+    the same or a newer version, or when its title + abstract is a
+    near-duplicate (MinHash similarity >= threshold) of a stored paper or of an
+    earlier paper in the same batch. Newer versions of stored papers are kept
+    as fresh so they replace the stored row. Papers passed through are annotated
+    with the fields save_papers_bulk stores (canonical_id, version, minhash, band_keys).
+    """
+
+    def __init__(self, hasher: Optional[MinHasher] = None, threshold: float = 0.8):
+        self.hasher = hasher or MinHasher()
+        self.threshold = threshold
+
+    def annotate(self, paper: dict) -> dict:
+        """Add canonical id, version and MinHash fields to a crawled paper (in place)."""
+        canonical, version = canonical_paper_id(paper.get("link"))
+        paper.setdefault("canonical_id", canonical)
+        if paper.get("version") is None:
+            paper["version"] = version
+        signature = self.hasher.signature(f"{paper.get('title') or ''} {paper.get('abstract') or ''}")
+        paper["minhash"] = signature.tobytes()
+        paper["band_keys"] = self.hasher.band_keys(signature)
+        return paper
+
+    def partition(self, db: Session, papers: Iterable[dict]) -> DedupResult:
+        """
+        Split crawled papers into fresh papers and duplicates of stored ones.
+        Returns:
+            DedupResult; duplicates within the batch are dropped (only the latest
+            version of each canonical id, and the first of each near-duplicate
+            group, is kept).
+        """
+        # Collapse versions within the batch: keep the highest version per canonical id
+        latest: Dict[str, dict] = {}
+        for paper in papers:
+            self.annotate(paper)
+            canonical = paper["canonical_id"]
+            if not canonical:
+                continue
+            kept = latest.get(canonical)
+            if kept is None or (paper["version"] or 0) >= (kept["version"] or 0):
+                latest[canonical] = paper
+        batch = list(latest.values())
+
+        stored = find_by_canonical_ids(db, [paper["canonical_id"] for paper in batch])
+        fresh, duplicates = [], []
+        unknown = []
+        for paper in batch:
+            match = stored.get(paper["canonical_id"])
+            if match is None:
+                unknown.append(paper)
+            elif (paper["version"] or 0) > (match[1] or 0):
+                fresh.append(paper)  # Newer version replaces the stored row
+            else:
+                duplicates.append((paper, match[0]))
+
+        # Near-duplicates among papers with new canonical ids
+        candidates = find_minhash_candidates(db, [key for paper in unknown for key in paper["band_keys"]])
+        candidate_signatures = {
+            paper_id: np.frombuffer(blob, dtype=np.uint32) for paper_id, blob in candidates.items()
+        }
+        batch_bands: Dict[int, List[int]] = {}
+        accepted: List[dict] = []
+        for paper in unknown:
+            signature = np.frombuffer(paper["minhash"], dtype=np.uint32)
+            duplicate_of = self._best_match(signature, candidate_signatures)
+            if duplicate_of is not None:
+                duplicates.append((paper, duplicate_of))
+                continue
+            in_batch = {i for key in paper["band_keys"] for i in batch_bands.get(key, [])}
+            if any(
+                self.hasher.similarity(signature, np.frombuffer(accepted[i]["minhash"], dtype=np.uint32)) >= self.threshold
+                for i in in_batch
+            ):
+                continue
+            for key in paper["band_keys"]:
+                batch_bands.setdefault(key, []).append(len(accepted))
+            accepted.append(paper)
+        return DedupResult(fresh + accepted, duplicates)
+
+    def _best_match(self, signature: np.ndarray, candidates: Dict[int, np.ndarray]) -> Optional[int]:
+        best_id, best_score = None, self.threshold
+        for paper_id, other in candidates.items():
+            score = self.hasher.similarity(signature, other)
+            if score >= best_score:
+                best_id, best_score = paper_id, score
+        return best_id
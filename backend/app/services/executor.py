@@ -0,0 +1,47 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+class Executors:
+    """
+    Thread pools that keep blocking work off the asyncio event loop.
+    `io` runs network requests and database sessions; `inference` runs YAKE and
+    model.generate and is kept small so concurrent searches queue up instead of
+    oversubscribing the CPU (torch releases the GIL inside its kernels).
+    """
+
+    def __init__(self, io_workers: int = 8, inference_workers: int = 1):
+        self.io_workers = io_workers
+        self.inference_workers = inference_workers
+        self.io = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="io")
+        self.inference = ThreadPoolExecutor(max_workers=inference_workers, thread_name_prefix="inference")
+
+    async def run_io(self, func: Callable, *args, **kwargs) -> Any:
+        """Run a blocking I/O call (HTTP, database) on the I/O pool."""
+        return await self._run(self.io, func, *args, **kwargs)
+
+    async def run_inference(self, func: Callable, *args, **kwargs) -> Any:
+        """Run a CPU-bound NLP call on the bounded inference pool."""
+        return await self._run(self.inference, func, *args, **kwargs)
+
+    def queue_depths(self) -> dict:
+        """Tasks waiting for a free thread, per pool."""
+        return {"io": self.io._work_queue.qsize(), "inference": self.inference._work_queue.qsize()}
+
+    def shutdown(self, wait: bool = True):
+        """Stop both pools."""
+        self.io.shutdown(wait=wait)
+        self.inference.shutdown(wait=wait)
+
+    @staticmethod
+    async def _run(pool: ThreadPoolExecutor, func: Callable, *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(pool, functools.partial(func, *args, **kwargs))
+
+# Shared pools for the API handlers and the scheduler
+executors = Executors(
+    io_workers=int(os.getenv("IO_WORKERS", "8")),
+    inference_workers=int(os.getenv("INFERENCE_WORKERS", "1"))
+)
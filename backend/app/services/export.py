@@ -0,0 +1,78 @@
+import csv
+import io
+import json
+import zlib
+from typing import Iterable, Iterator
+
+EXPORT_FORMATS = ("ndjson", "csv")
+EXPORT_FIELDS = (
+    "id", "title", "abstract", "link", "published", "keyword", "keywords",
+    "summary", "canonical_id", "version"
+)
+# Bytes buffered before a chunk is emitted; keeps writes large without holding many rows
+CHUNK_BYTES = 64 * 1024
+
+def paper_record(paper) -> dict:
+    """Flatten a stored Paper into an export record."""
+    return {
+        "id": paper.id,
+        "title": paper.title,
+        "abstract": paper.abstract,
+        "link": paper.link,
+        "published": paper.published.isoformat() if paper.published else None,
+        "keyword": paper.keyword,
+        "keywords": paper.keywords.split(",") if paper.keywords else [],
+        "summary": paper.summary,
+        "canonical_id": paper.canonical_id,
+        "version": paper.version
+    }
+
+def iter_ndjson(papers: Iterable) -> Iterator[str]:
+    """Encode papers as one JSON object per line."""
+    for paper in papers:
+        yield json.dumps(paper_record(paper), ensure_ascii=False) + "\n"
+
+def iter_csv(papers: Iterable) -> Iterator[str]:
+    """Encode papers as CSV with a header row; keywords are joined with ';'."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    for paper in papers:
+        record = paper_record(paper)
+        record["keywords"] = ";".join(record["keywords"])
+        writer.writerow(record)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+def encode_export(papers: Iterable, fmt: str = "ndjson", compress: bool = False) -> Iterator[bytes]:
+    """
+    Stream papers as NDJSON or CSV bytes, optionally gzip-compressed.
+    Rows are encoded one at a time and emitted in ~64 KiB chunks.
+    Raises ValueError for unknown formats.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}, expected one of {EXPORT_FORMATS}")
+    lines = iter_ndjson(papers) if fmt == "ndjson" else iter_csv(papers)
+    chunks = _chunked(line.encode("utf-8") for line in lines)
+    return _gzip(chunks) if compress else chunks
+
+def _chunked(parts: Iterable[bytes]) -> Iterator[bytes]:
+    pending, size = [], 0
+    for part in parts:
+        pending.append(part)
+        size += len(part)
+        if size >= CHUNK_BYTES:
+            yield b"".join(pending)
+            pending, size = [], 0
+    if pending:
+        yield b"".join(pending)
+
+def _gzip(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 writes a gzip header
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
@@ -0,0 +1,165 @@
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional
+from ..database.config import SessionLocal
+from ..database.crud import claim_nlp_jobs, complete_nlp_jobs, fail_nlp_jobs, get_papers_by_ids
+from .executor import executors
+
+logger = logging.getLogger(__name__)
+
+def _paper_dict(paper) -> dict:
+    """Crawl-shaped dict of a stored paper, as the NLP step and save_papers_bulk expect."""
+    return {
+        "title": paper.title,
+        "abstract": paper.abstract,
+        "link": paper.link,
+        "published": paper.published,
+        "canonical_id": paper.canonical_id,
+        "version": paper.version
+    }
+
+class NLPJobWorker:
+    """
+    Drains the nlp_jobs table in the background.
+    Each of `concurrency` asyncio workers claims a batch of jobs (a DB lease,
+    so jobs survive restarts and are picked up again if a worker dies), runs
+    the NLP step on the inference pool, stores the results on the I/O pool and
+    marks the jobs done. Failed batches are retried with exponential backoff
+    up to `max_attempts` times.
+    """
+
+    def __init__(
+        self,
+        process: Callable[[List[dict]], List[dict]],
+        store: Callable,
+        session_factory=SessionLocal,
+        batch_size: int = 16,
+        concurrency: int = 1,
+        poll_interval: float = 2.0,
+        lease_seconds: float = 600,
+        max_attempts: int = 3,
+        retry_delay: float = 30
+    ):
+        """
+        Args:
+            process: NLP step over crawl-shaped paper dicts (CPU-bound).
+            store: Saves processed papers: store(db, papers, keyword).
+        """
+        self.process = process
+        self.store = store
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.processed = 0
+        self.failed = 0
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    def start(self):
+        """Start the worker tasks on the running event loop."""
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._run(), name=f"nlp-worker-{i}") for i in range(self.concurrency)
+        ]
+
+    async def stop(self):
+        """Cancel the worker tasks; claimed jobs are retried once their lease expires."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def wake(self):
+        """Signal that new jobs were enqueued, skipping the poll delay."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                handled = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in NLP worker: {e}")
+                handled = 0
+            if handled:
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run_once(self) -> int:
+        """
+        Claim and process one batch.
+        Returns:
+            Number of jobs claimed (0 when the queue is empty).
+        """
+        claimed = await executors.run_io(self._claim)
+        if not claimed:
+            return 0
+        job_ids = [job_id for job_id, _, _ in claimed]
+        try:
+            papers = await executors.run_inference(self.process, [paper for _, paper, _ in claimed])
+            await executors.run_io(self._store, job_ids, papers, [keyword for _, _, keyword in claimed])
+            self.processed += len(job_ids)
+        except Exception as e:
+            logger.error(f"NLP jobs {job_ids} failed: {e}")
+            await executors.run_io(self._fail, job_ids, str(e))
+            self.failed += len(job_ids)
+        return len(job_ids)
+
+    def _claim(self):
+        """Claim jobs and load their papers (blocking)."""
+        db = self.session_factory()
+        try:
+            jobs = claim_nlp_jobs(db, self.batch_size, self.lease_seconds, self.max_attempts)
+            papers = {paper.id: paper for paper in get_papers_by_ids(db, [job.paper_id for job in jobs])}
+            claimed = [(job.id, papers[job.paper_id]) for job in jobs if job.paper_id in papers]
+            orphans = [job.id for job in jobs if job.paper_id not in papers]
+            if orphans:
+                fail_nlp_jobs(db, orphans, "paper no longer exists", max_attempts=0)
+            return [(job_id, _paper_dict(paper), paper.keyword) for job_id, paper in claimed]
+        finally:
+            db.close()
+
+    def _store(self, job_ids: List[int], papers: List[dict], keywords: List[str]):
+        """Save processed papers (grouped by search keyword) and mark their jobs done (blocking)."""
+        db = self.session_factory()
+        try:
+            by_keyword: Dict[str, List[dict]] = {}
+            for paper, keyword in zip(papers, keywords):
+                by_keyword.setdefault(keyword, []).append(paper)
+            for keyword, group in by_keyword.items():
+                self.store(db, group, keyword)
+            complete_nlp_jobs(db, job_ids)
+        finally:
+            db.close()
+
+    def _fail(self, job_ids: List[int], error: str):
+        db = self.session_factory()
+        try:
+            fail_nlp_jobs(db, job_ids, error, self.max_attempts, self.retry_delay)
+        finally:
+            db.close()
+
+    def stats(self) -> dict:
+        """Return worker counters."""
+        return {
+            "running": self.running,
+            "workers": self.concurrency,
+            "processed": self.processed,
+            "failed": self.failed
+        }
@@ -0,0 +1,145 @@
+import re
+import threading
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[A-Za-z][A-Za-z0-9\-]+")
+
+STOPWORDS = frozenset("""
+a about above across after again against all almost also although always am among an and another any
+are around as at be because been before being below between both but by can could did do does doing
+done during each either else enough even ever every few for from further had has have having he her
+here hers him his how however i if in into is it its itself just least less like made make many may
+me might more most much must my neither no nor not now of off often on once one only or other our
+ours out over own per perhaps rather same several she should show shown shows since so some such
+than that the their theirs them then there these they this those though through thus to too under
+until up upon us use used using very via was we well were what when where whether which while who
+whom whose why will with within without would yet you your paper propose proposed present approach
+method methods results based new show study work novel
+""".split())
+
+class TfidfKeywordExtractor:
+    """
+    Corpus-level keyword extraction with TF-IDF.
+    Document frequencies of unigrams and bigrams are accumulated over the stored
+    corpus; a batch of abstracts is then scored as one sparse (COO) term matrix
+    with NumPy, instead of running YAKE once per abstract.
+    """
+
+    def __init__(self, top: int = 5, max_df_ratio: float = 0.5):
+        self.top = top
+        self.max_df_ratio = max_df_ratio
+        self.vocabulary: Dict[str, int] = {}
+        self.terms: List[str] = []
+        self.df = np.zeros(0, dtype=np.int64)
+        self.n_docs = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def analyze(text: Optional[str]) -> List[str]:
+        """
+        Split text into candidate terms.
+        Returns:
+            Lowercased unigrams and bigrams that contain no stopwords.
+        """
+        tokens = [token.lower() for token in TOKEN_PATTERN.findall(text or "")]
+        keep = [len(token) > 2 and token not in STOPWORDS for token in tokens]
+        terms = [token for token, ok in zip(tokens, keep) if ok]
+        terms.extend(
+            f"{tokens[i]} {tokens[i + 1]}"
+            for i in range(len(tokens) - 1) if keep[i] and keep[i + 1]
+        )
+        return terms
+
+    def fit(self, texts: Iterable[str]):
+        """Rebuild document frequencies from a corpus."""
+        with self._lock:
+            self.vocabulary = {}
+            self.terms = []
+            self.df = np.zeros(0, dtype=np.int64)
+            self.n_docs = 0
+        self.partial_fit(texts)
+
+    def partial_fit(self, texts: Iterable[str]):
+        """Add documents to the corpus statistics."""
+        with self._lock:
+            ids = []
+            n_docs = 0
+            for text in texts:
+                n_docs += 1
+                for term in set(self.analyze(text)):
+                    index = self.vocabulary.get(term)
+                    if index is None:
+                        index = self.vocabulary[term] = len(self.terms)
+                        self.terms.append(term)
+                    ids.append(index)
+            counts = np.bincount(np.asarray(ids, dtype=np.int64), minlength=len(self.terms))
+            df = np.zeros(len(self.terms), dtype=np.int64)
+            df[:len(self.df)] = self.df
+            self.df = df + counts
+            self.n_docs += n_docs
+
+    def extract(self, text: str, top: Optional[int] = None) -> List[str]:
+        """Extract keywords from a single text."""
+        return self.extract_batch([text], top=top)[0]
+
+    def extract_batch(self, texts: List[str], top: Optional[int] = None) -> List[List[str]]:
+        """
+        Extract keywords for many texts at once.
+        Args:
+            texts: Input texts (e.g., paper abstracts).
+            top: Keywords per text; defaults to the extractor's `top`.
+        Returns:
+            Keywords per text, highest TF-IDF first.
+        """
+        top = top or self.top
+        if not texts:
+            return []
+
+        # Map terms to columns; terms unseen in the corpus get temporary columns with df 0
+        with self._lock:
+            vocabulary = self.vocabulary
+            df = self.df
+            n_docs = self.n_docs
+            extra: Dict[str, int] = {}
+            rows, cols = [], []
+            for row, text in enumerate(texts):
+                for term in self.analyze(text):
+                    index = vocabulary.get(term)
+                    if index is None:
+                        index = extra.setdefault(term, len(df) + len(extra))
+                    rows.append(row)
+                    cols.append(index)
+            terms = self.terms  # Append-only, so columns below len(df) stay valid
+        extra_terms = list(extra)
+
+        results: List[List[str]] = [[] for _ in texts]
+        if not rows:
+            return results
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+
+        # Term frequencies: collapse duplicate (row, col) pairs of the COO matrix
+        n_cols = len(df) + len(extra_terms)
+        cells, tf = np.unique(rows * n_cols + cols, return_counts=True)
+        cell_rows, cell_cols = np.divmod(cells, n_cols)
+        doc_lengths = np.bincount(rows, minlength=len(texts))
+
+        known = cell_cols < len(df)
+        cell_df = np.zeros(len(cells), dtype=np.int64)
+        cell_df[known] = df[cell_cols[known]]
+        idf = np.log((1 + n_docs) / (1 + cell_df)) + 1.0
+        scores = tf / doc_lengths[cell_rows] * idf
+        if n_docs:
+            # Ignore terms that appear in most of the corpus
+            scores[cell_df > self.max_df_ratio * n_docs] = 0.0
+
+        # Sort by row, then by descending score, and keep the first `top` per row
+        order = np.lexsort((-scores, cell_rows))
+        sorted_rows = cell_rows[order]
+        starts = np.searchsorted(sorted_rows, np.arange(len(texts)))
+        ranks = np.arange(len(order)) - starts[sorted_rows]
+        selected = order[(ranks < top) & (scores[order] > 0)]
+        for row, col in zip(cell_rows[selected], cell_cols[selected]):
+            results[row].append(terms[col] if col < len(df) else extra_terms[col - len(df)])
+        return results
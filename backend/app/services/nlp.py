@@ -1,53 +1,280 @@
+import multiprocessing
+import threading
+import time
 import yake
-from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
-import torch
+from concurrent.futures import ProcessPoolExecutor
 from typing import List, Optional
+from .cache import NLPCache
+from .keywords import TfidfKeywordExtractor
+from .metrics import KEYWORD_SECONDS, NLP_ERRORS, SUMMARY_SECONDS, SUMMARY_TOKENS, SUMMARY_TOKENS_PER_SECOND
+
+# Inference profiles for the summarizer:
+#   auto - fp16 on an accelerator, fp32 on CPU
+#   fp16 - half precision (slow or unsupported for many ops on CPU)
+#   fp32 - full precision
+#   bf16 - bfloat16 weights and activations (needs AVX512-BF16/AMX to pay off on CPU)
+#   int8 - dynamic int8 quantization of the Linear layers (CPU only)
+INFERENCE_PROFILES = ("auto", "fp16", "fp32", "bf16", "int8")
+
+# Keyword extraction engines:
+#   yake  - per-abstract YAKE, fanned out over a process pool for large batches
+#   tfidf - vectorized TF-IDF against the stored corpus (see keywords.py)
+KEYWORD_ENGINES = ("yake", "tfidf")
+
+# YAKE extractor of a keyword worker process, built once by _init_keyword_worker
+_worker_extractor = None
+
+def _init_keyword_worker(kw_config: dict):
+    global _worker_extractor
+    _worker_extractor = yake.KeywordExtractor(**kw_config, features=None)
+
+def _extract_keywords_worker(text: str) -> List[str]:
+    try:
+        return [kw[0] for kw in _worker_extractor.extract_keywords(text)]
+    except Exception as e:
+        print(f"Error extracting keywords: {e}")
+        return []
 
 class NLPProcessor:
-    def __init__(self, model_name: str = "sshleifer/distilbart-cnn-12-6"):
+    # Attributes that only exist once the summarization model is loaded
+    _LAZY_ATTRIBUTES = ("tokenizer", "model", "device")
+
+    def __init__(
+        self,
+        model_name: str = "sshleifer/distilbart-cnn-12-6",
+        cache: Optional[NLPCache] = None,
+        profile: str = "auto",
+        num_threads: Optional[int] = None,
+        keyword_engine: str = "yake",
+        keyword_workers: Optional[int] = None,
+        parallel_threshold: int = 64
+    ):
         """
         Initialize YAKE for keyword extraction and DistilBART-CNN for summarization.
-        Uses FP16 quantization for efficiency.
+        The tokenizer and model (and torch/transformers) are loaded lazily on
+        first use or by an explicit `load()` call, so constructing the processor is cheap.
+        Args:
+            model_name: Hugging Face model id or local path of the summarizer.
+            cache: Optional NLPCache for reusing outputs of previously seen texts.
+            profile: Inference profile, one of INFERENCE_PROFILES.
+            num_threads: Torch intra-op thread count; None keeps the torch default.
+            keyword_engine: Keyword extraction engine, one of KEYWORD_ENGINES.
+            keyword_workers: YAKE worker processes for batches; None uses the CPU count.
+            parallel_threshold: Smallest batch that is fanned out to worker processes.
         """
+        if profile not in INFERENCE_PROFILES:
+            raise ValueError(f"Unknown inference profile {profile!r}, expected one of {INFERENCE_PROFILES}")
+        if keyword_engine not in KEYWORD_ENGINES:
+            raise ValueError(f"Unknown keyword engine {keyword_engine!r}, expected one of {KEYWORD_ENGINES}")
+        self.cache = cache
+        self.profile = profile
+        self.active_profile: Optional[str] = None  # Resolved profile once loaded
+        self.num_threads = num_threads
+
         # Initialize YAKE
-        self.kw_extractor = yake.KeywordExtractor(
-            lan="en",          # Language: English
-            n=2,               # Maximum n-gram size
-            dedupLim=0.9,      # Deduplication threshold
-            top=5,             # Number of keywords
-            features=None
-        ) 
+        self.kw_config = {
+            "lan": "en",       # Language: English
+            "n": 2,            # Maximum n-gram size
+            "dedupLim": 0.9,   # Deduplication threshold
+            "top": 5,          # Number of keywords
+        }
+        self.kw_extractor = yake.KeywordExtractor(**self.kw_config, features=None)
+        self.keyword_engine = keyword_engine
+        self.keyword_workers = keyword_workers or multiprocessing.cpu_count()
+        self.parallel_threshold = parallel_threshold
+        self._keyword_pool: Optional[ProcessPoolExecutor] = None
+        self.tfidf = TfidfKeywordExtractor(top=self.kw_config["top"])
+
+        # Beam search settings shared by single and batched summarization
+        self.generation_config = {
+            "do_sample": False,
+            "num_beams": 4,
+            "early_stopping": True
+        }
         
-        # Initialize DistilBART-CNN
+        # DistilBART-CNN is loaded on demand
         self.model_name = model_name
-        self.tokenizer = AutoTokenizer.from_pretrained(
-            self.model_name,
-            clean_up_tokenization_spaces=True
-        )
-        self.model = AutoModelForSeq2SeqLM.from_pretrained(self.model_name)
-        
-        # Use FP16 quantization and move to GPU if available
-        self.device = "xpu" if torch.xpu.is_available() else "cpu"
-        self.model = self.model.half().to(self.device)
+        self.load_error: Optional[str] = None
+        self._load_lock = threading.Lock()
+        self._pool_lock = threading.Lock()
+
+    def __getattr__(self, name):
+        # Only reached when normal lookup fails, i.e. before the model is loaded
+        if name in NLPProcessor._LAZY_ATTRIBUTES:
+            self.load()
+            return self.__dict__[name]
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+    @property
+    def is_loaded(self) -> bool:
+        """Whether the tokenizer and model are loaded."""
+        return "model" in self.__dict__
+
+    def load(self):
+        """
+        Load the DistilBART-CNN tokenizer and model and apply the inference profile.
+        Safe to call from several threads; only the first call does the work.
+        """
+        if self.is_loaded:
+            return
+        with self._load_lock:
+            if self.is_loaded:
+                return
+            import torch
+            from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+            try:
+                tokenizer = AutoTokenizer.from_pretrained(
+                    self.model_name,
+                    clean_up_tokenization_spaces=True
+                )
+                model = AutoModelForSeq2SeqLM.from_pretrained(self.model_name)
+                if self.num_threads:
+                    torch.set_num_threads(self.num_threads)
+                model, device = self._apply_profile(model)
+            except Exception as e:
+                self.load_error = str(e)
+                raise
+            self.tokenizer = tokenizer
+            self.device = device
+            self.model = model
+            self.load_error = None
+
+    def _resolve_profile(self):
+        """
+        Pick the device and the concrete profile ("auto" becomes fp16 or fp32).
+        Returns:
+            Tuple of (profile, device).
+        """
+        import torch
+
+        # Move to GPU if available
+        device = "xpu" if torch.xpu.is_available() else "cpu"
+        profile = self.profile
+        if profile == "auto":
+            profile = "fp32" if device == "cpu" else "fp16"
+        return profile, device
+
+    def _apply_profile(self, model):
+        """
+        Convert the model for the configured inference profile and move it to its device.
+        Returns:
+            Tuple of (model, device).
+        """
+        import torch
+
+        profile, device = self._resolve_profile()
+        if profile == "fp16":
+            model = model.half()
+        elif profile == "bf16":
+            model = model.to(torch.bfloat16)
+        elif profile == "int8":
+            # Dynamic quantization kernels only exist on CPU
+            device = "cpu"
+            model = torch.quantization.quantize_dynamic(
+                model.float(), {torch.nn.Linear}, dtype=torch.qint8
+            )
+        self.active_profile = profile
+        return model.to(device).eval(), device
     
     def extract_keywords(self, text: str) -> List[str]:
         """
-        Extract keywords from text using YAKE.
+        Extract keywords from text using the configured engine.
         Args:
             text: Input text (e.g., paper abstract).
         Returns:
             List of extracted keywords.
         """
+        if self.keyword_engine == "tfidf":
+            return self.tfidf.extract(text) if isinstance(text, str) else []
+        key = None
+        if self.cache is not None and isinstance(text, str):
+            key = self.cache.make_key("keywords", text, "yake", self.kw_config)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
         try:
-            keywords = self.kw_extractor.extract_keywords(text)
-            return [kw[0] for kw in keywords]
+            keywords = [kw[0] for kw in self.kw_extractor.extract_keywords(text)]
         except Exception as e:
             print(f"Error extracting keywords: {e}")
             return []
+        if key is not None:
+            self.cache.set(key, "keywords", keywords)
+        return keywords
     
+    def extract_keywords_batch(self, texts: List[str]) -> List[List[str]]:
+        """
+        Extract keywords for many texts.
+        With the YAKE engine, cache misses are spread over a pool of worker
+        processes once the batch reaches `parallel_threshold`; the TF-IDF
+        engine scores the whole batch in one vectorized pass.
+        Args:
+            texts: Input texts (e.g., paper abstracts).
+        Returns:
+            Keywords per text, in input order.
+        """
+        with KEYWORD_SECONDS.time(engine=self.keyword_engine):
+            return self._extract_keywords_batch(texts)
+
+    def _extract_keywords_batch(self, texts: List[str]) -> List[List[str]]:
+        if self.keyword_engine == "tfidf":
+            return self.tfidf.extract_batch([text if isinstance(text, str) else "" for text in texts])
+
+        results: List[Optional[List[str]]] = [None] * len(texts)
+        keys = {}
+        if self.cache is not None:
+            keys = {
+                i: self.cache.make_key("keywords", text, "yake", self.kw_config)
+                for i, text in enumerate(texts) if isinstance(text, str)
+            }
+            cached = self.cache.get_many(keys.values())
+            for i, key in keys.items():
+                results[i] = cached.get(key)
+        pending = [i for i, result in enumerate(results) if result is None]
+        if not pending:
+            return results
+
+        if len(pending) >= self.parallel_threshold and self.keyword_workers > 1:
+            pool = self._get_keyword_pool()
+            chunksize = max(1, len(pending) // (self.keyword_workers * 4))
+            extracted = list(pool.map(_extract_keywords_worker, [texts[i] for i in pending], chunksize=chunksize))
+        else:
+            extracted = []
+            for i in pending:
+                try:
+                    extracted.append([kw[0] for kw in self.kw_extractor.extract_keywords(texts[i])])
+                except Exception as e:
+                    NLP_ERRORS.inc(stage="keywords")
+                    print(f"Error extracting keywords: {e}")
+                    extracted.append([])
+
+        for i, keywords in zip(pending, extracted):
+            results[i] = keywords
+        if keys:
+            self.cache.set_many({keys[i]: results[i] for i in pending if i in keys}, "keywords")
+        return results
+
+    def close(self):
+        """Shut down the keyword worker processes, if any were started."""
+        if self._keyword_pool is not None:
+            self._keyword_pool.shutdown(wait=False, cancel_futures=True)
+            self._keyword_pool = None
+
+    def _get_keyword_pool(self) -> ProcessPoolExecutor:
+        """Start the YAKE worker processes on first use."""
+        with self._pool_lock:
+            if self._keyword_pool is None:
+                # spawn rather than fork: the parent may hold torch threads and DB connections
+                self._keyword_pool = ProcessPoolExecutor(
+                    max_workers=self.keyword_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_keyword_worker,
+                    initargs=(self.kw_config,)
+                )
+            return self._keyword_pool
+
     def generate_summary(self, text: str, max_length: int = 150, min_length: int = 30) -> Optional[str]:
         """
-        Generate a summary using DistilBART-CNN (FP16).
+        Generate a summary using DistilBART-CNN.
         Args:
             text: Input text (e.g., paper abstract).
             max_length: Maximum length of the summary.
@@ -59,6 +286,12 @@ class NLPProcessor:
             text = text.strip()
             if not text:
                 return None
+            key = None
+            if self.cache is not None:
+                key = self._summary_key(text, max_length, min_length)
+                cached = self.cache.get(key)
+                if cached is not None:
+                    return cached
             inputs = self.tokenizer(
                 text,
                 return_tensors="pt",
@@ -67,21 +300,185 @@ class NLPProcessor:
             )
             inputs = {k: v.to(self.device) for k, v in inputs.items()}
             
+            started = time.perf_counter()
             summary_ids = self.model.generate(
                 inputs["input_ids"],
                 max_length=max_length,
                 min_length=min_length,
-                do_sample=False,
-                num_beams=4,
-                early_stopping=True
+                **self.generation_config
             )
+            self._observe_generation(summary_ids, time.perf_counter() - started)
             summary = self.tokenizer.decode(
                 summary_ids[0], 
                 skip_special_tokens=True,
                 clean_up_tokenization_spaces=True
             )
+            if key is not None:
+                self.cache.set(key, "summary", summary)
             return summary
         except Exception as e:
+            NLP_ERRORS.inc(stage="summary")
             print(f"Error generating summary: {e}")
             return None
 
+    def generate_summaries(
+        self,
+        texts: List[str],
+        batch_size: int = 8,
+        max_length: int = 150,
+        min_length: int = 30
+    ) -> List[Optional[str]]:
+        """
+        Generate summaries for many texts with batched beam search.
+        Inputs are sorted by token length and split into buckets of
+        `batch_size`, so each batch is only padded to its longest member.
+        Args:
+            texts: Input texts (e.g., paper abstracts).
+            batch_size: Number of texts per generate call.
+            max_length: Maximum length of each summary.
+            min_length: Minimum length of each summary.
+        Returns:
+            Summaries in input order; None for empty inputs or failed batches.
+        """
+        summaries: List[Optional[str]] = [None] * len(texts)
+        items = [(i, text.strip()) for i, text in enumerate(texts) if text and text.strip()]
+
+        # Serve previously seen texts from the cache and only summarize the rest
+        keys = {}
+        if self.cache is not None and items:
+            keys = {i: self._summary_key(text, max_length, min_length) for i, text in items}
+            cached = self.cache.get_many(keys.values())
+            for i, _ in items:
+                if keys[i] in cached:
+                    summaries[i] = cached[keys[i]]
+            items = [(i, text) for i, text in items if keys[i] not in cached]
+        if not items:
+            return summaries
+
+        try:
+            lengths = [len(ids) for ids in self.tokenizer(
+                [text for _, text in items],
+                max_length=1024,
+                truncation=True
+            )["input_ids"]]
+        except Exception as e:
+            NLP_ERRORS.inc(stage="tokenize")
+            print(f"Error tokenizing texts: {e}")
+            return summaries
+
+        import torch
+
+        # Bucket by token length so padding stays small within each batch
+        order = sorted(range(len(items)), key=lambda k: lengths[k])
+        batch_size = max(1, batch_size)
+        for start in range(0, len(order), batch_size):
+            bucket = order[start:start + batch_size]
+            try:
+                inputs = self.tokenizer(
+                    [items[k][1] for k in bucket],
+                    return_tensors="pt",
+                    max_length=1024,
+                    truncation=True,
+                    padding=True
+                )
+                inputs = {k: v.to(self.device) for k, v in inputs.items()}
+
+                started = time.perf_counter()
+                with torch.no_grad():
+                    summary_ids = self.model.generate(
+                        inputs["input_ids"],
+                        attention_mask=inputs["attention_mask"],
+                        max_length=max_length,
+                        min_length=min_length,
+                        **self.generation_config
+                    )
+                self._observe_generation(summary_ids, time.perf_counter() - started)
+                decoded = self.tokenizer.batch_decode(
+                    summary_ids,
+                    skip_special_tokens=True,
+                    clean_up_tokenization_spaces=True
+                )
+                for k, summary in zip(bucket, decoded):
+                    summaries[items[k][0]] = summary
+                if keys:
+                    self.cache.set_many(
+                        {keys[items[k][0]]: summary for k, summary in zip(bucket, decoded)},
+                        "summary"
+                    )
+            except Exception as e:
+                NLP_ERRORS.inc(stage="summary")
+                print(f"Error generating summaries: {e}")
+        return summaries
+
+    def _observe_generation(self, summary_ids, seconds: float):
+        """Record generate() latency and throughput (non-padding output tokens per second)."""
+        SUMMARY_SECONDS.observe(seconds)
+        try:
+            pad_id = getattr(self.tokenizer, "pad_token_id", None)
+            tokens = int(summary_ids.ne(pad_id).sum()) if pad_id is not None else int(summary_ids.numel())
+        except Exception:
+            return  # Output without a token tensor (e.g. a stubbed model)
+        SUMMARY_TOKENS.inc(tokens)
+        if seconds > 0:
+            SUMMARY_TOKENS_PER_SECOND.observe(tokens / seconds)
+
+    def embed_texts(self, texts: List[str], batch_size: int = 16, max_length: int = 512):
+        """
+        Compute dense embeddings with the summarizer's encoder.
+        Encoder hidden states are mean-pooled over non-padding tokens and
+        L2-normalized, so a dot product between two embeddings is their cosine
+        similarity. Inputs are length-bucketed like generate_summaries.
+        Args:
+            texts: Input texts (e.g., paper abstracts).
+            batch_size: Number of texts per encoder call.
+            max_length: Token limit per text.
+        Returns:
+            float32 array of shape (len(texts), hidden size); rows of empty
+            texts are all zeros.
+        """
+        import numpy as np
+        import torch
+
+        encoder = self.model.get_encoder()
+        embeddings = np.zeros((len(texts), self.model.config.d_model), dtype=np.float32)
+        items = [(i, text.strip()) for i, text in enumerate(texts) if text and text.strip()]
+        if not items:
+            return embeddings
+
+        lengths = [len(ids) for ids in self.tokenizer(
+            [text for _, text in items],
+            max_length=max_length,
+            truncation=True
+        )["input_ids"]]
+        order = sorted(range(len(items)), key=lambda k: lengths[k])
+        batch_size = max(1, batch_size)
+        for start in range(0, len(order), batch_size):
+            bucket = order[start:start + batch_size]
+            inputs = self.tokenizer(
+                [items[k][1] for k in bucket],
+                return_tensors="pt",
+                max_length=max_length,
+                truncation=True,
+                padding=True
+            )
+            inputs = {k: v.to(self.device) for k, v in inputs.items()}
+            with torch.no_grad():
+                hidden = encoder(
+                    input_ids=inputs["input_ids"],
+                    attention_mask=inputs["attention_mask"]
+                ).last_hidden_state.float()
+                mask = inputs["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+                pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1.0)
+                pooled = torch.nn.functional.normalize(pooled, dim=-1)
+            for k, vector in zip(bucket, pooled.cpu().numpy()):
+                embeddings[items[k][0]] = vector
+        return embeddings
+
+    def _summary_key(self, text: str, max_length: int, min_length: int) -> str:
+        """Cache key for a summary of `text` under the current model, inference profile and generation settings."""
+        # Precision changes the output, so profiles must not share entries; keys can be
+        # needed before the model loads, so "auto" is resolved here the way load() would
+        profile = self.active_profile or self._resolve_profile()[0]
+        params = dict(self.generation_config, max_length=max_length, min_length=min_length, profile=profile)
+        return self.cache.make_key("summary", text, self.model_name, params)
+
@@ -0,0 +1,205 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Optional
+from ..database.config import SessionLocal
+from ..database.crud import save_papers_bulk, enqueue_nlp_jobs
+from .dedup import Deduplicator
+from .executor import executors
+
+logger = logging.getLogger(__name__)
+
+class Crawl:
+    """One keyword crawl moving through the pipeline, with its counters."""
+
+    def __init__(self, keyword: str, max_results: Optional[int] = None):
+        self.keyword = keyword
+        self.max_results = max_results
+        self.fetched = 0
+        self.newest: Optional[dict] = None   # Newest fetched paper, for the keyword's high-water mark
+        self.duplicates = 0
+        self.stored = 0
+        self.deferred = 0     # Stored without NLP output, queued as NLP jobs
+        self.errors: List[str] = []
+        self.failed = False   # A fetch, dedup or store step failed; some papers may be missing
+        self.pending = 0      # Batches not yet stored
+        self.done: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    def stats(self) -> dict:
+        return {
+            "keyword": self.keyword,
+            "fetched": self.fetched,
+            "duplicates": self.duplicates,
+            "stored": self.stored,
+            "deferred": self.deferred,
+            "failed": self.failed,
+            "errors": list(self.errors)
+        }
+
+class IngestPipeline:
+    """
+    Staged ingestion for scheduled crawls: fetch -> dedup -> NLP -> store.
+    Stages are pools of asyncio workers connected by bounded queues, so a slow
+    stage blocks the ones before it instead of letting crawled papers pile up
+    in memory. Fetching runs on the event loop, dedup and storing on the I/O
+    pool, and keyword extraction/summarization on the inference pool in
+    batches of `batch_size` papers. A batch whose NLP step fails is stored
+    without NLP output and queued as NLP jobs (see services/jobs.py).
+
+    Dedup runs on whole crawls, so near-duplicates within a crawl are caught;
+    concurrent crawls of overlapping keywords rely on the canonical-id upsert.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[Crawl], Awaitable[List[dict]]],
+        deduplicator: Optional[Deduplicator] = None,
+        process: Optional[Callable[[List[dict]], List[dict]]] = None,
+        store: Callable = save_papers_bulk,
+        session_factory=SessionLocal,
+        batch_size: int = 16,
+        fetch_workers: int = 4,
+        dedup_workers: int = 1,
+        nlp_workers: int = 1,
+        store_workers: int = 1,
+        queue_size: int = 4
+    ):
+        """
+        Args:
+            fetch: Coroutine returning the crawled papers of a Crawl.
+            process: NLP step over paper dicts (CPU-bound); None stores papers as crawled.
+            store: Saves a batch: store(db, papers, keyword).
+            queue_size: Capacity of each inter-stage queue (crawls or batches).
+        """
+        self.fetch = fetch
+        self.deduplicator = deduplicator or Deduplicator()
+        self.process = process
+        self.store = store
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.workers = {"fetch": fetch_workers, "dedup": dedup_workers, "nlp": nlp_workers, "store": store_workers}
+        self.queue_size = queue_size
+        self._queues = {}
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    def start(self):
+        """Start the stage workers on the running event loop."""
+        if self.running:
+            return
+        self._queues = {stage: asyncio.Queue(maxsize=self.queue_size) for stage in self.workers}
+        handlers = {"fetch": self._fetch, "dedup": self._dedup, "nlp": self._nlp, "store": self._store}
+        self._tasks = [
+            asyncio.create_task(self._worker(stage, handlers[stage]), name=f"ingest-{stage}-{i}")
+            for stage, count in self.workers.items() for i in range(count)
+        ]
+
+    async def stop(self):
+        """Cancel the stage workers; crawls still in flight are cancelled."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for queue in self._queues.values():
+            while not queue.empty():
+                item = queue.get_nowait()
+                if not item[0].done.done():
+                    item[0].done.cancel()
+
+    async def run(self, crawl: Crawl) -> Crawl:
+        """
+        Push a crawl through every stage (waiting while the fetch queue is full).
+        Returns:
+            The crawl once all of its batches are stored or it failed.
+        """
+        self.start()
+        await self._queues["fetch"].put((crawl,))
+        return await crawl.done
+
+    async def _worker(self, stage: str, handler: Callable):
+        queue = self._queues[stage]
+        while True:
+            item = await queue.get()
+            crawl = item[0]
+            try:
+                await handler(*item)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ingest {stage} stage failed for {crawl.keyword!r}: {e}")
+                crawl.errors.append(f"{stage}: {e}")
+                crawl.failed = True
+                self._finish(crawl, batches=1 if stage in ("nlp", "store") else crawl.pending)
+            finally:
+                queue.task_done()
+
+    async def _fetch(self, crawl: Crawl):
+        papers = await self.fetch(crawl)
+        crawl.fetched = len(papers)
+        if papers:
+            crawl.newest = max(papers, key=lambda paper: paper.get("published") or "")
+        await self._queues["dedup"].put((crawl, papers))
+
+    async def _dedup(self, crawl: Crawl, papers: List[dict]):
+        result = await executors.run_io(self._partition, papers)
+        crawl.duplicates = len(result.duplicates)
+        fresh = result.fresh
+        batches = [fresh[i:i + self.batch_size] for i in range(0, len(fresh), self.batch_size)]
+        crawl.pending = len(batches)
+        if not batches:
+            self._finish(crawl, batches=0)
+        for batch in batches:
+            await self._queues["nlp"].put((crawl, batch))
+
+    def _partition(self, papers: List[dict]):
+        db = self.session_factory()
+        try:
+            return self.deduplicator.partition(db, papers)
+        finally:
+            db.close()
+
+    async def _nlp(self, crawl: Crawl, batch: List[dict]):
+        processed = True
+        if self.process is not None:
+            try:
+                batch = await executors.run_inference(self.process, batch)
+            except Exception as e:
+                logger.error(f"NLP failed for a batch of {crawl.keyword!r}, deferring to NLP jobs: {e}")
+                crawl.errors.append(f"nlp: {e}")
+                processed = False
+        await self._queues["store"].put((crawl, batch, processed))
+
+    async def _store(self, crawl: Crawl, batch: List[dict], processed: bool):
+        crawl.deferred += await executors.run_io(self._save, crawl.keyword, batch, processed)
+        crawl.stored += len(batch)
+        self._finish(crawl, batches=1)
+
+    def _save(self, keyword: str, batch: List[dict], processed: bool) -> int:
+        """Store a batch (blocking); returns how many papers were deferred to NLP jobs."""
+        db = self.session_factory()
+        try:
+            if processed:
+                self.store(db, batch, keyword)
+                return 0
+            stored = save_papers_bulk(db, batch, keyword)["papers"]
+            enqueue_nlp_jobs(db, [paper.id for paper in stored])
+            return len(stored)
+        finally:
+            db.close()
+
+    @staticmethod
+    def _finish(crawl: Crawl, batches: int):
+        """Count `batches` of a crawl as finished; resolve it once none are pending."""
+        crawl.pending = max(crawl.pending - batches, 0)
+        if crawl.pending == 0 and not crawl.done.done():
+            crawl.done.set_result(crawl)
+
+    def stats(self) -> dict:
+        """Return worker counts and current queue depths per stage."""
+        return {
+            "running": self.running,
+            "workers": dict(self.workers),
+            "queued": {stage: queue.qsize() for stage, queue in self._queues.items()}
+        }
@@ -0,0 +1,95 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterable, NamedTuple, Optional
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+    tag: Optional[str]
+    expires_at: float
+
+class ResponseCache:
+    """
+    In-process LRU cache of serialized API responses with a TTL.
+    Each entry carries a tag (the normalized search keyword, or None for
+    unfiltered listings) so writes can drop just the affected entries.
+    Caches of full-text queries should be cleared on every write instead,
+    since a paper saved under any keyword can match them.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: "OrderedDict[tuple, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def normalize_tag(keyword: Optional[str]) -> Optional[str]:
+        """Case- and whitespace-insensitive form of a search keyword."""
+        return " ".join(keyword.lower().split()) if keyword is not None else None
+
+    @staticmethod
+    def make_etag(body: bytes) -> str:
+        """Strong ETag derived from the response body."""
+        return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+    def get(self, key: tuple) -> Optional[CachedResponse]:
+        """Return the live entry for `key`, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= self.clock():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key: tuple, body: bytes, keyword: Optional[str] = None) -> CachedResponse:
+        """Store a response body under `key`, evicting the least recently used entries."""
+        entry = CachedResponse(body, self.make_etag(body), self.normalize_tag(keyword), self.clock() + self.ttl)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate_keywords(self, keywords: Iterable[str]):
+        """
+        Drop entries for the given search keywords and the unfiltered listings
+        (which include every paper).
+        """
+        tags = {self.normalize_tag(keyword) for keyword in keywords}
+        tags.add(None)
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if entry.tag in tags]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Return hit/miss/invalidation counters and the current size."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl
+            }
@@ -1,11 +1,26 @@
+import asyncio
 import logging
-from datetime import datetime
+import os
+import socket
+import time
+import uuid
+import zlib
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from pytz import timezone
-from ..database.crud import save_paper
-from ..database.config import get_db
-from .arxiv import ArxivCrawler
+from ..database.crud import (
+    get_watermark, update_watermark, list_subscriptions, record_subscription_run, acquire_lock, release_lock
+)
+from ..database.config import SessionLocal
+from .arxiv import AsyncArxivCrawler, IncompleteCrawl
+from .executor import executors
+from .dedup import Deduplicator
+from .pipeline import Crawl, IngestPipeline
+from .metrics import CRAWL_SECONDS, INGESTED_PAPERS
 
 # Custom filter to add separator after each log
 class SeparatorFilter(logging.Filter):
@@ -22,60 +37,378 @@ handler.setFormatter(formatter)
 handler.addFilter(SeparatorFilter())
 logger.addHandler(handler)
 
+UTC = timezone("UTC")
+DEFAULT_JOB_ID = "daily_fetch_papers"
+DEFAULT_KEYWORD = "machine learning"
+SUBSCRIPTION_JOB_PREFIX = "subscription_"
+LEADER_LOCK = "scheduler_leader"
+
+# Scheduler whose crawls run_scheduled_crawl dispatches to (set by Scheduler.start)
+_active_scheduler: Optional["Scheduler"] = None
+
+async def run_scheduled_crawl(keyword: str, max_results: Optional[int] = None, subscription_id: Optional[int] = None):
+    """
+    Job function of every scheduled crawl.
+    Jobs reference this module-level function instead of a Scheduler method
+    so they can be stored in the SQLAlchemy job store and run by whichever
+    process is the leader.
+    """
+    if _active_scheduler is None:
+        logger.error(f"No active scheduler to crawl {keyword!r}")
+        return
+    await _active_scheduler.run_exclusive(keyword, max_results, subscription_id)
+
 class Scheduler:
-    def __init__(self):
-        self.scheduler = AsyncIOScheduler(timezone=timezone("Asia/Shanghai"))
-        self.crawler = ArxivCrawler(max_results=5)
-
-    def schedule_tasks(self):
-        """Schedule periodic tasks."""
-        # Daily task: Fetch papers at 2:00 AM
-        self.scheduler.add_job( 
-            self.fetch_and_save_papers,
-            # trigger="interval",
-            # seconds=10,  
-            trigger=CronTrigger(hour=2, minute=0),
-            id="daily_fetch_papers",
-            replace_existing=True,
-            kwargs={"keyword": "machine learning"}
+    """
+    Crawls subscribed keywords on their own cadence.
+    Each enabled subscription gets an interval job whose first run is offset
+    by a stable per-keyword phase and whose runs are jittered, so hundreds of
+    topics spread out instead of all firing at once. Crawls go through the
+    staged ingest pipeline, whose fetch workers bound how many crawls run
+    concurrently. Without subscriptions the daily "machine learning" crawl at
+    2:00 AM is scheduled instead.
+
+    With several app processes (uvicorn workers) jobs live in a shared
+    SQLAlchemy job store and every process starts its scheduler paused; a
+    leader lease in the database (renewed every lease/3 seconds) decides which
+    one resumes its scheduler and runs jobs. Each run additionally takes a
+    per-keyword lock, so a run is never executed twice during a leader
+    handover. Runs missed while no leader was up are coalesced into one.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        jitter: int = 300,
+        process: Optional[Callable[[List[dict]], List[dict]]] = None,
+        store: Optional[Callable] = None,
+        session_factory=SessionLocal,
+        jobstore_engine=None,
+        lease_seconds: Optional[float] = None,
+        misfire_grace_time: Optional[int] = 6 * 3600,
+        **pipeline_options
+    ):
+        """
+        Args:
+            max_concurrency: Crawls allowed to run at the same time.
+            jitter: Random delay (seconds) added to every scheduled run.
+            jobstore_engine: SQLAlchemy engine for persistent jobs; None keeps them in memory.
+            lease_seconds: Leader lease length; None runs jobs in this process unconditionally.
+            misfire_grace_time: How late (seconds) a missed run may still start; None for no limit.
+            process: NLP step for crawled papers; None stores them without NLP output.
+            store: Saves a processed batch: store(db, papers, keyword).
+            pipeline_options: batch_size, dedup_workers, nlp_workers, store_workers
+                and queue_size of the IngestPipeline.
+        """
+        jobstores = {"default": SQLAlchemyJobStore(engine=jobstore_engine)} if jobstore_engine is not None else {}
+        self.scheduler = AsyncIOScheduler(
+            timezone=timezone("Asia/Shanghai"),
+            jobstores=jobstores,
+            # Missed runs (e.g. while no worker was up) run once, not once per missed slot
+            job_defaults={"coalesce": True, "misfire_grace_time": misfire_grace_time, "max_instances": 1}
+        )
+        self.lease_seconds = lease_seconds
+        self.node_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+        self._leader_task: Optional[asyncio.Task] = None
+        self._schedule_task: Optional[asyncio.Task] = None
+        self.crawler = AsyncArxivCrawler(max_results=5)
+        self.deduplicator = Deduplicator()
+        self.session_factory = session_factory
+        self.max_concurrency = max_concurrency
+        self.jitter = jitter
+        if store is not None:
+            pipeline_options["store"] = store
+        self.pipeline = IngestPipeline(
+            fetch=self._fetch,
+            deduplicator=self.deduplicator,
+            process=process,
+            session_factory=session_factory,
+            fetch_workers=max_concurrency,
+            **pipeline_options
+        )
+        self.active_runs = 0
+        self.run_stats: Dict[str, dict] = {}  # Last-run stats per keyword
+
+    def _load_subscriptions(self) -> list:
+        db = self.session_factory()
+        try:
+            return list_subscriptions(db, enabled_only=True)
+        except Exception as e:
+            logger.error(f"Error loading subscriptions: {e}")
+            return []
+        finally:
+            db.close()
+
+    def _first_run(self, subscription, now: datetime) -> datetime:
+        """
+        Start of a subscription's interval trigger: one interval after its last
+        run, or a stable per-keyword offset into the first interval.
+        """
+        interval = timedelta(minutes=subscription.interval_minutes)
+        if subscription.last_run_at is not None:
+            due = UTC.localize(subscription.last_run_at) + interval
+            if due > now:
+                return due
+        phase = zlib.crc32(subscription.keyword.encode("utf-8")) % max(int(interval.total_seconds()), 1)
+        return now + timedelta(seconds=phase)
+
+    def _add_job(self, job_id: str, **options):
+        # replace_existing only deduplicates once the scheduler runs, so drop pending copies first
+        if not self.scheduler.running and self.scheduler.get_job(job_id) is not None:
+            self.scheduler.remove_job(job_id)
+        self.scheduler.add_job(run_scheduled_crawl, id=job_id, replace_existing=True, **options)
+
+    def schedule_tasks(self, subscriptions: Optional[list] = None):
+        """
+        Schedule one crawl job per enabled subscription (loaded from the database
+        when not given) and drop jobs of removed or disabled subscriptions.
+        Can be called again whenever subscriptions change.
+        """
+        if subscriptions is None:
+            subscriptions = self._load_subscriptions()
+        subscriptions = [s for s in subscriptions if s.enabled]
+        now = datetime.now(UTC)
+        wanted = set()
+        for subscription in subscriptions:
+            job_id = f"{SUBSCRIPTION_JOB_PREFIX}{subscription.id}"
+            wanted.add(job_id)
+            kwargs = {
+                "keyword": subscription.keyword,
+                "max_results": subscription.max_results,
+                "subscription_id": subscription.id
+            }
+            interval = timedelta(minutes=subscription.interval_minutes)
+            existing = self.scheduler.get_job(job_id)
+            if existing is not None and existing.kwargs == kwargs and getattr(existing.trigger, "interval", None) == interval:
+                continue  # Unchanged; keep its next run time
+            self._add_job(
+                job_id,
+                trigger=IntervalTrigger(
+                    minutes=subscription.interval_minutes,
+                    start_date=self._first_run(subscription, now),
+                    jitter=self.jitter or None
+                ),
+                name=subscription.keyword,
+                kwargs=kwargs
+            )
+        for job in self.scheduler.get_jobs():
+            if job.id.startswith(SUBSCRIPTION_JOB_PREFIX) and job.id not in wanted:
+                self.scheduler.remove_job(job.id)
+
+        if subscriptions:
+            if self.scheduler.get_job(DEFAULT_JOB_ID) is not None:
+                self.scheduler.remove_job(DEFAULT_JOB_ID)
+            logger.info(f"Scheduled {len(subscriptions)} subscription crawls")
+            return
+        # No subscriptions: daily task, fetch papers at 2:00 AM. A stored job keeps
+        # its next run time, so a run missed during downtime still happens.
+        if self.scheduler.running and self.scheduler.get_job(DEFAULT_JOB_ID) is not None:
+            return
+        self._add_job(
+            DEFAULT_JOB_ID,
+            trigger=CronTrigger(hour=2, minute=0, jitter=self.jitter or None),
+            kwargs={"keyword": DEFAULT_KEYWORD}
         )
         logger.info("Scheduled daily paper fetch at 2:00 AM")
 
-    async def fetch_and_save_papers(self, keyword: str):
-        """Fetch papers from arXiv and save to database."""
+    async def fetch_and_save_papers(
+        self,
+        keyword: str,
+        max_results: Optional[int] = None,
+        subscription_id: Optional[int] = None
+    ):
+        """
+        Fetch papers from arXiv and save to database through the ingest pipeline.
+        Args:
+            keyword: Search keyword.
+            max_results: Result budget for this crawl (crawler default if None).
+            subscription_id: Subscription whose last-run stats are updated.
+        """
+        logger.info(f"Fetching papers for keyword: {keyword} at {datetime.now()}")
+        self.active_runs += 1
+        started = time.monotonic()
+        try:
+            crawl = await self.pipeline.run(Crawl(keyword, max_results))
+        finally:
+            self.active_runs -= 1
+        duration = time.monotonic() - started
+        error = "; ".join(crawl.errors) or None
+        if error:
+            logger.error(f"Error in fetch_and_save_papers: {error}")
+        logger.info(
+            f"Completed: Saved {crawl.stored} new papers "
+            f"({crawl.duplicates} duplicates skipped, {crawl.deferred} deferred to NLP jobs)"
+        )
+        self._record_run(keyword, duration, crawl.fetched, crawl.stored, error)
+        CRAWL_SECONDS.observe(duration, status="failed" if crawl.failed else "ok")
+        INGESTED_PAPERS.inc(crawl.stored - crawl.deferred, outcome="stored")
+        INGESTED_PAPERS.inc(crawl.deferred, outcome="deferred")
+        INGESTED_PAPERS.inc(crawl.duplicates, outcome="duplicate")
+        try:
+            await executors.run_io(self._finish_run, crawl, subscription_id, duration, error)
+        except Exception as e:
+            logger.error(f"Error recording run of {keyword!r}: {e}")
+
+    async def _fetch(self, crawl: Crawl) -> List[dict]:
+        """Fetch stage: only papers newer than what the keyword already has."""
+        since, since_id = await executors.run_io(self._load_watermark, crawl.keyword)
+        try:
+            return await self.crawler.fetch_new_papers(
+                crawl.keyword, since=since, since_id=since_id, max_results=crawl.max_results
+            )
+        except IncompleteCrawl as e:
+            # Store what arrived, but keep the watermark so the gap is refetched next run
+            logger.error(f"Incomplete crawl of {crawl.keyword!r}: {e}")
+            crawl.errors.append(f"fetch: {e}")
+            crawl.failed = True
+            return e.papers
+
+    def _load_watermark(self, keyword: str):
+        db = self.session_factory()
+        try:
+            watermark = get_watermark(db, keyword)
+            return (watermark.last_published, watermark.last_arxiv_id) if watermark else (None, None)
+        finally:
+            db.close()
+
+    def _finish_run(self, crawl: Crawl, subscription_id: Optional[int], duration: float, error: Optional[str]):
+        """Advance the watermark once every paper is stored and record subscription stats (blocking)."""
+        db = self.session_factory()
+        try:
+            # After a failed stage some papers may be missing; refetch them next run
+            if not crawl.failed and crawl.newest is not None:
+                update_watermark(db, crawl.keyword, [crawl.newest])
+            if subscription_id is not None:
+                record_subscription_run(db, subscription_id, duration, crawl.stored, error)
+        finally:
+            db.close()
+
+    def _record_run(self, keyword: str, duration: float, fetched: int, saved: int, error: Optional[str]):
+        stats = self.run_stats.get(keyword, {"runs": 0, "total_papers": 0})
+        self.run_stats[keyword] = {
+            "runs": stats["runs"] + 1,
+            "last_run_at": datetime.utcnow().isoformat(),
+            "last_duration": round(duration, 3),
+            "last_fetched": fetched,
+            "last_paper_count": saved,
+            "total_papers": stats["total_papers"] + saved,
+            "last_error": error
+        }
+
+    async def run_exclusive(self, keyword: str, max_results: Optional[int] = None, subscription_id: Optional[int] = None):
+        """
+        Run a scheduled crawl unless another process is already crawling the keyword.
+        The per-keyword lock is held for the run (bounded by a one-hour lease).
+        """
+        lock = f"crawl:{keyword}"
+        if self.lease_seconds is not None:
+            if not await executors.run_io(self._acquire, lock, max(self.lease_seconds, 3600)):
+                logger.info(f"Skipping {keyword!r}: another worker is crawling it")
+                return
         try:
-            logger.info(f"Fetching papers for keyword: {keyword} at {datetime.now()}")
-            papers = self.crawler.search_papers(keyword)
-            db = next(get_db())
-            saved_count = 0
-            for paper in papers:
-                saved_paper = save_paper(db, paper, keyword)
-                saved_count += 1
-                logger.info(f"Saved paper: {saved_paper.title}")
-            logger.info(f"Completed: Saved {saved_count} papers")
+            await self.fetch_and_save_papers(keyword, max_results, subscription_id)
+        finally:
+            if self.lease_seconds is not None:
+                await executors.run_io(self._release, lock)
+
+    def _acquire(self, name: str, lease_seconds: float) -> bool:
+        db = self.session_factory()
+        try:
+            return acquire_lock(db, name, self.node_id, lease_seconds)
+        finally:
+            db.close()
+
+    def _release(self, name: str):
+        db = self.session_factory()
+        try:
+            release_lock(db, name, self.node_id)
+        finally:
+            db.close()
+
+    async def _schedule(self):
+        """Run schedule_tasks on the I/O pool; it reads subscriptions and writes the job store."""
+        try:
+            await executors.run_io(self.schedule_tasks)
         except Exception as e:
-            logger.error(f"Error in fetch_and_save_papers: {e}")
+            logger.error(f"Error scheduling subscription crawls: {e}")
+
+    async def _lead(self):
+        """Renew (or try to take) the leader lease and resume or pause job execution accordingly."""
+        while True:
+            try:
+                leader = await executors.run_io(self._acquire, LEADER_LOCK, self.lease_seconds)
+            except Exception as e:
+                logger.error(f"Error renewing scheduler leadership: {e}")
+                leader = False
+            if leader and not self.is_leader:
+                logger.info(f"Scheduler {self.node_id} is now the leader")
+                await self._schedule()
+                self.scheduler.resume()
+            elif not leader and self.is_leader:
+                logger.info(f"Scheduler {self.node_id} lost leadership")
+                self.scheduler.pause()
+            elif leader:
+                # Pick up jobs other workers added to the shared job store
+                self.scheduler.wakeup()
+            self.is_leader = leader
+            await asyncio.sleep(self.lease_seconds / 3)
 
     def start(self):
-        """Start the scheduler."""
-        self.schedule_tasks()
-        self.scheduler.start()
+        """
+        Start the scheduler. With a leader lease it starts paused and only
+        runs jobs while this process holds the lease.
+        """
+        global _active_scheduler
+        _active_scheduler = self
+        self.scheduler.start(paused=self.lease_seconds is not None)
+        if self.lease_seconds is None:
+            self.is_leader = True
+            self._schedule_task = asyncio.create_task(self._schedule(), name="scheduler-schedule")
+        else:
+            # The leader schedules the jobs once it holds the lease
+            self._leader_task = asyncio.create_task(self._lead(), name="scheduler-leader")
         logger.info("Scheduler started")
 
     def shutdown(self):
-        """Shutdown the scheduler."""
+        """Shutdown the scheduler and give up the leader lease."""
+        for task in (self._leader_task, self._schedule_task):
+            if task is not None:
+                task.cancel()
+        self._leader_task = self._schedule_task = None
+        if self.is_leader and self.lease_seconds is not None:
+            try:
+                self._release(LEADER_LOCK)
+            except Exception as e:
+                logger.error(f"Error releasing scheduler leadership: {e}")
+        self.is_leader = False
         self.scheduler.shutdown()
         logger.info("Scheduler stopped")
+
+    async def stop_pipeline(self):
+        """Stop the ingest pipeline workers (crawls in flight are cancelled)."""
+        await self.pipeline.stop()
+
     def get_status(self):
-        """Return scheduler and job status."""
+        """Return scheduler and job status, with last-run stats per crawled keyword."""
         jobs = []
         for job in self.scheduler.get_jobs():
+            keyword = job.kwargs.get("keyword")
             jobs.append({
                 "id": job.id,
-                "next_run_time": str(job.next_run_time),
-                "trigger": str(job.trigger)
+                "keyword": keyword,
+                "subscription_id": job.kwargs.get("subscription_id"),
+                "max_results": job.kwargs.get("max_results"),
+                "next_run_time": str(getattr(job, "next_run_time", None)),
+                "trigger": str(job.trigger),
+                "last_run": self.run_stats.get(keyword)
             })
         return {
             "scheduler_running": self.scheduler.running,
+            "node_id": self.node_id,
+            "leader": self.is_leader,
+            "max_concurrency": self.max_concurrency,
+            "active_runs": self.active_runs,
+            "pipeline": self.pipeline.stats(),
             "jobs": jobs
         }
\ No newline at end of file
@@ -0,0 +1,224 @@
+import json
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+class EmbeddingIndex:
+    """
+    Append-only, memory-mapped matrix of L2-normalized paper embeddings.
+    Vectors live in `<directory>/vectors.f32` (raw float32 rows) with their
+    paper ids in `ids.i64`; new papers are appended and re-embedded papers
+    are overwritten in place, so the index never needs a full rebuild.
+    Deleted papers are compacted out with `remove`.
+    Cosine top-k is a chunked matrix-vector product over the memmap, so only
+    the pages being scored are resident in memory.
+    """
+
+    def __init__(self, directory: str, model_name: str, chunk_rows: int = 65536):
+        self.directory = directory
+        self.model_name = model_name
+        self.chunk_rows = chunk_rows
+        self.dim: Optional[int] = None
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._positions: Dict[int, int] = {}
+        self._vectors: Optional[np.memmap] = None
+        self._lock = threading.RLock()
+        self._open()
+
+    @property
+    def _ids_path(self) -> str:
+        return os.path.join(self.directory, "ids.i64")
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.directory, "vectors.f32")
+
+    @property
+    def _meta_path(self) -> str:
+        return os.path.join(self.directory, "meta.json")
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, paper_id: int) -> bool:
+        return paper_id in self._positions
+
+    def _open(self):
+        """Load ids and map vectors from disk; an index built by another model is discarded."""
+        try:
+            with open(self._meta_path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return
+        if meta.get("model") != self.model_name:
+            self.reset()
+            return
+        self.dim = int(meta["dim"])
+        ids = np.fromfile(self._ids_path, dtype=np.int64) if os.path.exists(self._ids_path) else np.zeros(0, np.int64)
+        vector_rows = os.path.getsize(self._vectors_path) // (4 * self.dim) if os.path.exists(self._vectors_path) else 0
+        # A crash between the two appends leaves them out of step; keep the common prefix
+        rows = min(len(ids), vector_rows)
+        self._ids = ids[:rows].copy()
+        self._positions = {int(paper_id): row for row, paper_id in enumerate(self._ids)}
+        self._remap(rows)
+
+    def _remap(self, rows: int):
+        self._vectors = (
+            np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(rows, self.dim))
+            if rows else None
+        )
+
+    def reset(self, dim: Optional[int] = None):
+        """Delete all vectors (e.g. after switching encoders)."""
+        with self._lock:
+            self._vectors = None
+            for path in (self._ids_path, self._vectors_path, self._meta_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self.dim = dim
+            self._ids = np.zeros(0, dtype=np.int64)
+            self._positions = {}
+
+    def add(self, ids: Iterable[int], vectors: np.ndarray):
+        """
+        Add or replace vectors.
+        Args:
+            ids: Paper ids, one per row of `vectors`.
+            vectors: float32 array of shape (n, dim), L2-normalized.
+        """
+        ids = [int(paper_id) for paper_id in ids]
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(len(ids), -1)
+        if not ids:
+            return
+        with self._lock:
+            if self.dim is None:
+                os.makedirs(self.directory, exist_ok=True)
+                self.dim = vectors.shape[1]
+                with open(self._meta_path, "w") as f:
+                    json.dump({"model": self.model_name, "dim": self.dim}, f)
+            if vectors.shape[1] != self.dim:
+                raise ValueError(f"Expected vectors of dimension {self.dim}, got {vectors.shape[1]}")
+
+            # Last occurrence wins for ids repeated within the batch
+            latest = {paper_id: row for row, paper_id in enumerate(ids)}
+            existing = [(self._positions[i], row) for i, row in latest.items() if i in self._positions]
+            new = [(i, row) for i, row in latest.items() if i not in self._positions]
+            if existing:
+                positions, rows = zip(*existing)
+                self._vectors[list(positions)] = vectors[list(rows)]
+                self._vectors.flush()
+            if new:
+                new_ids = np.array([i for i, _ in new], dtype=np.int64)
+                with open(self._vectors_path, "ab") as f:
+                    f.write(vectors[[row for _, row in new]].tobytes())
+                with open(self._ids_path, "ab") as f:
+                    f.write(new_ids.tobytes())
+                start = len(self._ids)
+                self._positions.update((int(i), start + k) for k, i in enumerate(new_ids))
+                self._ids = np.concatenate([self._ids, new_ids])
+                self._remap(len(self._ids))
+
+    def remove(self, ids: Iterable[int]) -> int:
+        """
+        Drop vectors (e.g. of deleted papers) by rewriting the index without them.
+        Args:
+            ids: Paper ids; ids that are not indexed are ignored.
+        Returns:
+            Number of vectors removed.
+        """
+        with self._lock:
+            drop = {int(paper_id) for paper_id in ids} & self._positions.keys()
+            if not drop:
+                return 0
+            keep = ~np.isin(self._ids, np.fromiter(drop, dtype=np.int64, count=len(drop)))
+            kept_ids = self._ids[keep]
+            kept_vectors = np.array(self._vectors[keep])
+            self._vectors = None
+            # Write both files aside first so a crash never leaves a half-compacted index
+            for path, data in ((self._vectors_path, kept_vectors), (self._ids_path, kept_ids)):
+                with open(path + ".tmp", "wb") as f:
+                    f.write(data.tobytes())
+                os.replace(path + ".tmp", path)
+            self._ids = kept_ids
+            self._positions = {int(paper_id): row for row, paper_id in enumerate(kept_ids)}
+            self._remap(len(kept_ids))
+            return len(drop)
+
+    def get(self, paper_id: int) -> Optional[np.ndarray]:
+        """Return a copy of a paper's vector, or None if it is not indexed."""
+        with self._lock:
+            row = self._positions.get(int(paper_id))
+            return None if row is None else np.array(self._vectors[row])
+
+    def search(self, vector: np.ndarray, k: int = 10, exclude: Iterable[int] = ()) -> List[Tuple[int, float]]:
+        """
+        Find the papers most similar to `vector` by cosine similarity.
+        Args:
+            vector: Query embedding (normalized here, so raw vectors work too).
+            k: Number of results.
+            exclude: Paper ids to leave out (e.g. the query paper).
+        Returns:
+            (paper_id, score) pairs, most similar first.
+        """
+        with self._lock:
+            vectors, ids = self._vectors, self._ids
+        if vectors is None or k <= 0:
+            return []
+        query = np.asarray(vector, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(query)
+        if norm == 0 or query.shape[0] != self.dim:
+            return []
+        query = query / norm
+        exclude = np.array(list(exclude), dtype=np.int64)
+
+        # Keep a running top-k across chunks so the score buffer stays bounded
+        best_ids = np.zeros(0, dtype=np.int64)
+        best_scores = np.zeros(0, dtype=np.float32)
+        for start in range(0, len(ids), self.chunk_rows):
+            chunk_ids = ids[start:start + self.chunk_rows]
+            scores = np.asarray(vectors[start:start + len(chunk_ids)] @ query)
+            if len(exclude):
+                scores[np.isin(chunk_ids, exclude)] = -np.inf
+            candidate_ids = np.concatenate([best_ids, chunk_ids])
+            candidate_scores = np.concatenate([best_scores, scores])
+            if len(candidate_scores) > k:
+                top = np.argpartition(-candidate_scores, k - 1)[:k]
+                candidate_ids, candidate_scores = candidate_ids[top], candidate_scores[top]
+            best_ids, best_scores = candidate_ids, candidate_scores
+
+        order = np.argsort(-best_scores, kind="stable")
+        return [
+            (int(best_ids[i]), float(best_scores[i]))
+            for i in order if np.isfinite(best_scores[i])
+        ]
+
+    def sync(self, embeddings: Iterable[Tuple[int, bytes]], batch_size: int = 1000) -> int:
+        """
+        Add stored embeddings that are missing from the index (e.g. on startup
+        or after the index files were deleted) and drop indexed ids that no
+        longer have a stored embedding.
+        Args:
+            embeddings: (paper_id, float32 bytes) pairs, e.g. from crud.iter_embeddings.
+        Returns:
+            Number of vectors added.
+        """
+        added = 0
+        ids, vectors = [], []
+        seen = set()
+        for paper_id, blob in embeddings:
+            seen.add(paper_id)
+            if paper_id in self._positions:
+                continue
+            ids.append(paper_id)
+            vectors.append(np.frombuffer(blob, dtype=np.float32))
+            if len(ids) >= batch_size:
+                self.add(ids, np.stack(vectors))
+                added += len(ids)
+                ids, vectors = [], []
+        if ids:
+            self.add(ids, np.stack(vectors))
+            added += len(ids)
+        # Papers deleted while the index was not listening (e.g. by init_db)
+        self.remove(set(self._positions) - seen)
+        return added
@@ -0,0 +1,83 @@
+"""
+Benchmark keyword extraction engines on a synthetic corpus.
+
+Compares serial YAKE, YAKE fanned out over worker processes, and the
+vectorized TF-IDF engine (corpus fit plus batch extraction). Run from the
+repository root:
+
+    python -m benchmarks.bench_keywords --num-texts 3000 --workers 4
+"""
+import argparse
+import json
+import random
+import time
+from typing import List, Optional
+from backend.app.services.nlp import NLPProcessor
+from .bench_summarizer import SAMPLE_ABSTRACTS
+
+TOPIC_WORDS = [
+    "protein", "galaxy", "quantum", "lattice", "tokenizer", "robotics", "graph", "kernel",
+    "diffusion", "bayesian", "compiler", "genome", "fluid", "market", "speech", "vision",
+    "sparsity", "federated", "privacy", "climate", "topology", "spectral", "causal", "molecule",
+]
+
+def make_corpus(num_texts: int, seed: int = 0) -> List[str]:
+    """Build abstract-like texts by recombining sample sentences with topic words."""
+    rng = random.Random(seed)
+    sentences = [s.strip() + "." for text in SAMPLE_ABSTRACTS for s in text.split(".") if s.strip()]
+    corpus = []
+    for _ in range(num_texts):
+        picked = rng.sample(sentences, k=min(4, len(sentences)))
+        topics = " and ".join(rng.sample(TOPIC_WORDS, k=3))
+        corpus.append(f"We study {topics}. " + " ".join(picked))
+    return corpus
+
+def _timed(label: str, func, num_texts: int) -> dict:
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    return {"engine": label, "seconds": round(elapsed, 3), "texts_per_sec": round(num_texts / elapsed, 1)}
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num-texts", type=int, default=3000)
+    parser.add_argument("--workers", type=int, default=None, help="YAKE worker processes (default: CPU count)")
+    parser.add_argument("--json", dest="json_path", help="Also write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    corpus = make_corpus(args.num_texts)
+    results = []
+
+    serial = NLPProcessor(parallel_threshold=len(corpus) + 1)
+    results.append(_timed("yake-serial", lambda: serial.extract_keywords_batch(corpus), len(corpus)))
+
+    parallel = NLPProcessor(keyword_workers=args.workers, parallel_threshold=1)
+    try:
+        # Start the workers outside the timed region
+        parallel.extract_keywords_batch(corpus[:parallel.keyword_workers])
+        results.append(_timed(
+            f"yake-processes({parallel.keyword_workers})",
+            lambda: parallel.extract_keywords_batch(corpus),
+            len(corpus)
+        ))
+    finally:
+        parallel.close()
+
+    tfidf = NLPProcessor(keyword_engine="tfidf")
+    results.append(_timed("tfidf-fit", lambda: tfidf.tfidf.fit(corpus), len(corpus)))
+    results.append(_timed("tfidf-extract", lambda: tfidf.extract_keywords_batch(corpus), len(corpus)))
+
+    print(f"{'engine':<20} {'seconds':>9} {'texts/s':>10}")
+    for r in results:
+        print(f"{r['engine']:<20} {r['seconds']:>9} {r['texts_per_sec']:>10}")
+    print()
+    print("Sample keywords:")
+    print("  yake: ", serial.extract_keywords(corpus[0]))
+    print("  tfidf:", tfidf.extract_keywords(corpus[0]))
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,440 @@
+"""
+Offline benchmark suite for the ingest and query paths.
+
+Measures, without network access or downloaded weights:
+  - /search end-to-end throughput, with arXiv responses replayed from the
+    recorded Atom feeds in benchmarks/fixtures, and the NLP jobs it queues
+  - per-abstract NLP latency (summaries, keywords, embeddings) with a tiny
+    randomly initialized BART built from the fixture abstracts
+  - save_paper and save_papers_bulk insert rates
+  - /papers latency (listing, deep cursor page, full-text, relevance) at
+    growing table sizes, 1k/100k/1M rows by default
+
+Everything runs against a scratch SQLite database in --workdir. Results are
+printed and written as JSON; with --baseline the run fails (exit status 1)
+when a metric regressed by more than --tolerance. Run from the repository root:
+
+    python -m benchmarks.bench_suite --json results.json --baseline benchmarks/baseline.json
+    python -m benchmarks.bench_suite --rows 1000 100000 --update-baseline benchmarks/baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+DEFAULT_ROWS = [1000, 100000, 1000000]
+# Run-to-run noise of millisecond timings reaches ~30% on shared machines; 2x slowdowns still fail
+DEFAULT_TOLERANCE = 0.5
+# Full-text query of the /papers benchmark; matches a large share of the synthetic corpus
+FULLTEXT_QUERY = "graph"
+# Bulk rows per transaction when seeding the papers table
+SEED_CHUNK_SIZE = 10000
+
+def _metric(value: float, unit: str, better: str) -> dict:
+    """One result; `better` ("higher" or "lower") tells which way is a regression."""
+    return {"value": round(value, 3), "unit": unit, "better": better}
+
+def _row_label(rows: int) -> str:
+    for size, suffix in ((1000000, "M"), (1000, "k")):
+        if rows >= size and rows % size == 0:
+            return f"{rows // size}{suffix}"
+    return str(rows)
+
+def load_fixtures() -> Dict[str, bytes]:
+    """Recorded arXiv responses by search keyword (arxiv_graph_neural_networks.xml -> "graph neural networks")."""
+    return {
+        path.stem[len("arxiv_"):].replace("_", " "): path.read_bytes()
+        for path in sorted(FIXTURES_DIR.glob("arxiv_*.xml"))
+    }
+
+class ReplayedResponse:
+    """Stands in for a streamed requests.Response carrying a recorded feed."""
+
+    def __init__(self, content: bytes):
+        self.content = content
+        self.status_code = 200
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size: int = 1):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+@contextmanager
+def replay_arxiv(fixtures: Dict[str, bytes]):
+    """Answer ArxivCrawler requests from `fixtures`; unknown keywords get an empty feed."""
+    empty = b'<?xml version="1.0" encoding="UTF-8"?><feed xmlns="http://www.w3.org/2005/Atom"></feed>'
+
+    def get(url, **kwargs):
+        query = parse_qs(urlparse(url).query).get("search_query", [""])[0]
+        return ReplayedResponse(fixtures.get(query.split(":", 1)[-1], empty))
+
+    with patch("backend.app.services.arxiv.requests.get", side_effect=get):
+        yield
+
+def build_tiny_model(path: Path, texts: List[str], seed: int = 0) -> str:
+    """
+    Save a randomly initialized one-layer BART and a word-level tokenizer
+    trained on `texts` to `path`. Generation never stops early, so every
+    summary runs to max_length and latency does not depend on the weights.
+    Returns:
+        The model path, usable as NLPProcessor(model_name=...).
+    """
+    import torch
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers, processors, trainers
+    from transformers import BartConfig, BartForConditionalGeneration, PreTrainedTokenizerFast
+
+    # BART's special token ids: <s>=0, <pad>=1, </s>=2, <unk>=3
+    special_tokens = ["<s>", "<pad>", "</s>", "<unk>"]
+    tokenizer = Tokenizer(models.WordLevel(unk_token="<unk>"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizer.train_from_iterator(texts, trainers.WordLevelTrainer(special_tokens=special_tokens))
+    tokenizer.post_processor = processors.TemplateProcessing(
+        single="<s> $A </s>", special_tokens=[("<s>", 0), ("</s>", 2)]
+    )
+    tokenizer.decoder = decoders.WordPiece(prefix="##")
+    tokenizer = PreTrainedTokenizerFast(
+        tokenizer_object=tokenizer, bos_token="<s>", pad_token="<pad>", eos_token="</s>", unk_token="<unk>",
+        model_max_length=1024, clean_up_tokenization_spaces=True
+    )
+
+    torch.manual_seed(seed)
+    config = BartConfig(
+        vocab_size=len(tokenizer), d_model=32, encoder_layers=1, decoder_layers=1,
+        encoder_attention_heads=2, decoder_attention_heads=2, encoder_ffn_dim=64, decoder_ffn_dim=64,
+        max_position_embeddings=1024, bos_token_id=0, pad_token_id=1, eos_token_id=2,
+        decoder_start_token_id=2, forced_eos_token_id=2
+    )
+    tokenizer.save_pretrained(path)
+    BartForConditionalGeneration(config).save_pretrained(path)
+    return str(path)
+
+def reset_database():
+    """Delete every row of the scratch database (the FTS index follows through its triggers)."""
+    from backend.app.database.config import engine
+    from backend.app.database.models import Base
+    from backend.app.main import papers_cache
+
+    with engine.begin() as connection:
+        for table in reversed(Base.metadata.sorted_tables):
+            connection.execute(table.delete())
+    papers_cache.clear()
+
+def seed_papers(start: int, stop: int, corpus: List[str], keywords: List[str]):
+    """Insert synthetic processed papers start..stop-1 straight into the papers table."""
+    from backend.app.database.config import engine
+    from backend.app.database.models import Paper
+
+    rng = random.Random(start)
+    epoch = datetime(2020, 1, 1)
+    for chunk_start in range(start, stop, SEED_CHUNK_SIZE):
+        rows = []
+        for i in range(chunk_start, min(chunk_start + SEED_CHUNK_SIZE, stop)):
+            canonical = f"bench.{i:08d}"
+            rows.append({
+                "title": f"Synthetic paper {i} on {keywords[i % len(keywords)]}",
+                "abstract": corpus[i % len(corpus)],
+                "link": f"http://arxiv.org/abs/{canonical}v1",
+                "published": epoch + timedelta(minutes=rng.randrange(0, 5 * 365 * 24 * 60)),
+                "keyword": keywords[i % len(keywords)],
+                "keywords": ",".join(rng.sample(corpus[i % len(corpus)].split()[:12], k=3)),
+                "summary": corpus[(i + 1) % len(corpus)][:200],
+                "canonical_id": canonical,
+                "version": 1
+            })
+        with engine.begin() as connection:
+            connection.execute(Paper.__table__.insert(), rows)
+
+async def bench_search(http, fixtures: Dict[str, bytes], rounds: int) -> Dict[str, dict]:
+    """
+    Time /search over the recorded feeds on an empty database (all papers new),
+    then again (all duplicates), then drain the queued NLP jobs.
+    """
+    from backend.app import main
+    from backend.app.services.jobs import NLPJobWorker
+
+    fresh, repeated, drain = [], [], []
+    papers = jobs = 0
+    for _ in range(rounds):
+        reset_database()
+        for samples in (fresh, repeated):
+            for keyword in fixtures:
+                started = time.perf_counter()
+                response = await http.get("/search", params={"keyword": keyword})
+                samples.append(time.perf_counter() - started)
+                response.raise_for_status()
+                if samples is fresh:
+                    papers += len(response.json()["results"])
+                    jobs += len(response.json()["jobs"])
+
+        worker = NLPJobWorker(
+            process=main.process_papers, store=main.save_papers, session_factory=main.SessionLocal, batch_size=16
+        )
+        started = time.perf_counter()
+        while await worker.run_once():
+            pass
+        drain.append(time.perf_counter() - started)
+        if worker.failed:
+            raise RuntimeError(f"{worker.failed} NLP jobs failed during the benchmark")
+
+    return {
+        "search_requests_per_sec": _metric(len(fresh) / sum(fresh), "req/s", "higher"),
+        "search_papers_per_sec": _metric(papers / sum(fresh), "papers/s", "higher"),
+        "search_latency_ms_p50": _metric(statistics.median(fresh) * 1000, "ms", "lower"),
+        "search_duplicates_latency_ms_p50": _metric(statistics.median(repeated) * 1000, "ms", "lower"),
+        "search_nlp_jobs_per_sec": _metric(jobs / sum(drain), "jobs/s", "higher"),
+    }
+
+def bench_nlp(nlp, texts: List[str], repeats: int) -> Dict[str, dict]:
+    """Per-abstract latency of each NLP step, batched the way process_papers runs them."""
+    nlp.load()
+    steps = {
+        "summary": nlp.generate_summaries,
+        "keywords": nlp.extract_keywords_batch,
+        "embedding": nlp.embed_texts,
+    }
+    results = {}
+    for step, run in steps.items():
+        run(texts[:2])  # Warm-up
+        latencies = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            run(texts)
+            latencies.append((time.perf_counter() - started) / len(texts))
+        results[f"nlp_{step}_ms_per_abstract"] = _metric(statistics.median(latencies) * 1000, "ms", "lower")
+    return results
+
+def bench_inserts(corpus: List[str], count: int) -> Dict[str, dict]:
+    """Insert rate of save_paper (one transaction per paper) and save_papers_bulk (one per batch)."""
+    from backend.app.database.config import SessionLocal
+    from backend.app.database.crud import save_paper, save_papers_bulk
+
+    def papers(prefix: str) -> List[dict]:
+        return [
+            {"title": f"Inserted paper {i}", "abstract": corpus[i % len(corpus)],
+             "link": f"http://arxiv.org/abs/{prefix}.{i:05d}v1",
+             "published": f"2024-02-{i % 28 + 1:02d}T00:00:00Z",
+             "keywords": corpus[i % len(corpus)].split()[:5], "summary": corpus[(i + 1) % len(corpus)][:200]}
+            for i in range(count)
+        ]
+
+    results = {}
+    reset_database()
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        for paper in papers("2501"):
+            save_paper(db, paper, "bench")
+        results["save_paper_per_sec"] = _metric(count / (time.perf_counter() - started), "papers/s", "higher")
+
+        batch = papers("2502")
+        started = time.perf_counter()
+        for start in range(0, count, 100):
+            save_papers_bulk(db, batch[start:start + 100], "bench")
+        results["save_papers_bulk_per_sec"] = _metric(count / (time.perf_counter() - started), "papers/s", "higher")
+    finally:
+        db.close()
+    return results
+
+async def bench_papers(
+    http,
+    sizes: List[int],
+    corpus: List[str],
+    keywords: List[str],
+    requests_per_query: int
+) -> Dict[str, dict]:
+    """
+    /papers latency as the table grows. The response cache is cleared before
+    every request, so each one runs its query.
+    """
+    from backend.app.database.config import SessionLocal
+    from backend.app.database.crud import encode_cursor
+    from backend.app.database.models import Paper
+    from backend.app.main import papers_cache
+
+    def deep_cursor(rows: int) -> str:
+        """Cursor halfway down the listing, where OFFSET paging would be slowest."""
+        db = SessionLocal()
+        try:
+            paper = (
+                db.query(Paper).order_by(Paper.published.desc(), Paper.id.desc())
+                .offset(rows // 2).limit(1).one()
+            )
+            return encode_cursor(paper)
+        finally:
+            db.close()
+
+    results = {}
+    reset_database()
+    seeded = 0
+    for rows in sorted(sizes):
+        seed_papers(seeded, rows, corpus, keywords)
+        seeded = rows
+        queries = {
+            "list": {"page_size": 20},
+            "deep_page": {"page_size": 20, "cursor": deep_cursor(rows)},
+            "fulltext": {"keyword": FULLTEXT_QUERY, "page_size": 20},
+            "relevance": {"keyword": FULLTEXT_QUERY, "page_size": 20, "sort": "relevance"},
+        }
+        for name, params in queries.items():
+            latencies = []
+            for i in range(requests_per_query + 1):
+                papers_cache.clear()
+                started = time.perf_counter()
+                response = await http.get("/papers", params=params)
+                elapsed = time.perf_counter() - started
+                response.raise_for_status()
+                if i:  # The first request warms SQLite's page cache
+                    latencies.append(elapsed)
+            results[f"papers_{name}_{_row_label(rows)}_ms_p50"] = _metric(
+                statistics.median(latencies) * 1000, "ms", "lower"
+            )
+    return results
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    """
+    Compare metrics with a baseline.
+    Args:
+        results: Metrics of this run, as produced by the bench_* functions.
+        baseline: Stored metrics of the same shape; metrics missing on either side are skipped.
+        tolerance: Allowed relative change in the worse direction, e.g. 0.25 for 25%.
+    Returns:
+        One message per regressed metric (empty when nothing regressed).
+    """
+    regressions = []
+    for name, expected in sorted(baseline.items()):
+        actual = results.get(name)
+        if actual is None or not expected.get("value"):
+            continue
+        change = (actual["value"] - expected["value"]) / expected["value"]
+        if expected["better"] == "higher":
+            change = -change
+        if change > tolerance:
+            regressions.append(
+                f"{name}: {actual['value']} {actual['unit']} vs baseline {expected['value']} "
+                f"({change:.0%} worse, tolerance {tolerance:.0%})"
+            )
+    return regressions
+
+async def run_suite(args, fixtures: Dict[str, bytes], model_path: str) -> Dict[str, dict]:
+    import httpx
+    from backend.app import main
+    from backend.app.database.config import dispose_async_engine
+    from backend.app.services.arxiv import parse_feed
+    from backend.app.services.nlp import NLPProcessor
+    from .bench_keywords import make_corpus
+
+    abstracts = [paper["abstract"] for feed in fixtures.values() for paper in parse_feed(feed)]
+    corpus = make_corpus(1000, seed=args.seed)
+    # Same settings as the app's processor, with the tiny model and no YAKE worker processes
+    nlp = NLPProcessor(model_name=model_path, profile="fp32", parallel_threshold=len(abstracts) + 1)
+    results = {}
+    try:
+        results.update(bench_nlp(nlp, abstracts, args.repeats))
+        with patch.object(main, "nlp", nlp), replay_arxiv(fixtures):
+            # In-process ASGI client on one event loop: full middleware/routing stack, no lifespan
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+                results.update(await bench_search(http, fixtures, args.repeats))
+                results.update(bench_inserts(corpus, args.inserts))
+                results.update(await bench_papers(http, args.rows, corpus, list(fixtures), args.requests))
+    finally:
+        nlp.close()
+        await dispose_async_engine()
+    return results
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS, help="/papers table sizes")
+    parser.add_argument("--repeats", type=int, default=3, help="Rounds of the /search and NLP benchmarks")
+    parser.add_argument("--requests", type=int, default=20, help="Timed requests per /papers query")
+    parser.add_argument("--inserts", type=int, default=500, help="Papers per insert benchmark")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="Scratch directory, kept afterwards (default: a temporary directory)")
+    parser.add_argument("--json", dest="json_path", help="Also write results to this JSON file")
+    parser.add_argument("--baseline", help="Fail if results regressed against this JSON file")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed relative regression")
+    parser.add_argument("--update-baseline", metavar="PATH", help="Write results as the new baseline")
+    args = parser.parse_args(argv)
+
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="bench-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    # Must be set before the app is imported: its engine, embedding index and scheduler are module-level
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{workdir / 'bench.db'}",
+        "EMBEDDINGS_DIR": str(workdir / "embeddings"),
+        "SCHEDULER_JOBSTORE": "memory",
+        "HF_HUB_OFFLINE": "1",
+    })
+    db_path = workdir / "bench.db"
+    if db_path.exists():
+        db_path.unlink()
+
+    from backend.app.services.arxiv import parse_feed
+
+    fixtures = load_fixtures()
+    papers = [paper for feed in fixtures.values() for paper in parse_feed(feed)]
+    texts = [paper["title"] for paper in papers] + [paper["abstract"] for paper in papers]
+    try:
+        model_path = build_tiny_model(workdir / "tiny-bart", texts, seed=args.seed)
+        results = asyncio.run(run_suite(args, fixtures, model_path))
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    import torch
+    report = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+            "cpus": os.cpu_count(),
+            "torch": torch.__version__,
+            "rows": sorted(args.rows),
+            "created": datetime.now().isoformat(timespec="seconds"),
+        },
+        "metrics": results,
+    }
+
+    print(f"{'metric':<40} {'value':>12} {'unit':<9}")
+    for name, metric in results.items():
+        print(f"{name:<40} {metric['value']:>12} {metric['unit']:<9}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.update_baseline:
+        with open(args.update_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["metrics"]
+        regressions = compare(results, baseline, args.tolerance)
+        print()
+        if regressions:
+            print("Regressions against the baseline:")
+            for message in regressions:
+                print(f"  {message}")
+            sys.exit(1)
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+if __name__ == "__main__":
+    main()
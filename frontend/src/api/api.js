@@ -15,12 +15,40 @@ export const searchPapers = async (keyword) => {
   return api.get("/search", { params: { keyword } });
 };
 
-export const getPapers = async (keyword) => {
+// Pass the previous response's next_cursor to fetch the following page.
+export const getPapers = async (keyword, cursor = null, pageSize = 10) => {
   console.log(`Requesting: http://127.0.0.1:8000/papers?keyword=${encodeURIComponent(keyword)}`);
-  return api.get("/papers", { params: { keyword } });
+  const params = { keyword, page_size: pageSize };
+  if (cursor) params.cursor = cursor;
+  return api.get("/papers", { params });
 };
 
 export const getSchedulerStatus = async () => {
   console.log("Requesting: http://127.0.0.1:8000/scheduler/status");
   return api.get("/scheduler/status");
-};
\ No newline at end of file
+};
+
+// Streams /search/stream (NDJSON) and calls onPaper for each paper as soon as it is processed.
+export const streamSearchPapers = async (keyword, onPaper) => {
+  const url = `http://127.0.0.1:8000/search/stream?keyword=${encodeURIComponent(keyword)}`;
+  console.log(`Requesting: ${url}`);
+  const response = await fetch(url, {
+    credentials: "include",
+    headers: { Accept: "application/x-ndjson" },
+  });
+  if (!response.ok) {
+    throw new Error(`HTTP ${response.status}`);
+  }
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split("\n");
+    buffer = lines.pop();
+    lines.filter((line) => line.trim()).forEach((line) => onPaper(JSON.parse(line)));
+  }
+  if (buffer.trim()) onPaper(JSON.parse(buffer));
+};
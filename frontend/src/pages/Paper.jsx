@@ -7,9 +7,10 @@ const Papers = () => {
   const [papers, setPapers] = useState([]);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
 
 
-  const fetchPapers = async (kw) => {
+  const fetchPapers = async (kw, cursor = null) => {
     if (!kw || kw.trim().length < 2) {
       setError("请输入至少2个字符的有效关键词");
       setPapers([]);
@@ -26,14 +27,18 @@ const Papers = () => {
     }, 5000);
     
     try {
-      const response = await getPapers(kw);
+      const response = await getPapers(kw, cursor);
       clearTimeout(timeout);
 
       if (!response.data || !response.data.papers) {
         throw new Error("服务器返回的数据格式不正确");
       }
 
-      if (response.data.papers.length > 0) {
+      setNextCursor(response.data.next_cursor || null);
+      if (cursor) {
+        setPapers((previous) => [...previous, ...response.data.papers]);
+        setError(null);
+      } else if (response.data.papers.length > 0) {
         setPapers(response.data.papers);
         setError(null);
       } else {
@@ -111,6 +116,11 @@ const Papers = () => {
         rowKey="title"
         pagination={{ pageSize: 10 }}
       />
+      {nextCursor && (
+        <Button onClick={() => fetchPapers(keyword, nextCursor)} disabled={loading}>
+          加载更多
+        </Button>
+      )}
     </div>
   );
 };
@@ -1,6 +1,6 @@
 import { useState } from "react";
 import { Input, Button, List, Spin, Alert } from "antd";
-import { searchPapers } from "../api/api";
+import { streamSearchPapers } from "../api/api";
 
 const Search = () => {
   const [keyword, setKeyword] = useState("");
@@ -11,12 +11,15 @@ const Search = () => {
   const handleSearch = async () => {
     if (!keyword) return;
     setLoading(true);
+    setResults([]);
     console.log("开始搜索，关键词:", keyword); // 添加
     try {
       console.log("准备发送API请求"); // 添加
-      const response = await searchPapers(keyword);
-      console.log("收到API响应:", response); // 添加
-      setResults(response.data.results);
+      // 逐篇渲染流式返回的结果
+      await streamSearchPapers(keyword, (paper) => {
+        console.log("收到论文:", paper.title);
+        setResults((prev) => [...prev, paper]);
+      });
       setError(null);
     } catch (err) {
       console.error("搜索错误详情:", err); // 更详细
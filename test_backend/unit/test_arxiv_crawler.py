@@ -1,6 +1,15 @@
+import threading
+import time
+from datetime import datetime
+import httpx
 import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
 from unittest.mock import patch, Mock
-from backend.app.services.arxiv import ArxivCrawler
+from xml.etree import ElementTree as ET
+from backend.app.services.arxiv import (
+    ArxivCrawler, AsyncArxivCrawler, FeedParser, IncompleteCrawl, iter_feed, parse_arxiv_id, parse_feed
+)
 from sqlalchemy import text
 import requests
 
@@ -29,6 +38,7 @@ def test_search_papers_success(crawler):
     </feed>
     """
     mock_response.content = xml_data.encode('utf-8')
+    mock_response.iter_content = Mock(return_value=[mock_response.content])
     mock_response.raise_for_status = Mock()
 
     with patch("requests.get", return_value=mock_response) as mock_get:
@@ -53,6 +63,7 @@ def test_search_papers_empty_keyword(crawler):
     mock_response = Mock()
     mock_response.status_code = 200
     mock_response.content = b"<feed xmlns='http://www.w3.org/2005/Atom'></feed>"
+    mock_response.iter_content = Mock(return_value=[mock_response.content])
     mock_response.raise_for_status = Mock()
 
     with patch("requests.get", return_value=mock_response) as mock_get:
@@ -67,6 +78,7 @@ def test_search_papers_invalid_keyword(crawler):
     mock_response = Mock()
     mock_response.status_code = 200
     mock_response.content = b"<feed xmlns='http://www.w3.org/2005/Atom'></feed>"
+    mock_response.iter_content = Mock(return_value=[mock_response.content])
     mock_response.raise_for_status = Mock()
 
     with patch("requests.get", return_value=mock_response) as mock_get:
@@ -91,6 +103,7 @@ def test_search_papers_invalid_xml(crawler):
     mock_response = Mock()
     mock_response.status_code = 200
     mock_response.content = b"<invalid>xml</invalid>"
+    mock_response.iter_content = Mock(return_value=[mock_response.content])
     mock_response.raise_for_status = Mock()
 
     with patch("requests.get", return_value=mock_response) as mock_get:
@@ -112,6 +125,7 @@ def test_search_papers_http_403_error(crawler):
     mock_response = Mock()
     mock_response.status_code = 403
     mock_response.content = b"<feed xmlns='http://www.w3.org/2005/Atom'></feed>"
+    mock_response.iter_content = Mock(return_value=[mock_response.content])
     mock_response.raise_for_status = Mock(side_effect=requests.HTTPError("403 Forbidden"))
 
     with patch("requests.get", return_value=mock_response) as mock_get:
@@ -135,6 +149,7 @@ def test_search_papers_non_ascii_keyword(crawler):
     </feed>
     """
     mock_response.content = xml_data.encode('utf-8')
+    mock_response.iter_content = Mock(return_value=[mock_response.content])
     mock_response.raise_for_status = Mock()
 
     with patch("requests.get", return_value=mock_response) as mock_get:
@@ -152,6 +167,7 @@ def test_search_papers_invalid_max_results():
     mock_response = Mock()
     mock_response.status_code = 200
     mock_response.content = b"<feed xmlns='http://www.w3.org/2005/Atom'></feed>"
+    mock_response.iter_content = Mock(return_value=[mock_response.content])
     mock_response.raise_for_status = Mock()
 
     with patch("requests.get", return_value=mock_response) as mock_get:
@@ -159,4 +175,246 @@ def test_search_papers_invalid_max_results():
         
         assert isinstance(results, list)
         assert len(results) == 0
-        assert mock_get.called
\ No newline at end of file
+        assert mock_get.called
+
+# --- AsyncArxivCrawler against a local stub server ---
+
+class StubArxivHandler(BaseHTTPRequestHandler):
+    """Serves a fake arXiv feed with TOTAL entries, honouring start/max_results"""
+    protocol_version = "HTTP/1.1"  # Keep-alive
+    TOTAL = 7
+
+    def do_GET(self):
+        server = self.server
+        query = parse_qs(urlparse(self.path).query)
+        start = int(query["start"][0])
+        count = int(query["max_results"][0])
+        with server.lock:
+            server.paths.append(self.path)
+            server.requests.append((query["search_query"][0], start, count, self.client_address, time.monotonic()))
+            server.in_flight += 1
+            server.peak = max(server.peak, server.in_flight)
+        time.sleep(server.delay)
+        if server.fail_from is not None and start >= server.fail_from:
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            with server.lock:
+                server.in_flight -= 1
+            return
+        entries = "".join(
+            f"""<entry>
+                <id>http://arxiv.org/abs/2401.{i:05d}v1</id>
+                <title>Paper {i}</title>
+                <summary>Abstract {i}</summary>
+                <published>2024-01-01T00:00:00Z</published>
+            </entry>"""
+            for i in range(start, min(start + count, self.TOTAL))
+        )
+        body = f'<feed xmlns="http://www.w3.org/2005/Atom">{entries}</feed>'.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/atom+xml")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        with server.lock:
+            server.in_flight -= 1
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubArxivHandler)
+    server.lock = threading.Lock()
+    server.requests = []
+    server.paths = []
+    server.in_flight = 0
+    server.peak = 0
+    server.delay = 0.0
+    server.fail_from = None  # Answer pages starting at this offset with 503
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/api/query"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.mark.asyncio
+async def test_async_search_papers_paginates(stub_server):
+    async with AsyncArxivCrawler(max_results=5, page_size=2, min_interval=0, base_url=stub_server.url) as crawler:
+        papers = await crawler.search_papers("machine learning")
+    assert [p["title"] for p in papers] == [f"Paper {i}" for i in range(5)]
+    assert [(start, count) for _, start, count, _, _ in stub_server.requests] == [(0, 2), (2, 2), (4, 1)]
+    # All pages went over one kept-alive connection
+    assert len({address for _, _, _, address, _ in stub_server.requests}) == 1
+
+@pytest.mark.asyncio
+async def test_async_search_papers_stops_at_last_page(stub_server):
+    async with AsyncArxivCrawler(page_size=3, min_interval=0, base_url=stub_server.url) as crawler:
+        papers = await crawler.search_papers("test", start=2, max_results=100)
+    assert [p["title"] for p in papers] == [f"Paper {i}" for i in range(2, 7)]
+    assert [start for _, start, _, _, _ in stub_server.requests] == [2, 5]
+
+@pytest.mark.asyncio
+async def test_async_search_many_is_bounded_and_rate_limited(stub_server):
+    stub_server.delay = 0.02
+    async with AsyncArxivCrawler(max_results=2, max_concurrency=2, min_interval=0.05, base_url=stub_server.url) as crawler:
+        # Record when each request is released by the rate limiter
+        released = []
+        throttle = crawler._throttle
+
+        async def recording_throttle():
+            await throttle()
+            released.append(time.monotonic())
+
+        crawler._throttle = recording_throttle
+        results = await crawler.search_many(["a", "b", "c", "d"])
+    assert set(results) == {"a", "b", "c", "d"}
+    assert all(len(papers) == 2 for papers in results.values())
+    assert len(stub_server.requests) == 4
+    assert stub_server.peak <= 2
+    assert all(later - earlier >= 0.045 for earlier, later in zip(released, released[1:]))
+
+@pytest.mark.asyncio
+async def test_async_search_papers_http_error():
+    transport = httpx.MockTransport(lambda request: httpx.Response(503))
+    async with httpx.AsyncClient(transport=transport) as client:
+        crawler = AsyncArxivCrawler(min_interval=0, client=client)
+        assert await crawler.search_papers("machine learning") == []
+
+@pytest.mark.asyncio
+async def test_async_search_papers_empty_keyword():
+    crawler = AsyncArxivCrawler(min_interval=0)
+    assert await crawler.search_papers("  ") == []
+
+
+# --- Streaming Atom parsing ---
+
+RICH_FEED = b"""<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom" xmlns:arxiv="http://arxiv.org/schemas/atom">
+    <title>ArXiv Query</title>
+    <entry>
+        <id>http://arxiv.org/abs/2401.01234v2</id>
+        <updated>2024-02-01T00:00:00Z</updated>
+        <published>2024-01-05T00:00:00Z</published>
+        <title>Streaming Paper</title>
+        <summary>  Streaming abstract  </summary>
+        <author><name>Ada Lovelace</name></author>
+        <author><name>Alan Turing</name></author>
+        <arxiv:primary_category term="cs.LG" scheme="http://arxiv.org/schemas/atom"/>
+        <category term="cs.LG" scheme="http://arxiv.org/schemas/atom"/>
+        <category term="stat.ML" scheme="http://arxiv.org/schemas/atom"/>
+    </entry>
+    <entry>
+        <id>http://arxiv.org/abs/hep-th/9901001v1</id>
+        <published>1999-01-01T00:00:00Z</published>
+        <title>Old Style Id</title>
+        <summary>Old abstract</summary>
+    </entry>
+</feed>
+"""
+
+def test_parse_arxiv_id():
+    assert parse_arxiv_id("http://arxiv.org/abs/2401.01234v2") == ("2401.01234", 2)
+    assert parse_arxiv_id("http://arxiv.org/abs/1234.5678") == ("1234.5678", None)
+    assert parse_arxiv_id("http://arxiv.org/abs/hep-th/9901001v1") == ("hep-th/9901001", 1)
+    assert parse_arxiv_id("http://example.com/test.pdf") == (None, None)
+
+def test_feed_parser_extracts_extra_fields():
+    papers = parse_feed(RICH_FEED)
+    assert len(papers) == 2
+    paper = papers[0]
+    assert paper["title"] == "Streaming Paper"
+    assert paper["abstract"] == "Streaming abstract"
+    assert paper["authors"] == ["Ada Lovelace", "Alan Turing"]
+    assert paper["categories"] == ["cs.LG", "stat.ML"]
+    assert paper["primary_category"] == "cs.LG"
+    assert paper["updated"] == "2024-02-01T00:00:00Z"
+    assert paper["arxiv_id"] == "2401.01234"
+    assert paper["version"] == 2
+    assert papers[1]["arxiv_id"] == "hep-th/9901001"
+    assert papers[1]["authors"] == []
+    assert papers[1]["updated"] is None
+
+def test_iter_feed_yields_before_body_ends():
+    consumed = []
+    split = RICH_FEED.index(b"</entry>") + len(b"</entry>")
+
+    def chunks():
+        # Tiny chunks to exercise entries split across chunk boundaries
+        for i in range(0, len(RICH_FEED), 7):
+            consumed.append(i)
+            yield RICH_FEED[i:i + 7]
+
+    papers = iter_feed(chunks())
+    first = next(papers)
+    assert first["title"] == "Streaming Paper"
+    assert consumed[-1] < split + 7  # The second entry has not been read yet
+    assert [p["title"] for p in papers] == ["Old Style Id"]
+
+def test_feed_parser_clears_processed_entries():
+    parser = FeedParser()
+    papers = parser.feed(RICH_FEED) + parser.close()
+    assert len(papers) == 2
+    assert parser._root.findall("{http://www.w3.org/2005/Atom}entry") == []
+
+def test_feed_parser_malformed_xml():
+    with pytest.raises(ET.ParseError):
+        parse_feed(b"<feed><entry></feed>")
+
+def test_search_papers_streams_response(crawler):
+    mock_response = Mock()
+    mock_response.raise_for_status = Mock()
+    mock_response.iter_content = Mock(return_value=[RICH_FEED[:100], RICH_FEED[100:]])
+
+    with patch("requests.get", return_value=mock_response) as mock_get:
+        results = crawler.search_papers("machine learning")
+
+    assert [p["title"] for p in results] == ["Streaming Paper", "Old Style Id"]
+    assert mock_get.call_args.kwargs["stream"] is True
+    mock_response.close.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_fetch_new_papers_stops_at_watermark(stub_server):
+    # The stub serves ids 2401.00000 .. 2401.00006, all published 2024-01-01
+    async with AsyncArxivCrawler(page_size=2, min_interval=0, base_url=stub_server.url) as crawler:
+        papers = await crawler.fetch_new_papers("test", since_id="2401.00003")
+    assert [p["arxiv_id"] for p in papers] == ["2401.00000", "2401.00001", "2401.00002"]
+    # Paging stopped on the page holding the known paper
+    assert [start for _, start, _, _, _ in stub_server.requests] == [0, 2]
+    assert "sortBy=submittedDate" in stub_server.paths[0]
+
+@pytest.mark.asyncio
+async def test_fetch_new_papers_stops_at_older_papers(stub_server):
+    async with AsyncArxivCrawler(page_size=2, min_interval=0, base_url=stub_server.url) as crawler:
+        assert await crawler.fetch_new_papers("test", since=datetime(2024, 6, 1)) == []
+        assert len(await crawler.fetch_new_papers("test", since=datetime(2023, 6, 1))) == 7
+
+@pytest.mark.asyncio
+async def test_fetch_new_papers_reports_failed_pages(stub_server):
+    stub_server.fail_from = 2
+    async with AsyncArxivCrawler(page_size=2, min_interval=0, base_url=stub_server.url) as crawler:
+        with pytest.raises(IncompleteCrawl) as excinfo:
+            await crawler.fetch_new_papers("test", since_id="2401.00005")
+        # Without a watermark a failed page leaves a gap just the same
+        with pytest.raises(IncompleteCrawl):
+            await crawler.fetch_new_papers("test", max_results=5)
+    assert [p["arxiv_id"] for p in excinfo.value.papers] == ["2401.00000", "2401.00001"]
+
+@pytest.mark.asyncio
+async def test_fetch_new_papers_reports_cap_before_watermark(stub_server):
+    async with AsyncArxivCrawler(page_size=2, min_interval=0, max_new_results=3, base_url=stub_server.url) as crawler:
+        with pytest.raises(IncompleteCrawl) as excinfo:
+            await crawler.fetch_new_papers("test", since_id="2401.00005")
+        # Reaching the watermark right at the cap is complete
+        assert len(await crawler.fetch_new_papers("test", since_id="2401.00003", max_results=4)) == 3
+        # A caller's budget is a deliberate cut, not a gap
+        assert len(await crawler.fetch_new_papers("test", since_id="2401.00005", max_results=2)) == 2
+    assert len(excinfo.value.papers) == 3
+
+@pytest.mark.asyncio
+async def test_fetch_new_papers_without_watermark(stub_server):
+    async with AsyncArxivCrawler(max_results=3, min_interval=0, base_url=stub_server.url) as crawler:
+        papers = await crawler.fetch_new_papers("test")
+    assert len(papers) == 3
@@ -0,0 +1,34 @@
+from backend.app.services.arxiv import ArxivCrawler
+from benchmarks.bench_suite import compare, load_fixtures, replay_arxiv
+
+def test_fixtures_replay_through_the_crawler():
+    fixtures = load_fixtures()
+    assert "graph neural networks" in fixtures
+    crawler = ArxivCrawler(max_results=5)
+    with replay_arxiv(fixtures):
+        papers = crawler.search_papers("graph neural networks")
+        missing = crawler.search_papers("unrecorded keyword")
+    assert len(papers) == 5
+    assert papers[0]["link"] == "http://arxiv.org/abs/2402.20001v1"
+    assert all(paper["abstract"] for paper in papers)
+    assert missing == []
+
+def test_compare_flags_regressions_beyond_tolerance():
+    baseline = {
+        "search_requests_per_sec": {"value": 100.0, "unit": "req/s", "better": "higher"},
+        "papers_list_1k_ms_p50": {"value": 10.0, "unit": "ms", "better": "lower"},
+        "save_paper_per_sec": {"value": 400.0, "unit": "papers/s", "better": "higher"},
+        "retired_metric": {"value": 1.0, "unit": "ms", "better": "lower"},
+    }
+    results = {
+        "search_requests_per_sec": {"value": 60.0, "unit": "req/s", "better": "higher"},
+        "papers_list_1k_ms_p50": {"value": 12.0, "unit": "ms", "better": "lower"},
+        "save_paper_per_sec": {"value": 900.0, "unit": "papers/s", "better": "higher"},
+        "new_metric": {"value": 1.0, "unit": "ms", "better": "lower"},
+    }
+    regressions = compare(results, baseline, tolerance=0.25)
+    assert len(regressions) == 1
+    assert regressions[0].startswith("search_requests_per_sec: 60.0 req/s vs baseline 100.0 (40% worse")
+    assert compare(results, baseline, tolerance=0.5) == []
+    # Slower latency beyond the tolerance fails too
+    assert compare(results, baseline, tolerance=0.1)[0].startswith("papers_list_1k_ms_p50")
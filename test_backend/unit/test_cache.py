@@ -0,0 +1,43 @@
+import pytest
+from backend.app.database.models import NLPCacheEntry
+from backend.app.services.cache import NLPCache
+
+def test_make_key_depends_on_all_inputs():
+    base = NLPCache.make_key("summary", "text", "model", {"num_beams": 4})
+    assert base == NLPCache.make_key("summary", "text", "model", {"num_beams": 4})
+    assert base != NLPCache.make_key("summary", "other text", "model", {"num_beams": 4})
+    assert base != NLPCache.make_key("summary", "text", "other-model", {"num_beams": 4})
+    assert base != NLPCache.make_key("summary", "text", "model", {"num_beams": 2})
+    assert base != NLPCache.make_key("keywords", "text", "model", {"num_beams": 4})
+
+def test_cache_hits_and_misses(session_factory):
+    cache = NLPCache(session_factory=session_factory)
+    assert cache.get("missing") is None
+    cache.set("k1", "keywords", ["machine learning", "data"])
+    assert cache.get("k1") == ["machine learning", "data"]
+    stats = cache.stats()
+    assert stats["misses"] == 1
+    assert stats["memory_hits"] == 1
+
+def test_cache_persists_across_instances(session_factory):
+    NLPCache(session_factory=session_factory).set("k1", "summary", "A summary")
+    cache = NLPCache(session_factory=session_factory)
+    assert cache.get_many(["k1", "k2"]) == {"k1": "A summary"}
+    assert cache.stats()["db_hits"] == 1
+    assert cache.stats()["misses"] == 1
+    # Promoted into the in-process LRU
+    assert cache.get("k1") == "A summary"
+    assert cache.stats()["memory_hits"] == 1
+
+def test_cache_eviction(session_factory):
+    cache = NLPCache(session_factory=session_factory, max_memory_entries=2, max_db_entries=3)
+    for i in range(5):
+        cache.set(f"k{i}", "summary", f"summary {i}")
+    assert cache.stats()["memory_entries"] == 2
+
+    db = session_factory()
+    try:
+        keys = {row.key for row in db.query(NLPCacheEntry).all()}
+    finally:
+        db.close()
+    assert len(keys) == 3
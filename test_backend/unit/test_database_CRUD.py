@@ -2,8 +2,13 @@ import pytest
 from datetime import datetime
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker, Session
-from backend.app.database.models import Base, Paper
-from backend.app.database.crud import save_paper, get_papers_by_keyword
+from backend.app.database.models import Base, Paper, Keyword, paper_keywords
+from backend.app.database.crud import (
+    save_paper, save_papers_bulk, get_papers_by_keyword, search_papers,
+    get_papers_by_extracted_keyword, get_keyword_facets, backfill_keyword_index,
+    list_papers, decode_cursor
+)
+from backend.app.database.fts import build_fts_query
 import os
 
 TEST_DB_PATH = "test.db"
@@ -93,4 +98,160 @@ def test_get_papers_by_keyword(db_session):
 
 def test_get_papers_by_keyword_no_results(db_session):
     papers = get_papers_by_keyword(db_session, "nonexistent", limit=10)
-    assert len(papers) == 0
\ No newline at end of file
+    assert len(papers) == 0
+
+def test_save_papers_bulk_counts_and_dedup(db_session):
+    papers = [
+        {"title": "A", "abstract": "a", "link": "http://arxiv.org/abs/1", "published": "2023-10-01T00:00:00Z"},
+        {"title": "B", "abstract": "b", "link": "http://arxiv.org/abs/2", "published": "2023-10-02T00:00:00Z"},
+        {"title": "A v2", "abstract": "a", "link": "http://arxiv.org/abs/1", "published": "2023-10-01T00:00:00Z"},
+    ]
+    result = save_papers_bulk(db_session, papers, "test")
+    assert result["inserted"] == 2
+    assert result["updated"] == 0
+    assert [p.title for p in result["papers"]] == ["A v2", "B"]
+    assert db_session.query(Paper).count() == 2
+
+    result = save_papers_bulk(db_session, [papers[1], {**papers[0], "title": "A v3"}], "other")
+    assert result["inserted"] == 0
+    assert result["updated"] == 2
+    assert db_session.query(Paper).count() == 2
+    updated = db_session.query(Paper).filter_by(link="http://arxiv.org/abs/1").one()
+    assert updated.title == "A v3"
+    assert updated.keyword == "test"  # The original search keyword is kept
+
+def test_save_papers_bulk_keeps_existing_summary(db_session):
+    paper = {
+        "title": "Test Paper",
+        "abstract": "abstract",
+        "link": "http://arxiv.org/abs/3",
+        "published": "2023-10-01T00:00:00Z",
+        "keywords": ["alpha", "beta"],
+        "summary": "A summary"
+    }
+    save_paper(db_session, paper, "test")
+    # Re-crawled without NLP output: keywords and summary must survive
+    saved = save_paper(db_session, {**paper, "keywords": [], "summary": ""}, "test")
+    assert saved.keywords == "alpha,beta"
+    assert saved.summary == "A summary"
+
+def test_save_papers_bulk_empty(db_session):
+    assert save_papers_bulk(db_session, [], "test") == {"inserted": 0, "updated": 0, "papers": []}
+
+def _save_search_corpus(db_session):
+    papers = [
+        {"title": "Graph neural networks", "abstract": "Message passing on graphs.",
+         "link": "http://arxiv.org/abs/10", "published": "2023-10-01T00:00:00Z", "keywords": ["gnn"]},
+        {"title": "Protein folding", "abstract": "We apply graph methods to proteins.",
+         "link": "http://arxiv.org/abs/11", "published": "2023-10-02T00:00:00Z", "summary": "Folding with networks"},
+        {"title": "Optimization", "abstract": "Stochastic optimizers for deep learning.",
+         "link": "http://arxiv.org/abs/12", "published": "2023-10-03T00:00:00Z"},
+    ]
+    save_papers_bulk(db_session, papers, "machine learning")
+
+def test_search_papers_ranked_across_columns(db_session):
+    _save_search_corpus(db_session)
+    # Title matches outrank abstract matches
+    assert [p.title for p in search_papers(db_session, "graph")] == ["Graph neural networks", "Protein folding"]
+    # Summary and extracted keywords are searchable too
+    assert [p.title for p in search_papers(db_session, "folding networks")] == ["Protein folding"]
+    assert [p.title for p in search_papers(db_session, "gnn")] == ["Graph neural networks"]
+
+def test_search_papers_phrase_and_prefix(db_session):
+    _save_search_corpus(db_session)
+    assert [p.title for p in search_papers(db_session, '"deep learning"')] == ["Optimization"]
+    assert search_papers(db_session, '"learning deep"') == []
+    assert [p.title for p in search_papers(db_session, "stoch*")] == ["Optimization"]
+
+def test_search_papers_index_follows_updates(db_session):
+    _save_search_corpus(db_session)
+    save_paper(db_session, {"title": "Transformers", "abstract": "Attention.",
+                            "link": "http://arxiv.org/abs/12", "published": "2023-10-03T00:00:00Z"}, "x")
+    assert search_papers(db_session, "optimization") == []
+    assert [p.link for p in search_papers(db_session, "transformers")] == ["http://arxiv.org/abs/12"]
+
+def test_build_fts_query_sanitizes_input():
+    assert build_fts_query('neural "graph network" optim*') == '"neural" "graph network" "optim"*'
+    assert build_fts_query('title:foo AND (bar OR "baz') == '"title" "foo" "AND" "bar" "OR" "baz"'
+    assert build_fts_query('  " " * ') is None
+
+def _save_keyword_corpus(db_session):
+    papers = [
+        {"title": "A", "abstract": "Graph learning.", "link": "http://arxiv.org/abs/20",
+         "published": "2023-10-01T00:00:00Z", "keywords": ["Graph Learning", "GNN"]},
+        {"title": "B", "abstract": "Graph proteins.", "link": "http://arxiv.org/abs/21",
+         "published": "2023-10-02T00:00:00Z", "keywords": ["graph learning", "proteins"]},
+        {"title": "C", "abstract": "Optimizers.", "link": "http://arxiv.org/abs/22",
+         "published": "2023-10-03T00:00:00Z", "keywords": ["optimization"]},
+    ]
+    save_papers_bulk(db_session, papers, "machine learning")
+
+def test_keyword_index_written_on_save(db_session):
+    _save_keyword_corpus(db_session)
+    names = {k.name for k in db_session.query(Keyword)}
+    assert names == {"graph learning", "gnn", "proteins", "optimization"}
+    assert db_session.query(paper_keywords).count() == 5
+
+    # Re-saving with new keywords replaces the paper's index rows
+    save_paper(db_session, {"title": "C", "abstract": "Optimizers.", "link": "http://arxiv.org/abs/22",
+                            "published": "2023-10-03T00:00:00Z", "keywords": ["sgd"]}, "x")
+    assert get_papers_by_extracted_keyword(db_session, "optimization") == []
+    assert [p.title for p in get_papers_by_extracted_keyword(db_session, "SGD")] == ["C"]
+
+def test_get_papers_by_extracted_keyword(db_session):
+    _save_keyword_corpus(db_session)
+    papers = get_papers_by_extracted_keyword(db_session, " Graph  learning ")
+    assert [p.title for p in papers] == ["B", "A"]  # Newest first
+    assert get_papers_by_extracted_keyword(db_session, "graph") == []
+
+def test_get_keyword_facets(db_session):
+    _save_keyword_corpus(db_session)
+    facets = get_keyword_facets(db_session)
+    assert facets[0] == {"keyword": "graph learning", "count": 2}
+    assert len(facets) == 4
+    assert get_keyword_facets(db_session, "proteins") == [
+        {"keyword": "graph learning", "count": 1},
+        {"keyword": "proteins", "count": 1},
+    ]
+    assert get_keyword_facets(db_session, "graph", limit=1) == [{"keyword": "graph learning", "count": 2}]
+
+def test_backfill_keyword_index(db_session):
+    db_session.add(Paper(title="Old", abstract="x", link="http://arxiv.org/abs/30",
+                         published=datetime(2023, 1, 1), keyword="ml", keywords="alpha,Beta"))
+    db_session.commit()
+    # A paper indexed by a concurrent writer first must not block the backfill
+    save_papers_bulk(db_session, [{"title": "New", "abstract": "y", "link": "http://arxiv.org/abs/31",
+                                   "published": "2024-01-01T00:00:00Z", "keywords": ["gamma"]}], "ml")
+    assert backfill_keyword_index(db_session, batch_size=1) == 1
+    assert [p.title for p in get_papers_by_extracted_keyword(db_session, "beta")] == ["Old"]
+    assert backfill_keyword_index(db_session) == 0
+
+def test_list_papers_keyset_pagination(db_session):
+    papers = [
+        {"title": f"Paper {i}", "abstract": "graph" if i % 2 else "other", "link": f"http://arxiv.org/abs/4{i}",
+         # Two papers per day so pages must break ties on id
+         "published": f"2023-10-0{1 + i // 2}T00:00:00Z"}
+        for i in range(7)
+    ]
+    save_papers_bulk(db_session, papers, "ml")
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = list_papers(db_session, page_size=3, cursor=cursor)
+        seen.extend(p.title for p in page)
+        if cursor is None:
+            break
+        assert len(page) == 3
+    assert seen == [f"Paper {i}" for i in (6, 5, 4, 3, 2, 1, 0)]
+
+    page, cursor = list_papers(db_session, query="graph", page_size=2)
+    assert [p.title for p in page] == ["Paper 5", "Paper 3"]
+    page, cursor = list_papers(db_session, query="graph", page_size=2, cursor=cursor)
+    assert [p.title for p in page] == ["Paper 1"]
+    assert cursor is None
+
+def test_list_papers_invalid_cursor(db_session):
+    with pytest.raises(ValueError):
+        list_papers(db_session, cursor="not-a-cursor")
+    with pytest.raises(ValueError):
+        decode_cursor("")
@@ -0,0 +1,91 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from backend.app.database.config import (
+    ENGINE_PROFILES, engine_options, apply_pragmas, async_database_url
+)
+
+def test_engine_options_profiles():
+    production = engine_options("sqlite:///papers.db", "production")
+    assert production["echo"] is False
+    assert production["pool_size"] == ENGINE_PROFILES["production"]["pool_size"]
+    assert production["connect_args"] == {"check_same_thread": False}
+    assert engine_options("sqlite:///papers.db", "dev")["echo"] is True
+    # In-memory databases use a single connection, so no pool sizing
+    assert "pool_size" not in engine_options("sqlite://", "production")
+    with pytest.raises(ValueError):
+        engine_options("sqlite:///papers.db", "fast")
+
+def test_apply_pragmas(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'p.db'}")
+    apply_pragmas(engine, "production")
+    with engine.connect() as connection:
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert connection.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert connection.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+        assert connection.execute(text("PRAGMA cache_size")).scalar() == -64 * 1024
+    engine.dispose()
+
+def test_async_database_url():
+    assert async_database_url("sqlite:///papers.db") == "sqlite+aiosqlite:///papers.db"
+    assert async_database_url("postgresql://u@h/db") == "postgresql+asyncpg://u@h/db"
+    assert async_database_url("sqlite+aiosqlite:///x.db") == "sqlite+aiosqlite:///x.db"
+
+@pytest.mark.asyncio
+async def test_async_engine_pragmas(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'a.db'}")
+    apply_pragmas(engine.sync_engine, "production")
+    async with engine.connect() as connection:
+        assert (await connection.execute(text("PRAGMA journal_mode"))).scalar() == "wal"
+    await engine.dispose()
+
+@pytest.mark.asyncio
+async def test_async_engine_pools_file_connections(tmp_path):
+    url = f"sqlite+aiosqlite:///{tmp_path / 'a.db'}"
+    engine = create_async_engine(url, **engine_options(url, "production"))
+    for _ in range(2):
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+    assert engine.pool.checkedin() == 1
+    await engine.dispose()
+
+def test_add_missing_columns(tmp_path):
+    from backend.app.database.config import add_missing_columns
+    from sqlalchemy import inspect
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE papers (id INTEGER PRIMARY KEY, title VARCHAR NOT NULL, abstract TEXT NOT NULL, "
+            "link VARCHAR NOT NULL, published DATETIME NOT NULL, keyword VARCHAR NOT NULL, keywords TEXT, summary TEXT)"
+        ))
+    add_missing_columns(engine)
+    columns = {column["name"] for column in inspect(engine).get_columns("papers")}
+    assert {"canonical_id", "version", "minhash"} <= columns
+    engine.dispose()
+
+def test_collapse_duplicate_links(tmp_path):
+    from backend.app.database.config import collapse_duplicate_links
+    from backend.app.database.models import Paper
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE papers (id INTEGER PRIMARY KEY, title VARCHAR NOT NULL, abstract TEXT NOT NULL, "
+            "link VARCHAR NOT NULL, published DATETIME NOT NULL, keyword VARCHAR NOT NULL, keywords TEXT, summary TEXT)"
+        ))
+        for title, link in (
+            ("First copy", "http://arxiv.org/abs/2401.00001v1"),
+            ("Second copy", "http://arxiv.org/abs/2401.00001v1"),
+            ("Other paper", "http://arxiv.org/abs/2401.00002v1"),
+        ):
+            connection.execute(text(
+                "INSERT INTO papers (title, abstract, link, published, keyword) "
+                "VALUES (:title, 'Abstract', :link, '2024-01-01 00:00:00', 'test')"
+            ), {"title": title, "link": link})
+    assert collapse_duplicate_links(engine) == 1
+    # The unique index that used to fail on this database can now be built
+    next(index for index in Paper.__table__.indexes if index.name == "uq_papers_link").create(engine)
+    with engine.connect() as connection:
+        titles = [title for (title,) in connection.execute(text("SELECT title FROM papers ORDER BY id"))]
+    assert titles == ["Second copy", "Other paper"]
+    assert collapse_duplicate_links(engine) == 0
+    engine.dispose()
@@ -0,0 +1,92 @@
+import pytest
+from backend.app.database.models import Paper
+from backend.app.database.crud import (
+    save_papers_bulk, backfill_canonical_ids, add_delete_listener, remove_delete_listener
+)
+from backend.app.services.dedup import MinHasher, Deduplicator
+
+ABSTRACT = (
+    "We propose a graph neural network for predicting molecular properties from "
+    "atom and bond features, and show state of the art results on three benchmarks."
+)
+
+def _paper(arxiv_id, version=1, title="Molecular GNNs", abstract=ABSTRACT):
+    return {
+        "title": title,
+        "abstract": abstract,
+        "link": f"http://arxiv.org/abs/{arxiv_id}v{version}",
+        "published": "2024-01-05T00:00:00Z"
+    }
+
+def test_minhash_similarity():
+    hasher = MinHasher()
+    first = hasher.signature(ABSTRACT)
+    assert hasher.similarity(first, hasher.signature(ABSTRACT)) == 1.0
+    near = hasher.signature(ABSTRACT.replace("three", "four"))
+    far = hasher.signature("Stochastic optimizers for training deep networks on large corpora of text.")
+    assert hasher.similarity(first, near) > 0.6
+    assert hasher.similarity(first, far) < 0.2
+    assert len(hasher.band_keys(first)) == hasher.bands
+    assert set(hasher.band_keys(first)) == set(hasher.band_keys(hasher.signature(ABSTRACT)))
+    with pytest.raises(ValueError):
+        MinHasher(num_perm=10, bands=3)
+
+def test_versions_collapse_to_latest(db_session):
+    dedup = Deduplicator()
+    result = dedup.partition(db_session, [_paper("2401.00001", 1), _paper("2401.00001", 2)])
+    assert [p["version"] for p in result.fresh] == [2]
+    save_papers_bulk(db_session, result.fresh, "ml")
+
+    # The same or an older version is a duplicate; a newer one replaces the row
+    result = dedup.partition(db_session, [_paper("2401.00001", 1), _paper("2401.00001", 2)])
+    assert result.fresh == []
+    result = dedup.partition(db_session, [_paper("2401.00001", 3)])
+    assert len(result.fresh) == 1
+    save_papers_bulk(db_session, result.fresh, "ml")
+    stored = db_session.query(Paper).one()
+    assert stored.canonical_id == "2401.00001"
+    assert stored.version == 3
+    assert stored.link.endswith("v3")
+
+def test_older_version_never_replaces_newer(db_session):
+    save_papers_bulk(db_session, [_paper("2401.00002", 2, title="New")], "ml")
+    save_papers_bulk(db_session, [_paper("2401.00002", 1, title="Old")], "ml")
+    stored = db_session.query(Paper).one()
+    assert (stored.title, stored.version) == ("New", 2)
+
+def test_near_duplicates(db_session):
+    dedup = Deduplicator()
+    first = dedup.partition(db_session, [_paper("2401.00003")])
+    saved = save_papers_bulk(db_session, first.fresh, "ml")["papers"][0]
+
+    reworded = _paper("2402.00009", abstract=ABSTRACT.replace("three", "four"))
+    unrelated = _paper("2402.00010", title="Optimizers", abstract="Stochastic optimizers for deep networks.")
+    result = dedup.partition(db_session, [reworded, unrelated])
+    assert [p["canonical_id"] for p in result.fresh] == ["2402.00010"]
+    assert [(p["canonical_id"], paper_id) for p, paper_id in result.duplicates] == [("2402.00009", saved.id)]
+
+    # Near-duplicates within one batch keep the first copy
+    other = "Protein structure prediction with diffusion models over residue graphs and side chains."
+    result = dedup.partition(db_session, [_paper("2403.00001", abstract=other), _paper("2403.00002", abstract=other)])
+    assert [p["canonical_id"] for p in result.fresh] == ["2403.00001"]
+
+def test_backfill_canonical_ids(db_session):
+    from datetime import datetime
+    for version in (1, 3, 2):
+        db_session.add(Paper(title=f"v{version}", abstract="a", link=f"http://arxiv.org/abs/2401.00004v{version}",
+                             published=datetime(2024, 1, 1), keyword="ml"))
+    db_session.add(Paper(title="other", abstract="a", link="http://example.com/x.pdf",
+                         published=datetime(2024, 1, 1), keyword="ml"))
+    db_session.commit()
+    deleted = []
+    add_delete_listener(deleted.extend)
+    try:
+        assert backfill_canonical_ids(db_session) == 2
+    finally:
+        remove_delete_listener(deleted.extend)
+    assert len(deleted) == 2
+    rows = {p.canonical_id: p for p in db_session.query(Paper)}
+    assert rows["2401.00004"].title == "v3"
+    assert rows["2401.00004"].version == 3
+    assert rows["http://example.com/x.pdf"].version is None
+    assert backfill_canonical_ids(db_session) == 0
@@ -0,0 +1,55 @@
+import asyncio
+import threading
+import time
+import pytest
+from backend.app.services.executor import Executors
+
+@pytest.fixture
+def executors():
+    pools = Executors(io_workers=2, inference_workers=1)
+    yield pools
+    pools.shutdown()
+
+@pytest.mark.asyncio
+async def test_run_io_returns_result(executors):
+    result = await executors.run_io(lambda a, b=0: a + b, 1, b=2)
+    assert result == 3
+
+@pytest.mark.asyncio
+async def test_run_inference_propagates_exceptions(executors):
+    def fail():
+        raise ValueError("boom")
+    with pytest.raises(ValueError):
+        await executors.run_inference(fail)
+
+@pytest.mark.asyncio
+async def test_event_loop_stays_responsive(executors):
+    """A blocking call on the pool must not stall other coroutines"""
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        for _ in range(5):
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    await asyncio.gather(executors.run_io(time.sleep, 0.2), ticker())
+    assert ticks == 5
+
+@pytest.mark.asyncio
+async def test_inference_pool_is_bounded(executors):
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def work():
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.02)
+        with lock:
+            running -= 1
+
+    await asyncio.gather(*(executors.run_inference(work) for _ in range(4)))
+    assert peak == 1
@@ -0,0 +1,54 @@
+import csv
+import gzip
+import io
+import json
+import pytest
+from unittest.mock import patch
+from backend.app import cli
+from backend.app.database.crud import save_papers_bulk, iter_papers
+from backend.app.services.export import encode_export, EXPORT_FIELDS
+
+@pytest.fixture
+def db_session(db_session):
+    """The shared session with four stored papers."""
+    save_papers_bulk(db_session, [
+        {"title": f"Paper {i}", "abstract": "graph, networks" if i % 2 else "optimizers",
+         "link": f"http://arxiv.org/abs/2401.0000{i}v1", "published": f"2024-01-0{i + 1}T00:00:00Z",
+         "keywords": ["a", "b"], "summary": "Summary, with \"quotes\""}
+        for i in range(4)
+    ], "ml")
+    return db_session
+
+def test_iter_papers_filters(db_session):
+    assert [p.title for p in iter_papers(db_session, batch_size=2)] == [f"Paper {i}" for i in range(4)]
+    assert [p.title for p in iter_papers(db_session, query="graph")] == ["Paper 1", "Paper 3"]
+    papers = iter_papers(db_session, since="2024-01-02", until="2024-01-04T00:00:00Z")
+    assert [p.title for p in papers] == ["Paper 1", "Paper 2"]
+    assert list(iter_papers(db_session, query="***")) == []
+
+def test_encode_ndjson(db_session):
+    body = b"".join(encode_export(iter_papers(db_session), "ndjson"))
+    records = [json.loads(line) for line in body.decode().splitlines()]
+    assert len(records) == 4
+    assert records[0]["keywords"] == ["a", "b"]
+    assert records[0]["published"] == "2024-01-01T00:00:00"
+    assert records[0]["canonical_id"] == "2401.00000"
+
+def test_encode_csv_gzip(db_session):
+    body = gzip.decompress(b"".join(encode_export(iter_papers(db_session), "csv", compress=True)))
+    rows = list(csv.DictReader(io.StringIO(body.decode())))
+    assert list(rows[0]) == list(EXPORT_FIELDS)
+    assert len(rows) == 4
+    assert rows[0]["summary"] == 'Summary, with "quotes"'
+    assert rows[0]["keywords"] == "a;b"
+
+def test_encode_unknown_format():
+    with pytest.raises(ValueError):
+        encode_export([], "xml")
+
+def test_cli_export(db_session, tmp_path, session_factory):
+    output = tmp_path / "papers.ndjson.gz"
+    with patch.object(cli, "SessionLocal", session_factory), patch.object(cli, "init_db"):
+        cli.main(["export", "--keyword", "graph", "--since", "2024-01-03", "--gzip", "-o", str(output)])
+    records = [json.loads(line) for line in gzip.decompress(output.read_bytes()).decode().splitlines()]
+    assert [r["title"] for r in records] == ["Paper 3"]
@@ -0,0 +1,116 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from backend.app.database.models import NLPJob, Paper
+from backend.app.database.crud import (
+    save_papers_bulk, enqueue_nlp_jobs, claim_nlp_jobs, complete_nlp_jobs, fail_nlp_jobs, count_nlp_jobs
+)
+from backend.app.services.jobs import NLPJobWorker
+
+def _save(db_session, n):
+    papers = [
+        {"title": f"Paper {i}", "abstract": f"Abstract {i}", "link": f"http://arxiv.org/abs/2401.0000{i}v1",
+         "published": "2024-01-01T00:00:00Z"}
+        for i in range(n)
+    ]
+    return [p.id for p in save_papers_bulk(db_session, papers, "ml")["papers"]]
+
+def test_enqueue_reuses_active_jobs(db_session):
+    ids = _save(db_session, 2)
+    jobs = enqueue_nlp_jobs(db_session, ids)
+    again = enqueue_nlp_jobs(db_session, [ids[1], ids[1]])
+    assert [j.id for j in again] == [jobs[1].id]
+    complete_nlp_jobs(db_session, [jobs[1].id])
+    assert enqueue_nlp_jobs(db_session, [ids[1]])[0].id != jobs[1].id
+    assert count_nlp_jobs(db_session) == {"pending": 2, "done": 1}
+
+def test_claim_is_exclusive_and_leased(db_session, session_factory):
+    ids = _save(db_session, 3)
+    enqueue_nlp_jobs(db_session, ids)
+    first = claim_nlp_jobs(db_session, limit=2)
+    second = claim_nlp_jobs(session_factory(), limit=2)
+    assert [j.paper_id for j in first] == ids[:2]
+    assert [j.paper_id for j in second] == ids[2:]
+    assert claim_nlp_jobs(db_session) == []
+    assert all(j.status == "running" and j.attempts == 1 for j in first)
+
+    # An expired lease (dead worker) makes the job claimable again
+    db_session.query(NLPJob).filter(NLPJob.id == first[0].id).update(
+        {"available_at": datetime.utcnow() - timedelta(seconds=1)}
+    )
+    db_session.commit()
+    reclaimed = claim_nlp_jobs(db_session)
+    assert [j.id for j in reclaimed] == [first[0].id]
+    assert reclaimed[0].attempts == 2
+
+    # Once its attempts are used up, an expired lease fails the job instead
+    db_session.query(NLPJob).filter(NLPJob.id == first[0].id).update(
+        {"available_at": datetime.utcnow() - timedelta(seconds=1)}
+    )
+    db_session.commit()
+    assert claim_nlp_jobs(db_session, max_attempts=2) == []
+    db_session.refresh(reclaimed[0])
+    assert (reclaimed[0].status, reclaimed[0].last_error) == ("failed", "lease expired on the last attempt")
+
+def test_fail_retries_then_gives_up(db_session):
+    enqueue_nlp_jobs(db_session, _save(db_session, 1))
+    job = claim_nlp_jobs(db_session)[0]
+    fail_nlp_jobs(db_session, [job.id], "boom", max_attempts=2, retry_delay=0)
+    db_session.refresh(job)
+    assert (job.status, job.last_error) == ("pending", "boom")
+    job = claim_nlp_jobs(db_session)[0]
+    fail_nlp_jobs(db_session, [job.id], "boom again", max_attempts=2, retry_delay=0)
+    db_session.refresh(job)
+    assert job.status == "failed"
+    assert claim_nlp_jobs(db_session) == []
+
+def test_worker_processes_and_retries(db_session, session_factory):
+    ids = _save(db_session, 2)
+    enqueue_nlp_jobs(db_session, ids)
+    calls = []
+
+    def process(papers):
+        calls.append([p["title"] for p in papers])
+        if len(calls) == 1:
+            raise RuntimeError("model not loaded")
+        return [dict(p, summary=f"Summary of {p['title']}", keywords=["k"]) for p in papers]
+
+    def store(db, papers, keyword):
+        save_papers_bulk(db, papers, keyword)
+
+    worker = NLPJobWorker(process, store, session_factory=session_factory, retry_delay=0)
+    assert asyncio.run(worker.run_once()) == 2
+    assert count_nlp_jobs(db_session) == {"pending": 2}
+    assert asyncio.run(worker.run_once()) == 2
+    assert asyncio.run(worker.run_once()) == 0
+    assert calls == [["Paper 0", "Paper 1"]] * 2
+    assert count_nlp_jobs(db_session) == {"done": 2}
+    db_session.expire_all()
+    assert db_session.query(Paper).filter_by(title="Paper 1").one().summary == "Summary of Paper 1"
+    assert worker.stats()["processed"] == 2
+    assert worker.stats()["failed"] == 2
+
+@pytest.mark.asyncio
+async def test_worker_background_loop(db_session, session_factory):
+    done = asyncio.Event()
+
+    def store(db, papers, keyword):
+        save_papers_bulk(db, papers, keyword)
+
+    def process(papers):
+        return [dict(p, summary="s") for p in papers]
+
+    worker = NLPJobWorker(process, store, session_factory=session_factory, poll_interval=30)
+    worker.start()
+    try:
+        enqueue_nlp_jobs(db_session, _save(db_session, 1))
+        worker.wake()  # No need to wait for the poll interval
+        for _ in range(100):
+            if count_nlp_jobs(db_session) == {"done": 1}:
+                done.set()
+                break
+            await asyncio.sleep(0.05)
+    finally:
+        await worker.stop()
+    assert done.is_set()
+    assert not worker.running
@@ -0,0 +1,51 @@
+import pytest
+from backend.app.services.keywords import TfidfKeywordExtractor
+
+CORPUS = [
+    "Graph neural networks aggregate information from neighbouring nodes.",
+    "Reinforcement learning agents learn policies from rewards.",
+    "Diffusion models generate images by reversing a noising process.",
+    "Neural networks are trained with stochastic gradient descent.",
+]
+
+@pytest.fixture
+def extractor():
+    tfidf = TfidfKeywordExtractor(top=3)
+    tfidf.fit(CORPUS)
+    return tfidf
+
+def test_analyze_drops_stopwords_and_builds_bigrams():
+    terms = TfidfKeywordExtractor.analyze("We propose graph neural networks for the task")
+    assert "graph" in terms
+    assert "graph neural" in terms
+    assert "neural networks" in terms
+    assert "the" not in terms
+    assert not any("propose" in term for term in terms)
+
+def test_fit_counts_document_frequency(extractor):
+    assert extractor.n_docs == 4
+    assert extractor.df[extractor.vocabulary["neural networks"]] == 2
+    assert extractor.df[extractor.vocabulary["diffusion"]] == 1
+
+def test_partial_fit_extends_corpus(extractor):
+    extractor.partial_fit(["Diffusion models for audio synthesis."])
+    assert extractor.n_docs == 5
+    assert extractor.df[extractor.vocabulary["diffusion"]] == 2
+    assert "audio" in extractor.vocabulary
+
+def test_extract_batch_prefers_rare_terms(extractor):
+    results = extractor.extract_batch([
+        "Diffusion models with neural networks and diffusion sampling.",
+        "",
+        "Quantum error correction codes.",
+    ])
+    assert len(results) == 3
+    assert results[0][0] == "diffusion"
+    assert len(results[0]) == 3
+    assert results[1] == []
+    # Terms unseen in the corpus are still scored
+    assert "quantum" in results[2]
+
+def test_extract_matches_batch(extractor):
+    text = "Graph diffusion on neural networks."
+    assert extractor.extract(text) == extractor.extract_batch([text])[0]
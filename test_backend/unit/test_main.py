@@ -1,12 +1,19 @@
+import gzip
+import json
 import pytest
 import os
 from fastapi.testclient import TestClient
-from backend.app.main import app, crawler, nlp, scheduler
+from backend.app import main
+from backend.app.main import app, crawler, nlp, scheduler, papers_cache
+from backend.app.services.similarity import EmbeddingIndex
 from backend.app.database.models import Base, Paper
-from backend.app.database.config import get_db
+from backend.app.database.config import get_db, get_async_db
+from backend.app.database.crud import save_papers_bulk
 from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
 from sqlalchemy.orm import sessionmaker
-from unittest.mock import patch
+from unittest.mock import patch, PropertyMock
 from datetime import datetime
 
 # Shared engine for all fixtures
@@ -44,14 +51,22 @@ def db_session():
                 print(f"Warning: Could not delete {TEST_DB_PATH} due to file lock")
 
 @pytest.fixture(scope="function")
-def client(db_session):
+def client(db_session, tmp_path):
     def override_get_db():
         try:
             yield db_session
         finally:
             db_session.rollback()
+    # TestClient runs each request on a fresh event loop, so async connections are not pooled
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{TEST_DB_PATH}", poolclass=NullPool)
+    async def override_get_async_db():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
     app.dependency_overrides[get_db] = override_get_db
-    yield TestClient(app)
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    papers_cache.clear()  # Each test starts from a fresh database
+    with patch.object(main, "embedding_index", EmbeddingIndex(str(tmp_path / "embeddings"), model_name=nlp.model_name)):
+        yield TestClient(app)
     app.dependency_overrides.clear()
 
 def test_search_endpoint(client, db_session):
@@ -65,8 +80,8 @@ def test_search_endpoint(client, db_session):
         }
     ]
     with patch.object(crawler, "search_papers", return_value=mock_papers):
-        with patch.object(nlp, "extract_keywords", return_value=["test", "paper"]):
-            with patch.object(nlp, "generate_summary", return_value="Test summary"):
+        with patch.object(nlp, "extract_keywords_batch", return_value=[["test", "paper"]]):
+            with patch.object(nlp, "generate_summaries", return_value=["Test summary"]):
                 response = client.get("/search?keyword=test")
                 assert response.status_code == 200
                 assert "results" in response.json()
@@ -95,6 +110,23 @@ def test_papers_endpoint(client, db_session):
     assert "papers" in response.json()
     assert len(response.json()["papers"]) == 1
     assert response.json()["papers"][0]["title"] == "Test Paper"
+    assert response.json()["next_cursor"] is None
+
+def test_papers_endpoint_pagination(client, db_session):
+    save_papers_bulk(db_session, [
+        {"title": f"Paper {i}", "abstract": "Test abstract", "link": f"http://example.com/{i}.pdf",
+         "published": f"2023-10-0{i + 1}T00:00:00Z"}
+        for i in range(3)
+    ], "test")
+
+    first = client.get("/papers?keyword=test&page_size=2").json()
+    assert [p["title"] for p in first["papers"]] == ["Paper 2", "Paper 1"]
+    second = client.get("/papers", params={"keyword": "test", "page_size": 2, "cursor": first["next_cursor"]}).json()
+    assert [p["title"] for p in second["papers"]] == ["Paper 0"]
+    assert second["next_cursor"] is None
+
+    assert client.get("/papers?cursor=bogus").status_code == 400
+    assert client.get("/papers?page_size=0").status_code == 422
 
 
 def test_scheduler_status_endpoint(client):
@@ -103,7 +135,249 @@ def test_scheduler_status_endpoint(client):
         assert response.status_code == 200
         assert response.json() == {"running": True}
 
+def test_subscription_endpoints(client):
+    with patch.object(scheduler, "schedule_tasks") as schedule:
+        created = client.post("/subscriptions", json={"keyword": "  graph   learning ", "interval_minutes": 60})
+        assert created.status_code == 201
+        subscription = created.json()
+        assert subscription["keyword"] == "graph learning"
+        assert (subscription["interval_minutes"], subscription["max_results"], subscription["enabled"]) == (60, 5, True)
+        # The scheduler is re-synced with the enabled subscriptions
+        assert [s.keyword for s in schedule.call_args[0][0]] == ["graph learning"]
+
+        assert client.post("/subscriptions", json={"keyword": "graph learning"}).status_code == 409
+        assert client.post("/subscriptions", json={"keyword": "  "}).status_code == 422
+        assert client.post("/subscriptions", json={"keyword": "x", "interval_minutes": 0}).status_code == 422
+
+        sub_id = subscription["id"]
+        updated = client.patch(f"/subscriptions/{sub_id}", json={"max_results": 50, "enabled": False})
+        assert updated.json()["max_results"] == 50
+        assert updated.json()["interval_minutes"] == 60
+        assert schedule.call_args[0][0] == []
+        assert client.get(f"/subscriptions/{sub_id}").json()["enabled"] is False
+        assert [s["id"] for s in client.get("/subscriptions").json()["subscriptions"]] == [sub_id]
+
+        assert client.delete(f"/subscriptions/{sub_id}").status_code == 204
+        assert client.delete(f"/subscriptions/{sub_id}").status_code == 404
+        assert client.get(f"/subscriptions/{sub_id}").status_code == 404
+        assert client.patch(f"/subscriptions/{sub_id}", json={"enabled": True}).status_code == 404
+        assert client.get("/subscriptions").json() == {"subscriptions": []}
+
+def test_metrics_endpoint(client):
+    client.get("/health")
+    client.get("/jobs/12345")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    # Routes are labelled by template, not by the concrete path
+    assert 'http_requests_total{method="GET",route="/health",status="200"}' in text
+    assert 'http_requests_total{method="GET",route="/jobs/{job_id}",status="404"}' in text
+    assert 'http_request_seconds_bucket{method="GET",route="/health",le="+Inf"}' in text
+    for name in ("arxiv_fetch_seconds", "nlp_summary_tokens_per_second", "db_commit_seconds",
+                 "scheduler_crawl_seconds", "ingest_queue_depth", "executor_queue_depth"):
+        assert f"# TYPE {name} " in text
+    assert 'executor_queue_depth{pool="inference"} 0' in text
+
 def test_search_endpoint_empty_keyword(client):
     response = client.get("/search?keyword=")
     assert response.status_code == 200
-    assert response.json()["results"] == []
\ No newline at end of file
+    assert response.json()["results"] == []
+
+def test_readiness_endpoint_while_loading(client):
+    with patch.object(type(nlp), "is_loaded", new_callable=PropertyMock, return_value=False):
+        response = client.get("/health/ready")
+        assert response.status_code == 503
+        assert response.json()["status"] == "loading"
+
+def test_readiness_endpoint_when_ready(client):
+    with patch.object(type(nlp), "is_loaded", new_callable=PropertyMock, return_value=True):
+        response = client.get("/health/ready")
+        assert response.status_code == 200
+        assert response.json()["status"] == "ready"
+
+def test_search_stream_ndjson(client, db_session):
+    mock_papers = [
+        {
+            "title": f"Test Paper {i}",
+            "abstract": f"Test abstract {i}",
+            "link": f"http://example.com/test{i}.pdf",
+            "published": "2023-10-01T00:00:00"
+        } for i in range(2)
+    ]
+    with patch.object(crawler, "search_papers", return_value=mock_papers):
+        with patch.object(nlp, "extract_keywords_batch", side_effect=lambda texts: [["test"] for _ in texts]):
+            with patch.object(nlp, "generate_summaries", side_effect=lambda texts: ["Test summary" for _ in texts]) as mock_summaries:
+                response = client.get("/search/stream?keyword=test")
+                assert response.status_code == 200
+                assert response.headers["content-type"].startswith("application/x-ndjson")
+                lines = [json.loads(line) for line in response.text.splitlines()]
+                assert [line["title"] for line in lines] == ["Test Paper 0", "Test Paper 1"]
+                assert lines[0]["keywords"] == ["test"]
+                assert lines[0]["summary"] == "Test summary"
+                # One paper per batch by default
+                assert mock_summaries.call_count == 2
+    assert db_session.query(Paper).count() == 2
+
+def test_search_stream_sse(client):
+    mock_papers = [{
+        "title": "Test Paper",
+        "abstract": "Test abstract",
+        "link": "http://example.com/test.pdf",
+        "published": "2023-10-01T00:00:00"
+    }]
+    with patch.object(crawler, "search_papers", return_value=mock_papers):
+        with patch.object(nlp, "extract_keywords_batch", return_value=[["test"]]):
+            with patch.object(nlp, "generate_summaries", return_value=["Test summary"]):
+                response = client.get("/search/stream?keyword=test&format=sse")
+                assert response.status_code == 200
+                assert response.headers["content-type"].startswith("text/event-stream")
+                events = [block for block in response.text.split("\n\n") if block]
+                assert events[0].startswith("event: paper\ndata: ")
+                assert json.loads(events[0].split("data: ", 1)[1])["title"] == "Test Paper"
+                assert events[-1].startswith("event: end")
+
+def test_keyword_endpoints(client, db_session):
+    save_papers_bulk(db_session, [
+        {"title": "Test Paper", "abstract": "Test abstract", "link": "http://example.com/test.pdf",
+         "published": "2023-10-01T00:00:00Z", "keywords": ["test", "paper"], "summary": "Test summary"}
+    ], "test")
+
+    response = client.get("/keywords/paper/papers")
+    assert response.status_code == 200
+    assert [p["title"] for p in response.json()["papers"]] == ["Test Paper"]
+
+    response = client.get("/keywords/facets?query=test")
+    assert response.status_code == 200
+    assert response.json()["facets"] == [{"keyword": "paper", "count": 1}, {"keyword": "test", "count": 1}]
+
+def test_papers_endpoint_cache_and_etag(client, db_session):
+    paper = {"title": "Test Paper", "abstract": "Test abstract", "link": "http://example.com/test.pdf",
+             "published": "2023-10-01T00:00:00Z"}
+    save_papers_bulk(db_session, [paper], "test")
+
+    first = client.get("/papers?keyword=test")
+    etag = first.headers["etag"]
+    assert first.status_code == 200
+    hits = papers_cache.stats()["hits"]
+    second = client.get("/papers?keyword=test")
+    assert second.json() == first.json()
+    assert papers_cache.stats()["hits"] == hits + 1
+
+    not_modified = client.get("/papers?keyword=test", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+    # Saving papers for the keyword invalidates its cached responses
+    save_papers_bulk(db_session, [{**paper, "title": "Updated", "link": "http://example.com/2.pdf",
+                                   "published": "2023-10-02T00:00:00Z"}], "Test")
+    third = client.get("/papers?keyword=test", headers={"If-None-Match": etag})
+    assert third.status_code == 200
+    assert [p["title"] for p in third.json()["papers"]] == ["Updated", "Test Paper"]
+    assert third.headers["etag"] != etag
+
+    # Papers saved under another search keyword can match the query too
+    save_papers_bulk(db_session, [{**paper, "title": "Test Later", "link": "http://example.com/3.pdf",
+                                   "published": "2023-10-03T00:00:00Z"}], "other")
+    fourth = client.get("/papers?keyword=test")
+    assert [p["title"] for p in fourth.json()["papers"]] == ["Test Later", "Updated", "Test Paper"]
+
+def test_similar_endpoint(client, db_session):
+    import numpy as np
+    stored = save_papers_bulk(db_session, [
+        {"title": f"Paper {i}", "abstract": "Test abstract", "link": f"http://example.com/{i}.pdf",
+         "published": "2023-10-01T00:00:00Z"}
+        for i in range(3)
+    ], "test")["papers"]
+    ids = [p.id for p in stored]
+    main.store_embeddings(db_session, ids, np.array([[1, 0], [0.8, 0.6], [0, 1]], dtype=np.float32))
+
+    response = client.get(f"/similar?paper_id={ids[0]}&k=2")
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["title"] for r in results] == ["Paper 1", "Paper 2"]
+    assert results[0]["score"] == pytest.approx(0.8)
+
+    with patch.object(nlp, "embed_texts", return_value=np.array([[0, 1]], dtype=np.float32)):
+        response = client.get("/similar?text=anything&k=1")
+    assert [r["title"] for r in response.json()["results"]] == ["Paper 2"]
+
+    assert client.get("/similar?paper_id=999").status_code == 404
+    assert client.get("/similar").status_code == 400
+
+def _run_nlp_worker_once():
+    import asyncio
+    from backend.app.services.jobs import NLPJobWorker
+    worker = NLPJobWorker(process=main.process_queued_papers, store=main.save_papers, session_factory=SessionLocal)
+    return asyncio.run(worker.run_once())
+
+def test_search_enqueues_nlp_jobs(client, db_session):
+    paper = {
+        "title": "Test Paper",
+        "abstract": "Test abstract about graph neural networks for molecules",
+        "link": "http://arxiv.org/abs/2401.00001v1",
+        "published": "2023-10-01T00:00:00Z"
+    }
+    with patch.object(crawler, "search_papers", return_value=[dict(paper)]), \
+            patch.object(nlp, "generate_summaries") as summaries:
+        response = client.get("/search?keyword=test").json()
+    # Saved immediately, NLP deferred to the job queue
+    summaries.assert_not_called()
+    assert response["results"][0]["summary"] == ""
+    job = response["jobs"][0]
+    assert job["status"] == "pending"
+    assert job["paper_id"] == response["results"][0]["id"]
+    assert client.get(f"/jobs/{job['id']}").json()["status"] == "pending"
+
+    # v1 again plus v2: v1 is a stored duplicate, v2 replaces it and reuses the pending job
+    with patch.object(crawler, "search_papers", return_value=[dict(paper), dict(paper, link=paper["link"][:-1] + "2")]):
+        second = client.get("/search?keyword=other").json()
+    assert [j["id"] for j in second["jobs"]] == [job["id"]]
+    assert len(second["results"]) == 1
+    assert db_session.query(Paper).count() == 1
+
+    with patch.object(nlp, "extract_keywords_batch", return_value=[["graph"]]), \
+            patch.object(nlp, "generate_summaries", return_value=["Summary"]) as summaries, \
+            patch.object(nlp, "embed_texts", side_effect=RuntimeError("no model")):
+        assert _run_nlp_worker_once() == 1
+    assert summaries.call_args[0][0] == [paper["abstract"]]
+    status = client.get(f"/jobs/{job['id']}").json()
+    assert status["status"] == "done"
+    assert status["paper"]["summary"] == "Summary"
+    assert status["paper"]["keywords"] == ["graph"]
+    assert status["paper"]["link"].endswith("v2")
+    assert client.get("/jobs/stats").json()["jobs"] == {"done": 1}
+    assert client.get("/jobs/999").status_code == 404
+
+def test_nlp_job_fails_when_model_cannot_load(client, db_session, tmp_path):
+    from backend.app.database.crud import enqueue_nlp_jobs
+    from backend.app.services.nlp import NLPProcessor
+    stored = save_papers_bulk(db_session, [{
+        "title": "Test Paper", "abstract": "Test abstract about graph neural networks",
+        "link": "http://arxiv.org/abs/2401.00001v1", "published": "2023-10-01T00:00:00Z"
+    }], "test")["papers"]
+    job = enqueue_nlp_jobs(db_session, [stored[0].id])[0]
+    broken = NLPProcessor(model_name=str(tmp_path / "missing-model"))
+    with patch.object(main, "nlp", broken):
+        assert _run_nlp_worker_once() == 1
+    db_session.expire_all()
+    status = client.get(f"/jobs/{job.id}").json()
+    # Retried with backoff instead of being marked done without a summary
+    assert status["status"] == "pending"
+    assert status["attempts"] == 1
+    assert status["last_error"].startswith("No summary generated for 1 of 1 papers")
+
+def test_export_endpoint(client, db_session):
+    save_papers_bulk(db_session, [
+        {"title": f"Paper {i}", "abstract": "Test abstract", "link": f"http://example.com/{i}.pdf",
+         "published": f"2023-10-0{i + 1}T00:00:00Z"}
+        for i in range(3)
+    ], "test")
+    with patch("backend.app.main.SessionLocal", SessionLocal):
+        response = client.get("/export?since=2023-10-02T00:00:00Z")
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        assert [json.loads(line)["title"] for line in response.text.splitlines()] == ["Paper 1", "Paper 2"]
+
+        response = client.get("/export?format=csv&gzip=true")
+        assert response.headers["content-disposition"] == 'attachment; filename="papers.csv.gz"'
+        assert gzip.decompress(response.content).decode().count("\n") == 4
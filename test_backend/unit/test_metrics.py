@@ -0,0 +1,92 @@
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from backend.app.services.arxiv import ArxivCrawler, iter_feed, parse_feed
+from backend.app.services.metrics import (
+    MetricsRegistry, ARXIV_FETCH_SECONDS, ARXIV_PAPERS, ARXIV_PARSE_SECONDS, DB_COMMIT_SECONDS, track_commits
+)
+
+FEED = b"""<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <entry>
+    <id>http://arxiv.org/abs/2401.00001v1</id>
+    <title>Test Paper</title>
+    <summary>Test abstract</summary>
+    <published>2024-01-01T00:00:00Z</published>
+  </entry>
+</feed>"""
+
+def test_counter_and_gauge_rendering():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests.", ["route"])
+    requests.inc(route="/papers")
+    requests.inc(2, route="/papers")
+    requests.inc(route='/a"b')
+    depth = registry.gauge("queue_depth", "Depth.", ["stage"], collect=lambda: {("nlp",): 3})
+    registry.gauge("broken", "Collector that fails.", collect=lambda: 1 / 0)
+    assert requests.value(route="/papers") == 3
+    assert registry.counter("requests_total", "Requests.", ["route"]) is requests
+
+    text = registry.render()
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{route="/papers"} 3' in text
+    assert 'requests_total{route="/a\\"b"} 1' in text
+    assert 'queue_depth{stage="nlp"} 3' in text
+    assert "# TYPE broken gauge" in text
+    assert depth.kind == "gauge"
+    with pytest.raises(ValueError):
+        requests.inc(stage="x")
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latency.", ["stage"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value, stage="fetch")
+    with latency.time(stage="parse"):
+        pass
+    assert latency.count(stage="fetch") == 4
+
+    lines = registry.render().splitlines()
+    assert 'latency_seconds_bucket{stage="fetch",le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{stage="fetch",le="1"} 3' in lines
+    assert 'latency_seconds_bucket{stage="fetch",le="+Inf"} 4' in lines
+    assert 'latency_seconds_sum{stage="fetch"} 3.65' in lines
+    assert 'latency_seconds_count{stage="fetch"} 4' in lines
+    assert 'latency_seconds_count{stage="parse"} 1' in lines
+
+def test_feed_parsing_is_instrumented():
+    parses, papers = ARXIV_PARSE_SECONDS.count(client="sync"), ARXIV_PAPERS.value(client="sync")
+    assert len(parse_feed(FEED)) == 1
+    assert ARXIV_PARSE_SECONDS.count(client="sync") == parses + 1
+    assert ARXIV_PAPERS.value(client="sync") == papers + 1
+
+def test_track_commits():
+    class TrackedSession(Session):
+        pass
+    track_commits(TrackedSession)
+    engine = create_engine("sqlite://")
+    session = sessionmaker(bind=engine, class_=TrackedSession)()
+    commits = DB_COMMIT_SECONDS.count()
+    session.commit()
+    session.close()
+    assert DB_COMMIT_SECONDS.count() == commits + 1
+
+def test_parse_stats_recorded_when_consumer_stops_early():
+    parses = ARXIV_PARSE_SECONDS.count(client="sync")
+    papers = iter_feed([FEED])
+    assert next(papers)["title"] == "Test Paper"
+    papers.close()
+    assert ARXIV_PARSE_SECONDS.count(client="sync") == parses + 1
+
+def test_fetch_time_excludes_consumer_time():
+    response = MagicMock()
+    response.iter_content.return_value = iter([FEED[:100], FEED[100:]])
+    fetches, fetch_seconds = ARXIV_FETCH_SECONDS.count(client="sync"), ARXIV_FETCH_SECONDS.total(client="sync")
+    with patch("backend.app.services.arxiv.requests.get", return_value=response):
+        for _ in ArxivCrawler(max_results=1).iter_papers("test"):
+            time.sleep(0.2)
+    assert ARXIV_FETCH_SECONDS.count(client="sync") == fetches + 1
+    assert ARXIV_FETCH_SECONDS.total(client="sync") - fetch_seconds < 0.1
+    response.close.assert_called_once()
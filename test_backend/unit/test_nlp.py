@@ -1,8 +1,11 @@
 # test_backend/unit/test_nlp.py
 import pytest
+import numpy as np
 import torch 
 from unittest.mock import patch, MagicMock
 from backend.app.services.nlp import NLPProcessor
+from backend.app.services.cache import NLPCache
+from backend.app.services.metrics import SUMMARY_SECONDS, SUMMARY_TOKENS
 
 # Sample text for testing
 SAMPLE_TEXT = (
@@ -94,4 +97,118 @@ def test_generate_summary_long_input(nlp_processor):
         assert args[0] == long_text
         assert kwargs["max_length"] == 1024
         assert kwargs["truncation"] is True
-        assert kwargs["return_tensors"] == "pt"
\ No newline at end of file
+        assert kwargs["return_tensors"] == "pt"
+
+def test_generate_summaries_batches_by_length(nlp_processor):
+    """Test batched summarization keeps input order and buckets by length"""
+    texts = [SAMPLE_TEXT, "", "Short abstract.", "A slightly longer abstract text."]
+
+    calls, tokens = SUMMARY_SECONDS.count(), SUMMARY_TOKENS.value()
+    # Echo the padded inputs back so decoding returns the original texts
+    with patch.object(nlp_processor.model, "generate", side_effect=lambda input_ids, **kwargs: input_ids) as mock_generate:
+        summaries = nlp_processor.generate_summaries(texts, batch_size=2)
+    # Latency per generate call; throughput counts non-padding output tokens
+    assert SUMMARY_SECONDS.count() == calls + 2
+    expected = sum(len(ids) for ids in nlp_processor.tokenizer([t for t in texts if t], truncation=True)["input_ids"])
+    assert SUMMARY_TOKENS.value() == tokens + expected
+
+    assert summaries == [SAMPLE_TEXT, None, "Short abstract.", "A slightly longer abstract text."]
+    assert mock_generate.call_count == 2
+    # The first batch holds the two shortest inputs
+    first_batch = mock_generate.call_args_list[0].args[0]
+    assert first_batch.shape[0] == 2
+    assert "attention_mask" in mock_generate.call_args_list[0].kwargs
+
+def test_generate_summaries_empty_input(nlp_processor):
+    """Test batched summarization with no usable input"""
+    with patch.object(nlp_processor.model, "generate") as mock_generate:
+        assert nlp_processor.generate_summaries(["", "   "]) == [None, None]
+        mock_generate.assert_not_called()
+
+def test_model_loads_lazily():
+    """Constructing the processor must not load the summarization model"""
+    with patch("transformers.AutoModelForSeq2SeqLM.from_pretrained") as mock_model:
+        with patch("transformers.AutoTokenizer.from_pretrained") as mock_tokenizer:
+            nlp = NLPProcessor()
+            assert not nlp.is_loaded
+            mock_model.assert_not_called()
+
+            # First access to the model triggers a single load
+            nlp.model
+            nlp.tokenizer
+            assert nlp.is_loaded
+            mock_model.assert_called_once()
+            mock_tokenizer.assert_called_once()
+
+def test_invalid_inference_profile():
+    with pytest.raises(ValueError):
+        NLPProcessor(profile="fp8")
+
+@pytest.mark.parametrize("profile,dtype", [("fp32", torch.float32), ("bf16", torch.bfloat16)])
+def test_inference_profile_dtype(profile, dtype):
+    nlp = NLPProcessor(profile=profile)
+    with patch("torch.xpu.is_available", return_value=False):
+        model, device = nlp._apply_profile(torch.nn.Sequential(torch.nn.Linear(4, 4)))
+    assert device == "cpu"
+    assert nlp.active_profile == profile
+    assert next(model.parameters()).dtype == dtype
+
+def test_summary_cache_key_depends_on_profile():
+    # Summaries of one profile must not be served to another
+    keys = {
+        NLPProcessor(profile=profile, cache=NLPCache())._summary_key("text", 150, 30)
+        for profile in ("fp32", "bf16", "int8")
+    }
+    assert len(keys) == 3
+    # "auto" shares entries with the profile it resolves to on this device
+    cpu = NLPProcessor(profile="fp32", cache=NLPCache())._summary_key("text", 150, 30)
+    fp16 = NLPProcessor(profile="fp16", cache=NLPCache())._summary_key("text", 150, 30)
+    with patch("torch.xpu.is_available", return_value=False):
+        assert NLPProcessor(profile="auto", cache=NLPCache())._summary_key("text", 150, 30) == cpu
+    with patch("torch.xpu.is_available", return_value=True):
+        assert NLPProcessor(profile="auto", cache=NLPCache())._summary_key("text", 150, 30) == fp16
+
+def test_int8_profile_quantizes_linear_layers():
+    nlp = NLPProcessor(profile="int8")
+    model, device = nlp._apply_profile(torch.nn.Sequential(torch.nn.Linear(4, 4)))
+    assert device == "cpu"
+    assert isinstance(model[0], torch.nn.quantized.dynamic.Linear)
+
+def test_extract_keywords_batch_matches_serial():
+    nlp = NLPProcessor()
+    texts = [SAMPLE_TEXT, "", "Deep reinforcement learning for robotic control."]
+    assert nlp.extract_keywords_batch(texts) == [nlp.extract_keywords(text) for text in texts]
+
+def test_extract_keywords_batch_process_pool():
+    nlp = NLPProcessor(keyword_workers=2, parallel_threshold=2)
+    texts = [SAMPLE_TEXT, "Deep reinforcement learning for robotic control.", SAMPLE_TEXT]
+    try:
+        results = nlp.extract_keywords_batch(texts)
+        assert nlp._keyword_pool is not None
+    finally:
+        nlp.close()
+    assert results == [nlp.extract_keywords(text) for text in texts]
+
+def test_tfidf_keyword_engine():
+    nlp = NLPProcessor(keyword_engine="tfidf")
+    nlp.tfidf.fit([SAMPLE_TEXT, "Deep reinforcement learning for robotic control."])
+    keywords = nlp.extract_keywords_batch([SAMPLE_TEXT])[0]
+    assert keywords and all(isinstance(kw, str) for kw in keywords)
+    assert nlp.extract_keywords(SAMPLE_TEXT) == keywords
+
+def test_invalid_keyword_engine():
+    with pytest.raises(ValueError):
+        NLPProcessor(keyword_engine="rake")
+
+def test_embed_texts(nlp_processor):
+    """
+    Embeddings are normalized, batch-independent, and zero for empty input.
+    """
+    texts = [SAMPLE_TEXT, "", "Graph neural networks for molecules.", SAMPLE_TEXT[:80]]
+    embeddings = nlp_processor.embed_texts(texts, batch_size=2)
+    assert embeddings.shape == (4, nlp_processor.model.config.d_model)
+    assert embeddings.dtype == np.float32
+    assert np.allclose(np.linalg.norm(embeddings[[0, 2, 3]], axis=1), 1.0, atol=1e-5)
+    assert not embeddings[1].any()
+    single = nlp_processor.embed_texts([texts[2]])
+    assert np.allclose(single[0], embeddings[2], atol=1e-5)
@@ -0,0 +1,119 @@
+import asyncio
+import threading
+import pytest
+from backend.app.database.models import Paper
+from backend.app.database.crud import count_nlp_jobs, save_papers_bulk
+from backend.app.services.pipeline import Crawl, IngestPipeline
+
+def _papers(n, prefix="2401"):
+    return [
+        {"title": f"Paper {i}", "abstract": f"Abstract number {i} about topic {i * 7}",
+         "link": f"http://arxiv.org/abs/{prefix}.{i:05d}v1", "published": f"2024-01-{i + 1:02d}T00:00:00Z"}
+        for i in range(n)
+    ]
+
+def _fetcher(papers):
+    async def fetch(crawl):
+        return [dict(paper) for paper in papers]
+    return fetch
+
+def _summarize(batches):
+    def process(papers):
+        batches.append(len(papers))
+        return [dict(paper, summary=f"Summary of {paper['title']}", keywords=["topic"]) for paper in papers]
+    return process
+
+@pytest.mark.asyncio
+async def test_pipeline_batches_nlp_and_stores(db_session, session_factory):
+    batches = []
+    pipeline = IngestPipeline(
+        _fetcher(_papers(5)), process=_summarize(batches), session_factory=session_factory, batch_size=2
+    )
+    try:
+        crawl = await pipeline.run(Crawl("ml"))
+        # Re-crawling the same papers only finds duplicates
+        again = await pipeline.run(Crawl("ml"))
+    finally:
+        await pipeline.stop()
+    assert sorted(batches) == [1, 2, 2]
+    assert (crawl.fetched, crawl.stored, crawl.duplicates, crawl.failed) == (5, 5, 0, False)
+    assert crawl.newest["title"] == "Paper 4"
+    assert (again.stored, again.duplicates) == (0, 5)
+    assert db_session.query(Paper).count() == 5
+    assert {p.summary for p in db_session.query(Paper)} == {f"Summary of Paper {i}" for i in range(5)}
+    assert not pipeline.running
+
+@pytest.mark.asyncio
+async def test_pipeline_applies_backpressure(db_session, session_factory):
+    release = threading.Event()
+    started = []
+
+    def slow_process(papers):
+        started.append(len(papers))
+        release.wait(timeout=10)
+        return papers
+
+    pipeline = IngestPipeline(
+        _fetcher(_papers(8)), process=slow_process, session_factory=session_factory, batch_size=1, queue_size=2
+    )
+    try:
+        task = asyncio.create_task(pipeline.run(Crawl("ml")))
+        for _ in range(100):
+            if pipeline.stats()["queued"].get("nlp") == 2:
+                break
+            await asyncio.sleep(0.01)
+        # One batch in the NLP stage, two queued; dedup waits instead of buffering the rest
+        assert len(started) == 1
+        assert pipeline.stats()["queued"]["nlp"] == 2
+        assert db_session.query(Paper).count() == 0
+        release.set()
+        crawl = await asyncio.wait_for(task, timeout=10)
+    finally:
+        release.set()
+        await pipeline.stop()
+    assert crawl.stored == 8
+    assert len(started) == 8
+
+@pytest.mark.asyncio
+async def test_pipeline_defers_failed_nlp_to_jobs(db_session, session_factory):
+    def broken(papers):
+        raise RuntimeError("model not loaded")
+
+    pipeline = IngestPipeline(_fetcher(_papers(3)), process=broken, session_factory=session_factory)
+    try:
+        crawl = await pipeline.run(Crawl("ml"))
+    finally:
+        await pipeline.stop()
+    assert (crawl.stored, crawl.deferred, crawl.failed) == (3, 3, False)
+    assert crawl.errors == ["nlp: model not loaded"]
+    assert db_session.query(Paper).count() == 3
+    assert count_nlp_jobs(db_session) == {"pending": 3}
+
+@pytest.mark.asyncio
+async def test_pipeline_reports_failed_stages(db_session, session_factory):
+    calls = []
+
+    def flaky_store(db, papers, keyword):
+        calls.append(len(papers))
+        if len(calls) == 1:
+            raise RuntimeError("database is locked")
+        save_papers_bulk(db, papers, keyword)
+
+    async def failing_fetch(crawl):
+        raise RuntimeError("API error")
+
+    pipeline = IngestPipeline(
+        _fetcher(_papers(4)), process=lambda papers: papers, store=flaky_store,
+        session_factory=session_factory, batch_size=2
+    )
+    try:
+        crawl = await pipeline.run(Crawl("ml"))
+        pipeline.fetch = failing_fetch
+        failed_fetch = await pipeline.run(Crawl("ml"))
+    finally:
+        await pipeline.stop()
+    assert crawl.failed
+    assert crawl.stored == 2
+    assert crawl.errors == ["store: database is locked"]
+    assert failed_fetch.failed
+    assert (failed_fetch.fetched, failed_fetch.errors) == (0, ["fetch: API error"])
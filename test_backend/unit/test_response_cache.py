@@ -0,0 +1,51 @@
+from backend.app.services.response_cache import ResponseCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_get_set_and_etag():
+    cache = ResponseCache()
+    assert cache.get(("a",)) is None
+    entry = cache.set(("a",), b'{"papers":[]}', "ML")
+    assert cache.get(("a",)) == entry
+    assert entry.etag == ResponseCache.make_etag(b'{"papers":[]}')
+    assert entry.etag.startswith('"') and entry.etag.endswith('"')
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+def test_ttl_expiry():
+    clock = FakeClock()
+    cache = ResponseCache(ttl=10, clock=clock)
+    cache.set(("a",), b"1")
+    clock.now = 9.9
+    assert cache.get(("a",)) is not None
+    clock.now = 10.0
+    assert cache.get(("a",)) is None
+    assert cache.stats()["entries"] == 0
+
+def test_lru_eviction():
+    cache = ResponseCache(max_entries=2)
+    cache.set(("a",), b"1")
+    cache.set(("b",), b"2")
+    cache.get(("a",))
+    cache.set(("c",), b"3")
+    assert cache.get(("b",)) is None
+    assert cache.get(("a",)) is not None
+    assert cache.get(("c",)) is not None
+
+def test_invalidate_keywords():
+    cache = ResponseCache()
+    cache.set(("ml", 10), b"1", "Machine  Learning")
+    cache.set(("ml", 20), b"2", "machine learning")
+    cache.set(("all",), b"3", None)
+    cache.set(("bio",), b"4", "biology")
+    cache.invalidate_keywords(["MACHINE learning"])
+    assert cache.get(("ml", 10)) is None
+    assert cache.get(("ml", 20)) is None
+    assert cache.get(("all",)) is None  # Unfiltered listings include every paper
+    assert cache.get(("bio",)) is not None
+    assert cache.stats()["invalidations"] == 3
@@ -1,9 +1,17 @@
 import os
 import pytest
-from unittest.mock import Mock, patch
-from datetime import datetime
-from backend.app.services.scheduler import Scheduler
-from backend.app.database.models import Base, Paper
+import pytest_asyncio
+import asyncio
+import threading
+from unittest.mock import AsyncMock, Mock, patch
+from datetime import datetime, timedelta
+from apscheduler.schedulers.base import STATE_PAUSED, STATE_RUNNING
+from backend.app.services.arxiv import IncompleteCrawl
+from backend.app.services.scheduler import Scheduler, UTC
+from backend.app.database.models import Base, Paper, CrawlWatermark
+from backend.app.database.crud import (
+    create_subscription, update_subscription, acquire_lock, release_lock, get_lock
+)
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
@@ -35,10 +43,23 @@ def db_session():
             except PermissionError:
                 print(f"Warning: Could not delete {TEST_DB_PATH} due to file lock")
 
+@pytest_asyncio.fixture
+async def make_scheduler():
+    """Build schedulers on the test database and stop their pipelines afterwards."""
+    created = []
+
+    def factory(**kwargs):
+        scheduler = Scheduler(session_factory=SessionLocal, **kwargs)
+        created.append(scheduler)
+        return scheduler
+    yield factory
+    for scheduler in created:
+        await scheduler.stop_pipeline()
+
 @pytest.mark.asyncio
-async def test_fetch_and_save_papers(db_session):
+async def test_fetch_and_save_papers(db_session, make_scheduler):
     # Mock ArxivCrawler
-    scheduler = Scheduler()
+    scheduler = make_scheduler()
     mock_papers = [
         {
             "title": "Test Paper",
@@ -47,10 +68,8 @@ async def test_fetch_and_save_papers(db_session):
             "published": "2023-10-01T00:00:00"
         }
     ]
-    with patch.object(scheduler.crawler, "search_papers", Mock(return_value=mock_papers)):
-        # Mock get_db
-        with patch("backend.app.services.scheduler.get_db", return_value=iter([db_session])):
-            await scheduler.fetch_and_save_papers(keyword="test")
+    with patch.object(scheduler.crawler, "fetch_new_papers", AsyncMock(return_value=mock_papers)):
+        await scheduler.fetch_and_save_papers(keyword="test")
 
     # Verify paper saved
     paper_in_db = db_session.query(Paper).filter_by(title="Test Paper").first()
@@ -59,13 +78,11 @@ async def test_fetch_and_save_papers(db_session):
     assert paper_in_db.abstract == "Test abstract"
 
 @pytest.mark.asyncio
-async def test_fetch_and_save_papers_failure(db_session):
+async def test_fetch_and_save_papers_failure(db_session, make_scheduler):
     # Mock ArxivCrawler to raise an exception
-    scheduler = Scheduler()
-    with patch.object(scheduler.crawler, "search_papers", side_effect=Exception("API error")):
-        # Mock get_db
-        with patch("backend.app.services.scheduler.get_db", return_value=iter([db_session])):
-            await scheduler.fetch_and_save_papers(keyword="test")
+    scheduler = make_scheduler()
+    with patch.object(scheduler.crawler, "fetch_new_papers", AsyncMock(side_effect=Exception("API error"))):
+        await scheduler.fetch_and_save_papers(keyword="test")
 
     # Verify no papers saved
     papers = db_session.query(Paper).all()
@@ -75,8 +92,268 @@ async def test_fetch_and_save_papers_failure(db_session):
 async def test_schedule_tasks():
     scheduler = Scheduler()
     with patch("apscheduler.schedulers.asyncio.AsyncIOScheduler.add_job") as mock_add_job:
-        scheduler.schedule_tasks()
+        scheduler.schedule_tasks(subscriptions=[])
         mock_add_job.assert_called_once()
         call_args = mock_add_job.call_args
         assert call_args.kwargs["id"] == "daily_fetch_papers"
-        assert call_args.kwargs["kwargs"] == {"keyword": "machine learning"}
\ No newline at end of file
+        assert call_args.kwargs["kwargs"] == {"keyword": "machine learning"}
+
+@pytest.mark.asyncio
+async def test_fetch_and_save_papers_uses_watermark(db_session, make_scheduler):
+    scheduler = make_scheduler()
+    first_run = [
+        {
+            "title": "Newer Paper",
+            "abstract": "Newer abstract",
+            "link": "http://arxiv.org/abs/2401.00002v1",
+            "published": "2024-01-02T00:00:00Z",
+            "arxiv_id": "2401.00002"
+        },
+        {
+            "title": "Older Paper",
+            "abstract": "Older abstract",
+            "link": "http://arxiv.org/abs/2401.00001v1",
+            "published": "2024-01-01T00:00:00Z",
+            "arxiv_id": "2401.00001"
+        }
+    ]
+    fetch = AsyncMock(return_value=first_run)
+    with patch.object(scheduler.crawler, "fetch_new_papers", fetch):
+        await scheduler.fetch_and_save_papers(keyword="test")
+    assert fetch.call_args.kwargs == {"since": None, "since_id": None, "max_results": None}
+
+    watermark = db_session.get(CrawlWatermark, "test")
+    assert watermark.last_published == datetime(2024, 1, 2)
+    assert watermark.last_arxiv_id == "2401.00002"
+
+    # The next run resumes from the high-water mark
+    fetch = AsyncMock(return_value=[])
+    with patch.object(scheduler.crawler, "fetch_new_papers", fetch):
+        await scheduler.fetch_and_save_papers(keyword="test")
+    assert fetch.call_args.kwargs == {"since": datetime(2024, 1, 2), "since_id": "2401.00002", "max_results": None}
+    assert db_session.query(Paper).count() == 2
+
+@pytest.mark.asyncio
+async def test_incomplete_crawl_keeps_watermark(db_session, make_scheduler):
+    scheduler = make_scheduler()
+    partial = [{
+        "title": "Fetched Before The Error",
+        "abstract": "Abstract",
+        "link": "http://arxiv.org/abs/2401.00009v1",
+        "published": "2024-01-09T00:00:00Z",
+        "arxiv_id": "2401.00009"
+    }]
+    fetch = AsyncMock(side_effect=IncompleteCrawl("arXiv request failed after 1 papers: 503", partial))
+    with patch.object(scheduler.crawler, "fetch_new_papers", fetch):
+        await scheduler.fetch_and_save_papers(keyword="test")
+    # The partial result is stored, but the gap behind it must be refetched next run
+    assert db_session.query(Paper).count() == 1
+    assert db_session.get(CrawlWatermark, "test") is None
+    assert scheduler.run_stats["test"]["last_error"] == "fetch: arXiv request failed after 1 papers: 503"
+
+@pytest.mark.asyncio
+async def test_budget_smaller_than_new_papers_advances_watermark(db_session, make_scheduler):
+    scheduler = make_scheduler()
+
+    def arxiv(newest):
+        # Newest first, as fetch_new_papers requests them
+        async def iter_papers(keyword, max_results=None, **kwargs):
+            for i in range(newest, 0, -1)[:max_results]:
+                yield {
+                    "title": f"Paper {i}",
+                    "abstract": " ".join(f"term{i}x{j}" for j in range(20)),
+                    "link": f"http://arxiv.org/abs/2401.{i:05d}v1",
+                    "published": f"2024-01-{i:02d}T00:00:00Z",
+                    "arxiv_id": f"2401.{i:05d}"
+                }
+        return iter_papers
+
+    with patch.object(scheduler.crawler, "iter_papers", arxiv(5)):
+        await scheduler.fetch_and_save_papers(keyword="test", max_results=3)
+    assert db_session.get(CrawlWatermark, "test").last_arxiv_id == "2401.00005"
+    # More new papers than the budget: the newest are stored and the watermark still moves
+    with patch.object(scheduler.crawler, "iter_papers", arxiv(10)):
+        await scheduler.fetch_and_save_papers(keyword="test", max_results=3)
+    db_session.expire_all()
+    assert db_session.get(CrawlWatermark, "test").last_arxiv_id == "2401.00010"
+    assert scheduler.run_stats["test"]["last_error"] is None
+    assert db_session.query(Paper).count() == 6
+
+@pytest.mark.asyncio
+async def test_schedule_subscriptions(db_session, make_scheduler):
+    scheduler = make_scheduler(jitter=60)
+    scheduler.schedule_tasks(subscriptions=[])
+    assert [job.id for job in scheduler.scheduler.get_jobs()] == ["daily_fetch_papers"]
+
+    ml = create_subscription(db_session, "machine learning", interval_minutes=60, max_results=20)
+    gnn = create_subscription(db_session, "graph neural networks", interval_minutes=1440)
+    scheduler.schedule_tasks(subscriptions=[ml, gnn])
+    jobs = {job.id: job for job in scheduler.scheduler.get_jobs()}
+    # Subscriptions replace the default job
+    assert set(jobs) == {f"subscription_{ml.id}", f"subscription_{gnn.id}"}
+    job = jobs[f"subscription_{ml.id}"]
+    assert job.kwargs == {"keyword": "machine learning", "max_results": 20, "subscription_id": ml.id}
+    assert job.trigger.interval == timedelta(minutes=60)
+    assert job.trigger.jitter == 60
+    # First runs are spread over the interval by a per-keyword offset
+    now = datetime.now(job.trigger.start_date.tzinfo)
+    assert now <= job.trigger.start_date <= now + timedelta(minutes=60)
+    assert jobs[f"subscription_{gnn.id}"].trigger.start_date != job.trigger.start_date
+
+    # Disabled subscriptions are unscheduled; none left brings the default back
+    update_subscription(db_session, gnn.id, enabled=False)
+    scheduler.schedule_tasks(subscriptions=[ml, gnn])
+    assert [job.id for job in scheduler.scheduler.get_jobs()] == [f"subscription_{ml.id}"]
+    scheduler.schedule_tasks(subscriptions=[])
+    assert [job.id for job in scheduler.scheduler.get_jobs()] == ["daily_fetch_papers"]
+
+    # Next run resumes one interval after the last run
+    ml.last_run_at = datetime.utcnow() - timedelta(minutes=10)
+    start = scheduler._first_run(ml, datetime.now(job.trigger.start_date.tzinfo))
+    assert start.replace(tzinfo=None) == ml.last_run_at + timedelta(minutes=60)
+
+@pytest.mark.asyncio
+async def test_subscription_runs_record_stats(db_session, make_scheduler):
+    scheduler = make_scheduler()
+    subscription = create_subscription(db_session, "test", max_results=7)
+    papers = [
+        {"title": "Paper", "abstract": "Abstract", "link": "http://arxiv.org/abs/2401.00001v1",
+         "published": "2024-01-01T00:00:00Z", "arxiv_id": "2401.00001"}
+    ]
+    fetch = AsyncMock(return_value=papers)
+    with patch.object(scheduler.crawler, "fetch_new_papers", fetch):
+        await scheduler.fetch_and_save_papers(keyword="test", max_results=7, subscription_id=subscription.id)
+    assert fetch.call_args.kwargs["max_results"] == 7
+
+    db_session.refresh(subscription)
+    assert subscription.last_paper_count == 1
+    assert subscription.total_papers == 1
+    assert subscription.last_duration >= 0
+    assert subscription.last_run_at is not None
+    stats = scheduler.run_stats["test"]
+    assert (stats["runs"], stats["last_fetched"], stats["last_paper_count"], stats["last_error"]) == (1, 1, 1, None)
+
+    with patch.object(scheduler.crawler, "fetch_new_papers", AsyncMock(side_effect=Exception("API error"))):
+        await scheduler.fetch_and_save_papers(keyword="test", subscription_id=subscription.id)
+    db_session.refresh(subscription)
+    assert subscription.last_error == "fetch: API error"
+    assert subscription.total_papers == 1
+    assert scheduler.run_stats["test"]["runs"] == 2
+
+    scheduler.schedule_tasks(subscriptions=[subscription])
+    status = scheduler.get_status()
+    assert status["jobs"][0]["keyword"] == "test"
+    assert status["jobs"][0]["last_run"]["last_error"] == "fetch: API error"
+
+@pytest.mark.asyncio
+async def test_fetch_concurrency_is_bounded(db_session, make_scheduler):
+    scheduler = make_scheduler(max_concurrency=2)
+    in_flight, peak = 0, 0
+
+    async def fetch(keyword, **kwargs):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return []
+
+    with patch.object(scheduler.crawler, "fetch_new_papers", fetch):
+        await asyncio.gather(*(scheduler.fetch_and_save_papers(keyword=f"k{i}") for i in range(6)))
+    assert peak == 2
+    assert len(scheduler.run_stats) == 6
+
+def test_leases(db_session):
+    assert acquire_lock(db_session, "leader", "a", 30)
+    assert acquire_lock(db_session, "leader", "a", 30)  # Renewal
+    assert not acquire_lock(db_session, "leader", "b", 30)
+    assert get_lock(db_session, "leader").owner == "a"
+    assert not release_lock(db_session, "leader", "b")
+    assert release_lock(db_session, "leader", "a")
+    assert acquire_lock(db_session, "leader", "b", 30)
+
+    # Expired leases can be taken over
+    lock = get_lock(db_session, "leader")
+    lock.expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db_session.commit()
+    assert acquire_lock(db_session, "leader", "a", 30)
+
+async def _wait_for(condition, timeout=5.0):
+    for _ in range(int(timeout / 0.02)):
+        if condition():
+            return True
+        await asyncio.sleep(0.02)
+    return condition()
+
+@pytest.mark.asyncio
+async def test_only_the_leader_runs_jobs(db_session, make_scheduler):
+    first = make_scheduler(jobstore_engine=engine, lease_seconds=0.3)
+    second = make_scheduler(jobstore_engine=engine, lease_seconds=0.3)
+    first.start()
+    try:
+        assert await _wait_for(lambda: first.is_leader)
+        second.start()
+        await asyncio.sleep(0.3)
+        assert not second.is_leader
+        assert first.scheduler.state == STATE_RUNNING
+        assert second.scheduler.state == STATE_PAUSED
+        # Both share the persistent default job
+        assert [job.id for job in second.scheduler.get_jobs()] == ["daily_fetch_papers"]
+
+        # Leadership moves over when the leader stops
+        first.shutdown()
+        assert await _wait_for(lambda: second.is_leader)
+        assert second.scheduler.state == STATE_RUNNING
+        assert second.get_status()["leader"] is True
+    finally:
+        for scheduler in (first, second):
+            if scheduler.scheduler.running:
+                scheduler.shutdown()
+
+@pytest.mark.asyncio
+async def test_start_schedules_off_the_event_loop(db_session, make_scheduler):
+    scheduler = make_scheduler()
+    threads = []
+    with patch.object(scheduler, "schedule_tasks", side_effect=lambda: threads.append(threading.get_ident())):
+        scheduler.start()
+        try:
+            assert await _wait_for(lambda: threads)
+        finally:
+            scheduler.shutdown()
+    assert threads != [threading.get_ident()]
+
+@pytest.mark.asyncio
+async def test_persistent_jobs_coalesce_missed_runs(db_session, make_scheduler):
+    subscription = create_subscription(db_session, "test", interval_minutes=60)
+    first = make_scheduler(jobstore_engine=engine)
+    first.scheduler.start(paused=True)
+    first.schedule_tasks([subscription])
+    job_id = f"subscription_{subscription.id}"
+    # Pretend the process was down for three intervals
+    missed = datetime.now(UTC) - timedelta(hours=3, minutes=1)
+    first.scheduler.modify_job(job_id, next_run_time=missed)
+    first.scheduler.shutdown()
+
+    second = make_scheduler(jobstore_engine=engine)
+    with patch.object(second, "fetch_and_save_papers", AsyncMock()) as crawl:
+        second.start()
+        try:
+            # The stored job was kept rather than rescheduled from now
+            assert await _wait_for(lambda: crawl.await_count > 0)
+            await asyncio.sleep(0.2)
+        finally:
+            second.shutdown()
+    crawl.assert_awaited_once_with("test", 5, subscription.id)
+
+@pytest.mark.asyncio
+async def test_run_exclusive_skips_locked_keywords(db_session, make_scheduler):
+    scheduler = make_scheduler(lease_seconds=30)
+    acquire_lock(db_session, "crawl:test", "other-worker", 30)
+    with patch.object(scheduler, "fetch_and_save_papers", AsyncMock()) as crawl:
+        await scheduler.run_exclusive("test")
+        crawl.assert_not_awaited()
+        release_lock(db_session, "crawl:test", "other-worker")
+        await scheduler.run_exclusive("test")
+        crawl.assert_awaited_once()
+    # The lock is released after the run
+    assert get_lock(db_session, "crawl:test") is None
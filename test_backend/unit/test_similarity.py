@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from backend.app.services.similarity import EmbeddingIndex
+
+def _unit(rows):
+    rows = np.asarray(rows, dtype=np.float32)
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+def test_add_and_search(tmp_path):
+    index = EmbeddingIndex(str(tmp_path), model_name="m", chunk_rows=2)
+    index.add([1, 2, 3], _unit([[1, 0, 0], [0.9, 0.1, 0], [0, 1, 0]]))
+    results = index.search(np.array([1, 0, 0]), k=2)
+    assert [paper_id for paper_id, _ in results] == [1, 2]
+    assert results[0][1] == pytest.approx(1.0)
+    assert [paper_id for paper_id, _ in index.search(np.array([1, 0, 0]), k=2, exclude=[1])] == [2, 3]
+    assert index.search(np.zeros(3), k=2) == []
+
+def test_incremental_append_and_overwrite(tmp_path):
+    index = EmbeddingIndex(str(tmp_path), model_name="m")
+    index.add([1, 2], _unit([[1, 0], [0, 1]]))
+    index.add([3], _unit([[1, 1]]))
+    index.add([1], _unit([[0, 1]]))  # Re-embedded paper is replaced in place
+    assert len(index) == 3
+    assert np.allclose(index.get(1), [0, 1])
+    assert index.get(99) is None
+
+    # Reopening maps the same vectors from disk
+    reopened = EmbeddingIndex(str(tmp_path), model_name="m")
+    assert len(reopened) == 3
+    assert [paper_id for paper_id, _ in reopened.search(np.array([0, 1]), k=3)][:2] in ([1, 2], [2, 1])
+
+def test_model_change_discards_index(tmp_path):
+    EmbeddingIndex(str(tmp_path), model_name="a").add([1], _unit([[1, 0]]))
+    index = EmbeddingIndex(str(tmp_path), model_name="b")
+    assert len(index) == 0
+    index.add([1], _unit([[1, 0, 0]]))
+    assert index.dim == 3
+
+def test_dimension_mismatch(tmp_path):
+    index = EmbeddingIndex(str(tmp_path), model_name="m")
+    index.add([1], _unit([[1, 0]]))
+    with pytest.raises(ValueError):
+        index.add([2], _unit([[1, 0, 0]]))
+
+def test_sync_from_blobs(tmp_path):
+    index = EmbeddingIndex(str(tmp_path), model_name="m")
+    index.add([1], _unit([[1, 0]]))
+    blobs = [(1, _unit([[0, 1]])[0].tobytes()), (2, _unit([[0, 1]])[0].tobytes())]
+    assert index.sync(blobs) == 1  # Already indexed ids are skipped
+    assert np.allclose(index.get(2), [0, 1])
+    assert np.allclose(index.get(1), [1, 0])
+
+def test_remove_compacts_index(tmp_path):
+    index = EmbeddingIndex(str(tmp_path), model_name="m")
+    index.add([1, 2, 3], _unit([[1, 0], [0.9, 0.1], [0, 1]]))
+    assert index.remove([2, 99]) == 1
+    assert 2 not in index and len(index) == 2
+    assert [paper_id for paper_id, _ in index.search([1, 0], k=2)] == [1, 3]
+    reopened = EmbeddingIndex(str(tmp_path), model_name="m")
+    assert np.allclose(reopened.get(3), [0, 1])
+    assert reopened.get(2) is None
+    assert index.remove([1, 3]) == 2
+    assert index.search([1, 0]) == []
+
+def test_sync_drops_ids_without_stored_embedding(tmp_path):
+    index = EmbeddingIndex(str(tmp_path), model_name="m")
+    index.add([1, 2], _unit([[1, 0], [0, 1]]))
+    assert index.sync([(2, _unit([[0, 1]])[0].tobytes())]) == 0
+    assert 1 not in index
+    assert [paper_id for paper_id, _ in index.search([1, 0], k=5)] == [2]